@@ -2,7 +2,12 @@ from flask import Flask
 from flask_cors import CORS
 from config import Config
 from utils.db import init_db
+from utils.indexes import ensure_indexes
+from utils.counters import stats_counters
 from utils.websocket import init_socketio
+from utils.external_services import weather_service
+from utils.dispatcher import dispatcher
+from utils.driver_index import driver_index
 from routes.orders import orders_bp
 from routes.agents import agents_bp
 from routes.tracking import tracking_bp
@@ -25,10 +30,29 @@ CORS(app, resources={
 
 # Initialize MongoDB
 init_db()
+if Config.ENSURE_INDEXES_ON_STARTUP:
+    try:
+        ensure_indexes()
+    except Exception as e:
+        print(f"⚠️ Could not create indexes: {e}")
+try:
+    stats_counters.ensure_initialized()
+except Exception as e:
+    print(f"⚠️ Could not initialize stats counters: {e}")
 
 # Initialize WebSocket
 socketio = init_socketio(app)
 
+# Keep weather for every known city warm off the request path
+weather_service.start_background_refresh()
+
+# Nearest-driver index, reloaded off the request path
+driver_index.start_background_refresh()
+
+# Micro-batched pickup assignment
+if Config.DISPATCH_MODE == 'batch':
+    dispatcher.start()
+
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api')
 app.register_blueprint(admin_bp, url_prefix='/api')
@@ -3,6 +3,7 @@ Clear all orders from database
 Run: python clear_orders.py
 """
 from utils.db import init_db, get_db
+from utils.counters import stats_counters
 
 def clear_all_orders():
     init_db()
@@ -10,6 +11,8 @@ def clear_all_orders():
     
     # Delete all orders
     result = db.orders.delete_many({})
+    # Bulk delete bypasses the per-order counter updates: recount
+    stats_counters.rebuild(db)
     
     print(f"✅ Deleted {result.deleted_count} orders from database")
     print("Database is now clean!")
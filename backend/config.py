@@ -11,6 +11,79 @@ class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:5173').split(',')
     
+    # Create missing MongoDB indexes when the app starts (also: python -m utils.indexes)
+    ENSURE_INDEXES_ON_STARTUP = os.getenv('ENSURE_INDEXES_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+    
     # External APIs
     OPENROUTE_API_KEY = os.getenv('OPENROUTE_API_KEY', '')
     WEATHER_API_KEY = os.getenv('WEATHER_API_KEY', '')  # OpenWeatherMap
+    
+    # Outgoing HTTP (connection pool, retries, circuit breaker)
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 20))
+    HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+    HTTP_BACKOFF_SECONDS = float(os.getenv('HTTP_BACKOFF_SECONDS', 0.2))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+    CIRCUIT_RESET_SECONDS = float(os.getenv('CIRCUIT_RESET_SECONDS', 30))
+    
+    # Delivery insights: concurrent route/weather/traffic lookups
+    INSIGHTS_WORKERS = int(os.getenv('INSIGHTS_WORKERS', 16))
+    INSIGHTS_DEADLINE_SECONDS = float(os.getenv('INSIGHTS_DEADLINE_SECONDS', 8))
+    
+    # Weather cache (per city, refreshed in the background)
+    WEATHER_CACHE_TTL_SECONDS = int(os.getenv('WEATHER_CACHE_TTL_SECONDS', 900))
+    WEATHER_REFRESH_SECONDS = int(os.getenv('WEATHER_REFRESH_SECONDS', 600))
+    
+    # In-memory index of available drivers (nearest-driver dispatch)
+    DRIVER_INDEX_CELL_DEGREES = float(os.getenv('DRIVER_INDEX_CELL_DEGREES', 0.01))  # ~1 km
+    DRIVER_INDEX_RELOAD_SECONDS = int(os.getenv('DRIVER_INDEX_RELOAD_SECONDS', 60))
+    DISPATCH_CANDIDATES = int(os.getenv('DISPATCH_CANDIDATES', 5))
+    DISPATCH_CLAIM_RETRIES = int(os.getenv('DISPATCH_CLAIM_RETRIES', 3))
+    
+    # Pickup dispatch: 'immediate' (claim inside the request) or 'batch' (micro-batched assignment)
+    DISPATCH_MODE = os.getenv('DISPATCH_MODE', 'immediate')
+    DISPATCH_WINDOW_SECONDS = float(os.getenv('DISPATCH_WINDOW_SECONDS', 2))
+    DISPATCH_MAX_BATCH = int(os.getenv('DISPATCH_MAX_BATCH', 100))
+    DISPATCH_LOAD_WEIGHT_KM = float(os.getenv('DISPATCH_LOAD_WEIGHT_KM', 0.5))  # cost per order already on the driver
+    DISPATCH_UNKNOWN_DISTANCE_KM = float(os.getenv('DISPATCH_UNKNOWN_DISTANCE_KM', 15))
+    DISPATCH_MAX_KM = float(os.getenv('DISPATCH_MAX_KM', 0))  # 0 = no limit
+    
+    # WebSocket fan-out across workers: redis://host:6379/0, local://host:port (utils/message_queue.py), '' = single process
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+    SOCKETIO_CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'ctm-socketio')
+    
+    # WebSocket: driver positions are coalesced per room and flushed every tick (0 = emit immediately)
+    BROADCAST_TICK_SECONDS = float(os.getenv('BROADCAST_TICK_SECONDS', 1.0))
+    
+    # Driver GPS ingestion
+    LOCATION_BATCH_MAX_POINTS = int(os.getenv('LOCATION_BATCH_MAX_POINTS', 500))
+    ORDER_STATE_CACHE_SIZE = int(os.getenv('ORDER_STATE_CACHE_SIZE', 10000))
+    ORDER_STATE_CACHE_TTL_SECONDS = int(os.getenv('ORDER_STATE_CACHE_TTL_SECONDS', 300))
+    
+    # Geofences driving automatic status progression (meters)
+    GEOFENCE_PICKUP_RADIUS_M = float(os.getenv('GEOFENCE_PICKUP_RADIUS_M', 150))
+    GEOFENCE_TRANSIT_RADIUS_M = float(os.getenv('GEOFENCE_TRANSIT_RADIUS_M', 5000))  # orders without pickup coordinates
+    GEOFENCE_APPROACH_RADIUS_M = float(os.getenv('GEOFENCE_APPROACH_RADIUS_M', 1000))
+    GEOFENCE_ARRIVAL_RADIUS_M = float(os.getenv('GEOFENCE_ARRIVAL_RADIUS_M', 100))
+    GEOFENCE_HYSTERESIS_M = float(os.getenv('GEOFENCE_HYSTERESIS_M', 50))
+    
+    # Order lists (keyset pagination)
+    ORDERS_PAGE_SIZE = int(os.getenv('ORDERS_PAGE_SIZE', 50))
+    ORDERS_PAGE_SIZE_MAX = int(os.getenv('ORDERS_PAGE_SIZE_MAX', 200))
+    
+    # Admin dashboard counters are recomputed at most this often
+    ADMIN_STATS_CACHE_TTL_SECONDS = float(os.getenv('ADMIN_STATS_CACHE_TTL_SECONDS', 10))
+    
+    # Location history (bucketed GPS trail)
+    LOCATION_HISTORY_BUCKET_MINUTES = int(os.getenv('LOCATION_HISTORY_BUCKET_MINUTES', 60))
+    LOCATION_HISTORY_BUCKET_MAX_POINTS = int(os.getenv('LOCATION_HISTORY_BUCKET_MAX_POINTS', 2000))
+    LOCATION_HISTORY_RETENTION_DAYS = int(os.getenv('LOCATION_HISTORY_RETENTION_DAYS', 90))
+    LOCATION_HISTORY_MAX_RANGE_HOURS = int(os.getenv('LOCATION_HISTORY_MAX_RANGE_HOURS', 7 * 24))
+    
+    # Route optimization
+    ROUTE_IMPROVEMENT_BUDGET_MS = int(os.getenv('ROUTE_IMPROVEMENT_BUDGET_MS', 500))
+    SEQUENCING_BUDGET_MS = int(os.getenv('SEQUENCING_BUDGET_MS', 100))
+    
+    # Route cache (in-process LRU + shared MongoDB collection)
+    ROUTE_CACHE_SIZE = int(os.getenv('ROUTE_CACHE_SIZE', 1024))
+    ROUTE_CACHE_TTL_SECONDS = int(os.getenv('ROUTE_CACHE_TTL_SECONDS', 24 * 3600))
+    ROUTE_CACHE_PRECISION = int(os.getenv('ROUTE_CACHE_PRECISION', 4))  # decimals (~11 m)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from utils.geo import to_geojson_point
 
 class Driver:
     # Driver types
@@ -20,6 +21,7 @@ class Driver:
             },
             'status': 'available',  # available, on_route, break
             'current_location': data.get('current_location'),
+            'current_location_geo': to_geojson_point(data.get('current_location')),
             'assigned_orders': [],
             'stats': {
                 'total_deliveries': 0,
@@ -1,6 +1,7 @@
 from datetime import datetime
 import random
 import string
+from utils.geo import to_geojson_point
 
 def generate_tracking_number():
     return 'CTM' + ''.join(random.choices(string.digits, k=10))
@@ -15,14 +16,16 @@ class Order:
                 'phone': data['sender']['phone'],
                 'address': data['sender']['address'],
                 'city': data['sender']['city'],
-                'coordinates': data['sender'].get('coordinates', None)
+                'coordinates': data['sender'].get('coordinates', None),
+                'location': to_geojson_point(data['sender'].get('coordinates'))  # GeoJSON for 2dsphere
             },
             'recipient': {
                 'name': data['recipient']['name'],
                 'phone': data['recipient']['phone'],
                 'address': data['recipient']['address'],
                 'city': data['recipient']['city'],
-                'coordinates': data['recipient'].get('coordinates', None)
+                'coordinates': data['recipient'].get('coordinates', None),
+                'location': to_geojson_point(data['recipient'].get('coordinates'))  # GeoJSON for 2dsphere
             },
             'package': {
                 'weight': data['package']['weight'],
@@ -4,6 +4,7 @@ Run: python reset_admin.py
 """
 from utils.db import init_db, get_db
 from models.user import User
+from utils.counters import stats_counters
 
 def reset_admin():
     init_db()
@@ -25,6 +26,8 @@ def reset_admin():
     admin['is_verified'] = True
     
     result = db.users.insert_one(admin)
+    # Deleted admins are not tracked individually: recount
+    stats_counters.rebuild(db)
     
     print("✅ Admin user reset successfully!")
     print(f"📧 Email: admin@ctm.ma")
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from bson import ObjectId
 from utils.db import get_db
 from utils.auth import role_required
+from utils.stats import admin_stats
+from utils.counters import stats_counters
 from models.user import User
 from datetime import datetime
 
@@ -58,6 +60,8 @@ def create_user(current_user):
         # Create user
         user = User.create(data)
         result = db.users.insert_one(user)
+        stats_counters.user_created(user, db)
+        admin_stats.invalidate()
         
         return jsonify({
             'success': True,
@@ -90,6 +94,8 @@ def update_user(current_user, user_id):
             update_data['profile'] = {**user['profile'], **data['profile']}
         
         db.users.update_one({'_id': ObjectId(user_id)}, {'$set': update_data})
+        stats_counters.user_changed(user, {**user, **update_data}, db)
+        admin_stats.invalidate()
         
         return jsonify({'success': True, 'message': 'User updated successfully'})
     except Exception as e:
@@ -101,13 +107,17 @@ def delete_user(current_user, user_id):
     """Deactivate user (admin only)"""
     try:
         db = get_db()
-        result = db.users.update_one(
+        # Previous state decides whether the active counter moves
+        user = db.users.find_one_and_update(
             {'_id': ObjectId(user_id)},
-            {'$set': {'is_active': False, 'updated_at': datetime.utcnow()}}
+            {'$set': {'is_active': False, 'updated_at': datetime.utcnow()}},
+            projection={'role': 1, 'is_active': 1}
         )
         
-        if result.modified_count == 0:
+        if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
+        stats_counters.user_changed(user, {**user, 'is_active': False}, db)
+        admin_stats.invalidate()
         
         return jsonify({'success': True, 'message': 'User deactivated successfully'})
     except Exception as e:
@@ -132,6 +142,8 @@ def create_employee(current_user):
         employee = User.create(data)
         employee['is_verified'] = True
         result = db.users.insert_one(employee)
+        stats_counters.user_created(employee, db)
+        admin_stats.invalidate()
         
         return jsonify({
             'success': True,
@@ -147,20 +159,52 @@ def create_employee(current_user):
 def get_stats(current_user):
     """Get system statistics"""
     try:
-        db = get_db()
+        return jsonify({'success': True, 'stats': admin_stats.get()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/admin/stats/reconcile', methods=['POST'])
+@role_required(User.ROLE_ADMIN)
+def reconcile_stats(current_user):
+    """Rebuild the materialized counters and report drift (?dry_run=1 only reports)"""
+    try:
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        report = stats_counters.rebuild(get_db(), dry_run=dry_run)
+        if not dry_run:
+            admin_stats.invalidate()
         
-        stats = {
-            'total_users': db.users.count_documents({}),
-            'active_users': db.users.count_documents({'is_active': True}),
-            'clients': db.users.count_documents({'role': User.ROLE_CLIENT}),
-            'enterprises': db.users.count_documents({'role': User.ROLE_ENTERPRISE}),
-            'employees': db.users.count_documents({'role': User.ROLE_EMPLOYEE}),
-            'total_orders': db.orders.count_documents({}),
-            'pending_orders': db.orders.count_documents({'status': 'pending'}),
-            'delivered_orders': db.orders.count_documents({'status': 'delivered'})
+        return jsonify({'success': True, 'report': report})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/admin/metrics', methods=['GET'])
+@role_required(User.ROLE_ADMIN, User.ROLE_EMPLOYEE)
+def get_metrics(current_user):
+    """Get runtime metrics of in-process caches and services"""
+    try:
+        from utils.route_cache import route_cache
+        from utils.external_services import openroute_client, openweather_client, weather_service
+        from utils.driver_index import driver_index
+        from utils.dispatcher import dispatcher
+        from utils.order_cache import order_cache
+        from utils.geofence import geofence_engine
+        from utils.websocket import broadcaster
+        
+        metrics = {
+            'route_cache': route_cache.stats(),
+            'weather_cache': weather_service.cache_stats(),
+            'driver_index': driver_index.stats(),
+            'dispatcher': dispatcher.stats(),
+            'order_state_cache': order_cache.stats(),
+            'geofences': geofence_engine.stats(),
+            'websocket': broadcaster.stats(),
+            'admin_stats': admin_stats.stats(),
+            'external_services': {
+                client.name: client.stats() for client in (openroute_client, openweather_client)
+            }
         }
         
-        return jsonify({'success': True, 'stats': stats})
+        return jsonify({'success': True, 'metrics': metrics})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
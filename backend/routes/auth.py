@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from utils.db import get_db
 from utils.auth import generate_token, token_required
+from utils.counters import stats_counters
 from models.user import User
 from email_validator import validate_email, EmailNotValidError
 
@@ -33,6 +34,7 @@ def register():
         # Create user
         user = User.create(data)
         result = db.users.insert_one(user)
+        stats_counters.user_created(user, db)
         
         # Generate token
         token = generate_token(result.inserted_id, user['role'])
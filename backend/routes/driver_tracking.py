@@ -1,10 +1,66 @@
 from flask import Blueprint, request, jsonify
+from pymongo import UpdateOne
+from config import Config
 from utils.db import get_db
-from utils.websocket import socketio
-from datetime import datetime
+from utils.websocket import emit_driver_location, emit_geofence_event
+from utils.driver_index import driver_index
+from utils.geo import to_geojson_point
+from utils.order_cache import order_cache
+from utils.counters import stats_counters
+from utils.location_history import location_history
+from utils.geofence import geofence_engine
+from datetime import datetime, timedelta, timezone
 
 driver_tracking_bp = Blueprint('driver_tracking', __name__)
 
+def parse_timestamp(value):
+    """ISO-8601 string or epoch seconds/milliseconds -> naive UTC datetime"""
+    if isinstance(value, (int, float)):
+        seconds = value / 1000 if value > 1e11 else value
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def stored_datetime(value):
+    """`value` as MongoDB stores it (millisecond precision)"""
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+def find_stale_drivers(db, latest_by_driver):
+    """
+    Drivers whose conditional position write did not match: a newer position is
+    stored, or the driver does not exist. Only read when a bulk write fell short.
+    """
+    stored = {
+        driver['driver_id']: driver.get('last_location_update')
+        for driver in db.drivers.find({'driver_id': {'$in': list(latest_by_driver)}}, {'driver_id': 1, 'last_location_update': 1})
+    }
+    return {
+        driver_id for driver_id, p in latest_by_driver.items()
+        if driver_id not in stored or (stored[driver_id] and stored[driver_id] > stored_datetime(p['timestamp']))
+    }
+
+def find_rejected_transitions(db, histories):
+    """
+    Orders whose conditional status write did not apply, recognised by their last
+    status_history entry. Only read when a bulk write fell short.
+    """
+    last_entries = {
+        order['tracking_number']: (order.get('status_history') or [None])[-1]
+        for order in db.orders.find(
+            {'tracking_number': {'$in': list(histories)}},
+            {'tracking_number': 1, 'status_history': {'$slice': -1}}
+        )
+    }
+    rejected = set()
+    for tracking_number, history in histories.items():
+        entry = last_entries.get(tracking_number)
+        expected = {**history[-1], 'timestamp': stored_datetime(history[-1]['timestamp'])}
+        if entry != expected:
+            rejected.add(tracking_number)
+    return rejected
+
 @driver_tracking_bp.route('/driver/location', methods=['POST'])
 def update_driver_location():
     """Update driver location in real-time and progress order status"""
@@ -18,6 +74,7 @@ def update_driver_location():
             return jsonify({'success': False, 'error': 'Missing required fields'}), 400
         
         db = get_db()
+        received_at = datetime.utcnow()
         
         # Update driver location in database
         db.drivers.update_one(
@@ -25,68 +82,291 @@ def update_driver_location():
             {
                 '$set': {
                     'current_location': location,
-                    'last_location_update': datetime.utcnow()
+                    'current_location_geo': to_geojson_point(location),
+                    'last_location_update': received_at
                 }
             }
         )
+        driver_index.update_location(driver_id, location)
+        location_history.record(driver_id, [(received_at, location, tracking_number)], db)
         
-        # Get order and check if status should progress
-        order = db.orders.find_one({'tracking_number': tracking_number})
+        # Check if status should progress (order state served from the in-process cache)
+        order = order_cache.get(tracking_number, db)
         if order:
-            from models.order import Order
+            current_status = order['status']
+            events, transition = geofence_engine.evaluate(order, location)
+            for fence, event in events:
+                emit_geofence_event(tracking_number, {
+                    'tracking_number': tracking_number,
+                    'driver_id': driver_id,
+                    'fence': fence,
+                    'event': event,
+                    'timestamp': received_at.isoformat()
+                })
             
-            # Calculate distance to destination
-            if order.get('recipient', {}).get('coordinates'):
-                dest_coords = order['recipient']['coordinates']
-                import math
-                
-                # Simple distance calculation (Haversine)
-                lat1, lon1 = location[0], location[1]
-                lat2, lon2 = dest_coords[0], dest_coords[1]
-                
-                R = 6371  # Earth radius in km
-                dlat = math.radians(lat2 - lat1)
-                dlon = math.radians(lon2 - lon1)
-                a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-                c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-                distance_km = R * c
-                
-                # Progress status based on distance
-                current_status = order['status']
-                new_status = None
-                message = ''
-                
-                if current_status == 'pickup_in_progress' and distance_km < 5:
-                    new_status = 'in_transit'
-                    message = 'Colis récupéré, en route vers la destination'
-                elif current_status == 'in_transit' and distance_km < 1:
-                    new_status = 'out_for_delivery'
-                    message = 'Chauffeur proche de la destination'
-                elif current_status == 'out_for_delivery' and distance_km < 0.1:
-                    new_status = 'delivered'
-                    message = 'Colis livré avec succès'
-                
-                if new_status:
-                    updated_order = Order.update_status(order, new_status, message)
-                    db.orders.update_one(
-                        {'tracking_number': tracking_number},
-                        {'$set': updated_order}
-                    )
+            if transition:
+                new_status, message = transition
+                now = datetime.utcnow()
+                # Only from the status we evaluated: the cache may be stale if another worker or an admin moved it
+                result = db.orders.update_one(
+                    {'tracking_number': tracking_number, 'status': current_status},
+                    {
+                        '$set': {'status': new_status, 'updated_at': now},
+                        '$push': {'status_history': {'status': new_status, 'timestamp': now, 'message': message}}
+                    }
+                )
+                if result.modified_count:
+                    order_cache.set_status(tracking_number, new_status)
+                    stats_counters.order_status_changed(order.get('user_id'), current_status, new_status, db)
+                    if new_status == 'delivered':
+                        geofence_engine.forget(tracking_number)
                     print(f"✅ Order {tracking_number} status updated: {current_status} → {new_status}")
+                else:
+                    order_cache.invalidate(tracking_number)
+                    geofence_engine.forget(tracking_number)
         
         # Emit real-time update via WebSocket
-        if socketio:
-            socketio.emit('driver_location_update', {
-                'tracking_number': tracking_number,
-                'driver_id': driver_id,
-                'location': location,
-                'timestamp': datetime.utcnow().isoformat()
-            }, room=tracking_number)
+        emit_driver_location(tracking_number, {
+            'tracking_number': tracking_number,
+            'driver_id': driver_id,
+            'location': location,
+            'timestamp': received_at.isoformat()
+        })
         
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@driver_tracking_bp.route('/driver/location/batch', methods=['POST'])
+def update_driver_locations_batch():
+    """
+    Ingest buffered GPS points from one or more drivers.
+    
+    Body: {'points': [{'driver_id', 'location', 'tracking_number', 'timestamp'}, ...]}
+    (driver_id / tracking_number given at the top level apply to every point).
+    Points are applied in timestamp order: each driver ends on its latest point
+    unless a newer position is already stored (such stale drivers' points only go
+    to the trail), order statuses progress through every point, and only the
+    latest position per order room is emitted. Drivers, trail and orders are
+    each written with one unordered bulk_write.
+    
+    Returns:
+        per-item results in request order: {'index', 'success', 'latest', 'status'?, 'geofence'?, 'error'?}
+    """
+    try:
+        data = request.json or {}
+        points = data.get('points')
+        if not isinstance(points, list) or not points:
+            return jsonify({'success': False, 'error': 'points must be a non-empty list'}), 400
+        if len(points) > Config.LOCATION_BATCH_MAX_POINTS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {Config.LOCATION_BATCH_MAX_POINTS} points per batch'
+            }), 413
+        
+        received_at = datetime.utcnow()
+        results = [{'index': i, 'success': False} for i in range(len(points))]
+        valid = []
+        for i, point in enumerate(points):
+            point = point if isinstance(point, dict) else {}
+            driver_id = point.get('driver_id') or data.get('driver_id')
+            location = point.get('location')
+            tracking_number = point.get('tracking_number') or data.get('tracking_number')
+            try:
+                if not driver_id or not location or len(location) < 2:
+                    raise ValueError('Missing required fields')
+                location = [float(location[0]), float(location[1])]
+                timestamp = parse_timestamp(point['timestamp']) if point.get('timestamp') is not None else received_at
+            except (TypeError, ValueError) as e:
+                results[i]['error'] = str(e)
+                continue
+            valid.append({
+                'index': i, 'driver_id': driver_id, 'location': location,
+                'tracking_number': tracking_number, 'timestamp': timestamp
+            })
+        
+        # Stable: points without a timestamp keep their request order
+        valid.sort(key=lambda p: p['timestamp'])
+        latest_by_driver = {p['driver_id']: p for p in valid}
+        latest_by_room = {p['tracking_number']: p for p in valid if p['tracking_number']}
+        
+        db = get_db()
+        stale_drivers = set()
+        if latest_by_driver:
+            # A late-flushed offline buffer must not move a driver back: the position is
+            # only written if nothing newer is stored
+            result = db.drivers.bulk_write([
+                UpdateOne(
+                    {'driver_id': driver_id, 'last_location_update': {'$not': {'$gt': p['timestamp']}}},
+                    {'$set': {
+                        'current_location': p['location'],
+                        'current_location_geo': to_geojson_point(p['location']),
+                        'last_location_update': p['timestamp']
+                    }}
+                )
+                for driver_id, p in latest_by_driver.items()
+            ], ordered=False)
+            if result.matched_count < len(latest_by_driver):
+                stale_drivers = find_stale_drivers(db, latest_by_driver)
+            for driver_id, p in latest_by_driver.items():
+                if driver_id not in stale_drivers:
+                    driver_index.update_location(driver_id, p['location'])
+            
+            # Every point goes to the trail, in one bulk_write across drivers
+            points_by_driver = {}
+            for p in valid:
+                points_by_driver.setdefault(p['driver_id'], []).append((p['timestamp'], p['location'], p['tracking_number']))
+            db[location_history.COLLECTION].bulk_write([
+                update
+                for driver_id, driver_points in points_by_driver.items()
+                for update in location_history.bucket_updates(driver_id, driver_points)
+            ], ordered=False)
+        
+        # Walk every point through the status progression (order state from the cache);
+        # positions older than what a driver already reported cannot move an order on
+        rooms = {p['tracking_number'] for p in valid if p['tracking_number'] and p['driver_id'] not in stale_drivers}
+        orders = order_cache.get_many(list(rooms), db) if rooms else {}
+        initial_status = {tracking_number: order['status'] for tracking_number, order in orders.items()}
+        transitions = {}
+        for p in valid:
+            order = orders.get(p['tracking_number']) if p['driver_id'] not in stale_drivers else None
+            if order:
+                events, transition = geofence_engine.evaluate(order, p['location'])
+                for fence, event in events:
+                    emit_geofence_event(p['tracking_number'], {
+                        'tracking_number': p['tracking_number'],
+                        'driver_id': p['driver_id'],
+                        'fence': fence,
+                        'event': event,
+                        'timestamp': p['timestamp'].isoformat()
+                    })
+                if events:
+                    results[p['index']]['geofence'] = [{'fence': fence, 'event': event} for fence, event in events]
+                if transition:
+                    new_status, message = transition
+                    order['status'] = new_status
+                    transitions.setdefault(p['tracking_number'], []).append(
+                        (p['index'], {'status': new_status, 'timestamp': p['timestamp'], 'message': message})
+                    )
+                    results[p['index']]['status'] = new_status
+            results[p['index']].update({'success': True, 'latest': False})
+        
+        # Each progressed order is written conditionally on the status the walk started
+        # from, so a stale cache cannot overwrite a newer status
+        applied = []
+        histories = {tracking_number: [entry for _, entry in steps] for tracking_number, steps in transitions.items()}
+        rejected = set()
+        if histories:
+            result = db.orders.bulk_write([
+                UpdateOne(
+                    {'tracking_number': tracking_number, 'status': initial_status[tracking_number]},
+                    {'$set': {'status': history[-1]['status'], 'updated_at': received_at},
+                     '$push': {'status_history': {'$each': history}}}
+                )
+                for tracking_number, history in histories.items()
+            ], ordered=False)
+            if result.modified_count < len(histories):
+                rejected = find_rejected_transitions(db, histories)
+        for tracking_number, steps in transitions.items():
+            history = histories[tracking_number]
+            if tracking_number in rejected:
+                order_cache.invalidate(tracking_number)
+                geofence_engine.forget(tracking_number)
+                for index, _ in steps:
+                    results[index].pop('status', None)
+                continue
+            applied.append((orders[tracking_number].get('user_id'), initial_status[tracking_number], history[-1]['status']))
+            order_cache.set_status(tracking_number, history[-1]['status'])
+            if history[-1]['status'] == 'delivered':
+                geofence_engine.forget(tracking_number)
+            print(f"✅ Order {tracking_number} status updated: → {' → '.join(h['status'] for h in history)}")
+        if applied:
+            stats_counters.order_transitions(applied, db)
+        
+        for driver_id, p in latest_by_driver.items():
+            results[p['index']]['latest'] = driver_id not in stale_drivers
+        for tracking_number, p in latest_by_room.items():
+            if p['driver_id'] in stale_drivers:
+                continue
+            emit_driver_location(tracking_number, {
+                'tracking_number': tracking_number,
+                'driver_id': p['driver_id'],
+                'location': p['location'],
+                'timestamp': p['timestamp'].isoformat()
+            })
+        
+        return jsonify({
+            'success': True,
+            'accepted': len(valid),
+            'rejected': len(points) - len(valid),
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def history_range(args):
+    """
+    [from, to) of a history query: ?from= / ?to= (ISO-8601 or epoch), default the last 24 hours.
+    Raises ValueError for a reversed or too long range.
+    """
+    end = parse_timestamp(args['to']) if args.get('to') else datetime.utcnow()
+    start = parse_timestamp(args['from']) if args.get('from') else end - timedelta(hours=24)
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+    if end - start > timedelta(hours=Config.LOCATION_HISTORY_MAX_RANGE_HOURS):
+        raise ValueError(f'Range is limited to {Config.LOCATION_HISTORY_MAX_RANGE_HOURS} hours')
+    return start, end
+
+def serialize_trail(points, with_orders=True):
+    """Packed trail: one [iso timestamp, lat, lng(, tracking_number)] row per point"""
+    if with_orders:
+        return [[t.isoformat(), lat, lng, order] for t, lat, lng, order in points]
+    return [[t.isoformat(), lat, lng] for t, lat, lng, _ in points]
+
+@driver_tracking_bp.route('/driver/<driver_id>/history', methods=['GET'])
+def get_driver_history(driver_id):
+    """GPS trail of a driver over a time range (single indexed read)"""
+    try:
+        try:
+            start, end = history_range(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        points = location_history.trail(start, end, driver_id=driver_id)
+        return jsonify({
+            'success': True,
+            'driver_id': driver_id,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'count': len(points),
+            'fields': ['timestamp', 'lat', 'lng', 'tracking_number'],
+            'points': serialize_trail(points)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@driver_tracking_bp.route('/order/<tracking_number>/history', methods=['GET'])
+def get_order_history(tracking_number):
+    """GPS trail recorded while drivers reported positions for an order"""
+    try:
+        try:
+            start, end = history_range(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        points = location_history.trail(start, end, tracking_number=tracking_number)
+        return jsonify({
+            'success': True,
+            'tracking_number': tracking_number,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'count': len(points),
+            'fields': ['timestamp', 'lat', 'lng'],
+            'points': serialize_trail(points, with_orders=False)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @driver_tracking_bp.route('/driver/<driver_id>/location', methods=['GET'])
 def get_driver_location(driver_id):
     """Get current driver location"""
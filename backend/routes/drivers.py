@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from utils.db import get_db
 from utils.auth import role_required
+from utils.driver_index import driver_index
+from utils.geo import drivers_near
 from models.driver import Driver
 from models.user import User
 
@@ -16,6 +18,7 @@ def get_all_drivers(current_user):
         if db.drivers.count_documents({}) == 0:
             default_drivers = Driver.get_default_drivers()
             db.drivers.insert_many(default_drivers)
+            driver_index.load()
         
         driver_type = request.args.get('type')
         city = request.args.get('city')
@@ -73,6 +76,7 @@ def assign_order_to_driver(current_user, driver_id):
                 '$set': {'status': 'on_route'}
             }
         )
+        driver_index.update_status(driver_id, 'on_route')
         
         return jsonify({'success': True, 'message': 'Order assigned to driver'})
     except Exception as e:
@@ -103,6 +107,32 @@ def get_available_drivers(current_user):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@drivers_bp.route('/drivers/nearby', methods=['GET'])
+@role_required(User.ROLE_ADMIN, User.ROLE_EMPLOYEE)
+def get_nearby_drivers(current_user):
+    """Available drivers within radius_km of a point, closest first (2dsphere index)"""
+    try:
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        if lat is None or lng is None:
+            return jsonify({'success': False, 'error': 'lat and lng are required'}), 400
+        
+        drivers = drivers_near(
+            [lat, lng],
+            max_km=request.args.get('radius_km', 5, type=float),
+            driver_type=request.args.get('type'),
+            status=request.args.get('status', 'available'),
+            city=request.args.get('city'),
+            limit=min(request.args.get('limit', 20, type=int), 100)
+        )
+        
+        return jsonify({
+            'success': True,
+            'drivers': [serialize_driver(d) for d in drivers]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 def serialize_driver(driver):
     if '_id' in driver:
         driver['_id'] = str(driver['_id'])
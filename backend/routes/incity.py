@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from utils.external_services import RouteService, WeatherService, TrafficService
+from utils.external_services import route_service, weather_service, traffic_service
 from datetime import datetime
 import math
 
@@ -40,7 +40,6 @@ def calculate_incity_route():
             return jsonify({'success': False, 'error': 'Missing coordinates'}), 400
         
         # Get route from OpenRouteService
-        route_service = RouteService()
         route_result = route_service.get_route(sender_coords, recipient_coords)
         
         if not route_result.get('success'):
@@ -61,7 +60,6 @@ def calculate_incity_route():
             print(f"First 3 points: {geometry[:3]}")
         
         # Get current traffic conditions
-        traffic_service = TrafficService()
         traffic_data = traffic_service.get_traffic_conditions(city)
         traffic_level = traffic_data['level']
         traffic_delay = traffic_data['delay_minutes']
@@ -69,8 +67,7 @@ def calculate_incity_route():
         # Adjust duration based on traffic
         adjusted_duration = duration_minutes + traffic_delay
         
-        # Get weather conditions
-        weather_service = WeatherService()
+        # Get weather conditions (served from the per-city cache)
         weather_data = weather_service.get_weather(city)
         
         # Calculate cost
@@ -1,9 +1,20 @@
+import math
 from flask import Blueprint, request, jsonify
+from bson import ObjectId
+from pymongo import ReturnDocument
+from config import Config
 from utils.db import get_db
 from utils.auth import role_required
-from utils.route_optimizer import optimize_delivery_route, calculate_total_distance
+from utils.driver_index import driver_index
+from utils.order_cache import order_cache
+from utils.counters import stats_counters
+from utils.route_optimizer import (
+    build_distance_matrix, nearest_neighbor_tour, improve_tour, plan_capacitated_routes,
+    sequence_with_time_windows, tour_length, URGENCY_PRIORITIES
+)
 from models.user import User
 from models.warehouse import Warehouse
+from datetime import datetime, timedelta, timezone
 
 intercity_bp = Blueprint('intercity', __name__)
 
@@ -13,26 +24,48 @@ def optimize_intercity_route(current_user):
     """
     Optimize delivery route for inter-city truck.
     Truck starts from destination city warehouse, visits all clients, returns to warehouse.
+    The nearest-neighbor tour is refined with 2-opt / Or-opt (optionally 3-opt)
+    within `time_budget_ms`; set `improve: false` to get the raw construction tour.
+    
+    With `mode: 'cvrp'` the orders are split across several trucks (`truck_ids`,
+    or every available inter-city truck) so that no truck exceeds its capacity_kg.
+    
+    With `mode: 'time_windows'` stops are sequenced by package urgency and
+    per-stop windows (`time_windows: {order_id: {earliest, latest}}`, defaulting
+    to each order's estimated_delivery as the deadline), and the response
+    includes predicted arrival and lateness per stop.
     """
     try:
         data = request.json
         destination_city = data.get('destination_city')
         order_ids = data.get('order_ids', [])
+        mode = data.get('mode', 'single')
+        improve = data.get('improve', True)
+        use_3opt = bool(data.get('use_3opt', False))
         
         if not destination_city or not order_ids:
             return jsonify({'success': False, 'error': 'Missing required fields'}), 400
         
+        try:
+            time_budget_ms = _number_param(data, 'time_budget_ms', Config.ROUTE_IMPROVEMENT_BUDGET_MS)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if mode not in ('single', 'cvrp', 'time_windows'):
+            return jsonify({'success': False, 'error': f'Unknown mode: {mode}'}), 400
+        
         db = get_db()
         
         # Get warehouse coordinates
-        warehouse = Warehouse.get_by_city(destination_city)
+        warehouse = Warehouse.get_warehouse_by_city(destination_city)
         if not warehouse:
             return jsonify({'success': False, 'error': 'Warehouse not found'}), 404
         
         warehouse_coords = warehouse['coordinates']
         
         # Get all orders with their delivery coordinates
-        orders = list(db.orders.find({'_id': {'$in': order_ids}}))
+        object_ids = [ObjectId(oid) if ObjectId.is_valid(oid) else oid for oid in order_ids]
+        orders = list(db.orders.find({'_id': {'$in': object_ids}}))
         
         delivery_points = []
         for order in orders:
@@ -42,28 +75,175 @@ def optimize_intercity_route(current_user):
                     'tracking_number': order['tracking_number'],
                     'coordinates': tuple(order['recipient']['coordinates']),
                     'address': order['recipient']['address'],
-                    'recipient_name': order['recipient']['name']
+                    'recipient_name': order['recipient']['name'],
+                    'weight': float(order.get('package', {}).get('weight') or 0),
+                    'urgency': order.get('package', {}).get('urgency', 'normal'),
+                    'estimated_delivery': order.get('estimated_delivery')
                 })
         
-        # Optimize route
-        optimized_route = optimize_delivery_route(warehouse_coords, delivery_points)
-        total_distance = calculate_total_distance(warehouse_coords, optimized_route)
+        # One distance matrix shared by construction, improvement and scoring
+        matrix = build_distance_matrix(warehouse_coords, delivery_points)
+        budget_s = time_budget_ms / 1000 if improve else 0
+        warehouse_info = {
+            'city': destination_city,
+            'coordinates': warehouse_coords
+        }
+        
+        if mode == 'cvrp':
+            return _optimize_fleet_routes(db, data, warehouse_info, delivery_points, matrix, budget_s, use_3opt)
+        if mode == 'time_windows':
+            return _sequence_time_windows(data, warehouse_info, delivery_points, matrix)
+        
+        tour = nearest_neighbor_tour(matrix)
+        tour, improvement = improve_tour(matrix, tour, time_budget_s=budget_s, use_3opt=use_3opt)
+        optimized_route = [delivery_points[i - 1] for i in tour[1:]]
+        total_distance = improvement['total_distance_km']
         
         return jsonify({
             'success': True,
             'route': {
-                'warehouse': {
-                    'city': destination_city,
-                    'coordinates': warehouse_coords
-                },
+                'warehouse': warehouse_info,
                 'delivery_points': optimized_route,
-                'total_distance_km': round(total_distance, 2),
+                'total_distance_km': total_distance,
+                'initial_distance_km': improvement['initial_distance_km'],
                 'estimated_time_hours': round(total_distance / 50, 1)  # Assuming 50 km/h average
-            }
+            },
+            'improvement': improvement
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _number_param(data, name, default, minimum=0.0):
+    """
+    Finite number >= minimum from the request body (default when absent).
+
+    Raises:
+        ValueError: the value is not a number or is below minimum
+    """
+    value = data.get(name)
+    if value is None:
+        return float(default)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if isinstance(value, bool) or not math.isfinite(number):
+        raise ValueError(f'{name} must be a number')
+    if number < minimum:
+        raise ValueError(f'{name} must be at least {minimum:g}')
+    return number
+
+def _optimize_fleet_routes(db, data, warehouse_info, delivery_points, matrix, budget_s, use_3opt):
+    """CVRP mode: capacity-feasible tours for several inter-city trucks"""
+    truck_query = {'driver_type': 'inter_city'}
+    if data.get('truck_ids'):
+        truck_query['driver_id'] = {'$in': data['truck_ids']}
+    else:
+        truck_query['status'] = 'available'
+    
+    trucks = [t for t in db.drivers.find(truck_query) if t.get('vehicle', {}).get('capacity_kg')]
+    if not trucks:
+        return jsonify({'success': False, 'error': 'No inter-city trucks available'}), 404
+    
+    demands = [0] + [p['weight'] for p in delivery_points]
+    capacities = [float(t['vehicle']['capacity_kg']) for t in trucks]
+    tours, unassigned = plan_capacitated_routes(matrix, demands, capacities)
+    
+    # Split the improvement budget evenly across the trucks in use
+    used = [v for v, tour in enumerate(tours) if tour]
+    routes = []
+    for v in used:
+        tour, improvement = improve_tour(matrix, tours[v], time_budget_s=budget_s / len(used), use_3opt=use_3opt)
+        distance = improvement['total_distance_km']
+        routes.append({
+            'truck_id': trucks[v]['driver_id'],
+            'capacity_kg': capacities[v],
+            'load_kg': round(sum(demands[i] for i in tour[1:]), 2),
+            'delivery_points': [delivery_points[i - 1] for i in tour[1:]],
+            'total_distance_km': distance,
+            'initial_distance_km': improvement['initial_distance_km'],
+            'estimated_time_hours': round(distance / 50, 1),
+            'improvement': improvement
+        })
+    
+    return jsonify({
+        'success': True,
+        'mode': 'cvrp',
+        'warehouse': warehouse_info,
+        'routes': routes,
+        'unassigned': [delivery_points[i - 1] for i in unassigned],
+        'trucks_used': len(routes),
+        'total_distance_km': round(sum(r['total_distance_km'] for r in routes), 2)
+    })
+
+def _parse_time(value):
+    """ISO string or datetime -> naive UTC datetime (the format stored on orders)"""
+    if not value:
+        return None
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def _sequence_time_windows(data, warehouse_info, delivery_points, matrix):
+    """Time-window mode: urgency-aware sequence with predicted arrivals"""
+    windows = data.get('time_windows') or {}
+    
+    def minutes_from_departure(value, default):
+        moment = _parse_time(value)
+        return (moment - departure).total_seconds() / 60 if moment else default
+    
+    try:
+        departure = _parse_time(data.get('departure_time')) or datetime.utcnow()
+        speed_kmh = _number_param(data, 'speed_kmh', 50)
+        if not speed_kmh:
+            raise ValueError('speed_kmh must be positive')
+        service_minutes = _number_param(data, 'service_minutes', 5)
+        budget_ms = _number_param(data, 'time_budget_ms', Config.SEQUENCING_BUDGET_MS)
+        
+        earliest, latest, priorities = [0.0], [float('inf')], [1.0]
+        for point in delivery_points:
+            window = windows.get(point['order_id']) or windows.get(point['tracking_number']) or {}
+            earliest.append(max(0.0, minutes_from_departure(window.get('earliest'), 0.0)))
+            latest.append(minutes_from_departure(window.get('latest') or point['estimated_delivery'], float('inf')))
+            priorities.append(URGENCY_PRIORITIES.get(point['urgency'], 1.0))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Invalid time window parameters: {e}'}), 400
+    
+    tour, schedule = sequence_with_time_windows(
+        matrix, earliest, latest, priorities,
+        speed_kmh=speed_kmh,
+        service_minutes=service_minutes,
+        time_budget_s=budget_ms / 1000
+    )
+    
+    stops = []
+    for pos, index in enumerate(tour[1:], start=1):
+        stops.append({
+            **delivery_points[index - 1],
+            'sequence': pos,
+            'predicted_arrival': (departure + timedelta(minutes=schedule['arrival'][pos])).isoformat(),
+            'service_start': (departure + timedelta(minutes=schedule['start'][pos])).isoformat(),
+            'lateness_minutes': round(schedule['lateness'][pos], 1),
+            'on_time': schedule['lateness'][pos] == 0
+        })
+    
+    total_distance = tour_length(matrix, tour)
+    return jsonify({
+        'success': True,
+        'mode': 'time_windows',
+        'route': {
+            'warehouse': warehouse_info,
+            'delivery_points': stops,
+            'departure_time': departure.isoformat(),
+            'return_time': (departure + timedelta(minutes=schedule['end'])).isoformat(),
+            'total_distance_km': round(total_distance, 2),
+            'estimated_time_hours': round(schedule['end'] / 60, 1),
+            'late_stops': sum(1 for stop in stops if not stop['on_time']),
+            'total_lateness_minutes': round(sum(schedule['lateness']), 1)
+        }
+    })
+
 @intercity_bp.route('/intercity/assign-truck', methods=['POST'])
 @role_required(User.ROLE_ADMIN, User.ROLE_EMPLOYEE)
 def assign_intercity_truck(current_user):
@@ -101,17 +281,27 @@ def assign_intercity_truck(current_user):
                 }
             }
         )
+        driver_index.update_status(truck_id, 'on_route')
         
-        # Update all orders with assigned truck
-        db.orders.update_many(
-            {'_id': {'$in': order_ids}},
-            {
-                '$set': {
-                    'assigned_intercity_driver': truck_id,
-                    'status': 'in_transit'
-                }
-            }
-        )
+        # Update all orders with assigned truck; each write returns the status it
+        # replaced, so the counters move from the status actually overwritten
+        previous = []
+        for order_id in order_ids:
+            order = db.orders.find_one_and_update(
+                {'_id': order_id},
+                {
+                    '$set': {
+                        'assigned_intercity_driver': truck_id,
+                        'status': 'in_transit'
+                    }
+                },
+                projection={'tracking_number': 1, 'user_id': 1, 'status': 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            if order:
+                previous.append(order)
+        order_cache.invalidate(*[order['tracking_number'] for order in previous])
+        stats_counters.order_transitions([(order.get('user_id'), order['status'], 'in_transit') for order in previous], db)
         
         return jsonify({
             'success': True,
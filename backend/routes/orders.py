@@ -1,18 +1,71 @@
 from flask import Blueprint, request, jsonify
 from bson import ObjectId
+from concurrent.futures import ThreadPoolExecutor, wait
+import time
+from config import Config
 from utils.db import get_db
 from utils.websocket import emit_order_update
+from utils.dispatch import claim_pickup_driver
+from utils.dispatcher import dispatcher
+from utils.order_cache import order_cache
+from utils.geo import orders_in_box
+from utils.pagination import keyset_page, page_size
+from utils.order_views import view_request, order_projection
+from utils.stats import user_order_stats
+from utils.counters import stats_counters
+from utils.auth import role_required
+from models.user import User
 from utils.external_services import route_service, weather_service, traffic_service
+from utils.geometry import (
+    encode_route_levels, compact_route, geometry_request, expand_order_geometry
+)
 from models.order import Order
 from datetime import datetime, timedelta
 
-def get_delivery_insights(order_data, route_svc, weather_svc, traffic_svc):
+# Bounded pool for concurrent external lookups (route / weather / traffic)
+_lookup_pool = ThreadPoolExecutor(max_workers=Config.INSIGHTS_WORKERS, thread_name_prefix='insights')
+
+def fan_out(calls, deadline_seconds):
+    """
+    Run independent lookups concurrently under one shared deadline.
+    
+    Args:
+        calls: {name: (fn, fallback)}; fallback() is used if fn raises or misses the deadline
+    
+    Returns:
+        (results by name, list of names that fell back)
+    """
+    futures = {name: _lookup_pool.submit(fn) for name, (fn, _) in calls.items()}
+    wait(futures.values(), timeout=deadline_seconds)
+    
+    results, degraded = {}, []
+    for name, future in futures.items():
+        try:
+            if not future.done():
+                future.cancel()
+                raise TimeoutError(f'{name} lookup missed the {deadline_seconds}s deadline')
+            results[name] = future.result()
+        except Exception as e:
+            print(f"⚠️ Degrading {name}: {e}")
+            results[name] = calls[name][1]()
+            degraded.append(name)
+    return results, degraded
+
+def get_delivery_insights(order_data, route_svc, weather_svc, traffic_svc, deadline_seconds=None):
     origin = order_data['sender']['city']
     destination = order_data['recipient']['city']
     
-    route_info = route_svc.get_route(origin, destination)
-    weather_info = weather_svc.get_weather(destination)
-    traffic_info = traffic_svc.get_traffic_status(origin)
+    results, degraded = fan_out({
+        'route': (lambda: route_svc.get_route(origin, destination),
+                  lambda: route_svc._get_mock_route(origin, destination)),
+        'weather': (lambda: weather_svc.get_weather(destination),
+                    lambda: weather_svc._get_mock_weather(destination)),
+        'traffic': (lambda: traffic_svc.get_traffic_status(origin),
+                    lambda: {'city': origin, 'status': 'unknown', 'delay_factor': 1.0, 'source': 'unavailable'})
+    }, deadline_seconds or Config.INSIGHTS_DEADLINE_SECONDS)
+    route_info = results['route']
+    weather_info = results['weather']
+    traffic_info = results['traffic']
     
     base_duration = route_info['duration_minutes']
     adjusted_duration = base_duration * traffic_info['delay_factor']
@@ -31,7 +84,8 @@ def get_delivery_insights(order_data, route_svc, weather_svc, traffic_svc):
         'traffic': traffic_info,
         'estimated_delivery_minutes': round(adjusted_duration),
         'warnings': warnings,
-        'recommended_vehicle': 'van' if order_data['package']['weight'] > 10 else 'motorcycle'
+        'recommended_vehicle': 'van' if order_data['package']['weight'] > 10 else 'motorcycle',
+        'degraded_sources': degraded
     }
 
 orders_bp = Blueprint('orders', __name__)
@@ -65,17 +119,32 @@ def create_order():
         print(f"Sender coords: {data.get('sender', {}).get('coordinates')}")
         print(f"Recipient coords: {data.get('recipient', {}).get('coordinates')}")
         
+        lookups_started = time.monotonic()
+        in_city_route = None
         if (order['delivery_type'] == 'in_city' and 
             data.get('sender', {}).get('coordinates') and 
             data.get('recipient', {}).get('coordinates')):
             
             print(f"📍 Calculating route for in-city order...")
             
-            # Get real route with coordinates
-            route_result = route_service.get_route(
+            # Get real route with coordinates (runs alongside the insights lookups)
+            in_city_route = _lookup_pool.submit(
+                route_service.get_route,
                 data['sender']['coordinates'],
                 data['recipient']['coordinates']
             )
+        else:
+            print(f"⚠️ Skipping route calculation - not in-city or missing coordinates")
+        
+        # Get delivery insights
+        insights = get_delivery_insights(data, route_service, weather_service, traffic_service)
+        
+        if in_city_route:
+            remaining = Config.INSIGHTS_DEADLINE_SECONDS - (time.monotonic() - lookups_started)
+            try:
+                route_result = in_city_route.result(timeout=max(remaining, 0))
+            except Exception as e:
+                route_result = {'success': False, 'error': str(e) or 'route lookup timed out'}
             
             print(f"Route result success: {route_result.get('success')}")
             print(f"Route distance: {route_result.get('distance_km')}")
@@ -84,31 +153,24 @@ def create_order():
             if route_result.get('success'):
                 order['route_distance_km'] = route_result.get('distance_km', 0)
                 order['route_duration_minutes'] = route_result.get('duration_minutes', 0)
-                order['route_geometry'] = route_result.get('geometry', [])
+                order.update(encode_route_levels(route_result.get('geometry')))
                 print(f"✅ Route saved to order: distance={order['route_distance_km']}, duration={order['route_duration_minutes']}")
             else:
                 print(f"⚠️ Route calculation failed: {route_result.get('error')}")
-        else:
-            print(f"⚠️ Skipping route calculation - not in-city or missing coordinates")
         print(f"=== END DEBUG ===\n")
         
-        # Get delivery insights
-        insights = get_delivery_insights(data, route_service, weather_service, traffic_service)
-        
-        # Add insights to order
-        order['delivery_insights'] = insights
+        # Add insights to order (route geometry stored encoded)
+        order['delivery_insights'] = {**insights, 'route': compact_route(insights['route'])}
         order['estimated_delivery'] = (datetime.utcnow() + timedelta(minutes=insights['estimated_delivery_minutes'])).isoformat()
         
         db = get_db()
         
-        # Auto-assign driver for in-city orders
-        if order['delivery_type'] == 'in_city':
-            # Find available pickup driver in sender city
-            driver = db.drivers.find_one({
-                'driver_type': 'pickup',
-                'city': data['sender']['city'],
-                'status': 'available'
-            })
+        # Auto-assign driver for in-city orders (batch mode: left to the dispatcher)
+        if order['delivery_type'] == 'in_city' and Config.DISPATCH_MODE != 'batch':
+            # Atomically claim the nearest available pickup driver in sender city
+            driver = claim_pickup_driver(
+                db, data['sender']['city'], data['sender'].get('coordinates'), order['tracking_number']
+            )
             
             if driver:
                 order['assigned_pickup_driver'] = driver['driver_id']
@@ -118,15 +180,14 @@ def create_order():
                     'timestamp': datetime.utcnow(),
                     'message': f"Chauffeur {driver['name']} en route pour ramassage"
                 })
-                
-                # Update driver status
-                db.drivers.update_one(
-                    {'driver_id': driver['driver_id']},
-                    {'$set': {'status': 'on_route'}, '$push': {'assigned_orders': str(order['tracking_number'])}}
-                )
         
         result = db.orders.insert_one(order)
+        stats_counters.order_created(order, db)
         order['_id'] = str(result.inserted_id)
+        order_cache.prime(order)
+        
+        if order['delivery_type'] == 'in_city' and Config.DISPATCH_MODE == 'batch':
+            dispatcher.submit(order)
         
         print(f"✅ Order created: {order['tracking_number']}")
         print(f"Route data in order: distance={order.get('route_distance_km')}, duration={order.get('route_duration_minutes')}")
@@ -167,11 +228,21 @@ def get_orders():
         if user_id and user_role in ['client', 'enterprise']:
             query['user_id'] = user_id
         
-        orders = list(db.orders.find(query).sort('created_at', -1))
+        # ?status=in_transit or a comma-separated list (e.g. every active status)
+        statuses = [status for status in request.args.get('status', '').split(',') if status]
+        if statuses:
+            query['status'] = statuses[0] if len(statuses) == 1 else {'$in': statuses}
+        
+        geometry = geometry_request(request.args)
+        projection = order_projection(view_request(request.args), geometry)
+        orders, page = keyset_page(db.orders, query, request.args.get('cursor'), page_size(request.args), projection)
         return jsonify({
             'success': True,
-            'orders': [serialize_order(order) for order in orders]
+            'orders': [serialize_order(order, geometry) for order in orders],
+            'page': page
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -193,27 +264,58 @@ def get_my_orders():
         
         # Get query parameters for filtering
         status = request.args.get('status')
-        limit = int(request.args.get('limit', 50))
         
         query = {'user_id': payload['user_id']}
         if status:
             query['status'] = status
         
-        orders = list(db.orders.find(query).sort('created_at', -1).limit(limit))
+        geometry = geometry_request(request.args)
+        projection = order_projection(view_request(request.args), geometry)
+        orders, page = keyset_page(db.orders, query, request.args.get('cursor'), page_size(request.args), projection)
         
-        # Get statistics
-        stats = {
-            'total': db.orders.count_documents({'user_id': payload['user_id']}),
-            'pending': db.orders.count_documents({'user_id': payload['user_id'], 'status': 'pending'}),
-            'in_transit': db.orders.count_documents({'user_id': payload['user_id'], 'status': 'in_transit'}),
-            'delivered': db.orders.count_documents({'user_id': payload['user_id'], 'status': 'delivered'})
-        }
+        # Get statistics (one aggregation over the user's orders)
+        stats = user_order_stats(payload['user_id'], db)
         
         return jsonify({
             'success': True,
-            'orders': [serialize_order(order) for order in orders],
+            'orders': [serialize_order(order, geometry) for order in orders],
+            'page': page,
             'stats': stats
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@orders_bp.route('/orders/in-box', methods=['GET'])
+@role_required(User.ROLE_ADMIN, User.ROLE_EMPLOYEE)
+def get_orders_in_box(current_user):
+    """Active orders whose pickup/drop-off lies inside a bounding box (2dsphere index)"""
+    try:
+        corners = [request.args.get(k, type=float) for k in ('sw_lat', 'sw_lng', 'ne_lat', 'ne_lng')]
+        if any(c is None for c in corners):
+            return jsonify({'success': False, 'error': 'sw_lat, sw_lng, ne_lat and ne_lng are required'}), 400
+        
+        field = request.args.get('field', 'recipient')
+        if field not in ('sender', 'recipient'):
+            return jsonify({'success': False, 'error': 'field must be sender or recipient'}), 400
+        
+        statuses = request.args.get('status')
+        geometry = geometry_request(request.args)
+        orders = orders_in_box(
+            corners[:2], corners[2:],
+            field=field,
+            statuses=statuses.split(',') if statuses else None,
+            limit=min(request.args.get('limit', 200, type=int), 1000),
+            projection=order_projection(view_request(request.args), geometry)
+        )
+        
+        return jsonify({
+            'success': True,
+            'orders': [serialize_order(order, geometry) for order in orders]
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -221,10 +323,14 @@ def get_my_orders():
 def get_order(order_id):
     try:
         db = get_db()
-        order = db.orders.find_one({'_id': ObjectId(order_id)})
+        geometry = geometry_request(request.args)
+        projection = order_projection(view_request(request.args, default='full'), geometry)
+        order = db.orders.find_one({'_id': ObjectId(order_id)}, projection)
         if not order:
             return jsonify({'success': False, 'error': 'Order not found'}), 404
-        return jsonify({'success': True, 'order': serialize_order(order)})
+        return jsonify({'success': True, 'order': serialize_order(order, geometry)})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -238,6 +344,7 @@ def update_order(order_id):
         if not order:
             return jsonify({'success': False, 'error': 'Order not found'}), 404
         
+        previous_status = order['status']
         updated_order = Order.update_status(
             order,
             data.get('status', order['status']),
@@ -245,7 +352,16 @@ def update_order(order_id):
             data.get('agent_id')
         )
         
-        db.orders.update_one({'_id': ObjectId(order_id)}, {'$set': updated_order})
+        # Only if nobody (e.g. a GPS-driven transition) moved the status meanwhile,
+        # so the counters leave the status that was actually replaced
+        result = db.orders.update_one(
+            {'_id': ObjectId(order_id), 'status': previous_status},
+            {'$set': updated_order}
+        )
+        order_cache.invalidate(order['tracking_number'])
+        if not result.matched_count:
+            return jsonify({'success': False, 'error': 'Order status changed meanwhile, reload and retry'}), 409
+        stats_counters.order_status_changed(order.get('user_id'), previous_status, updated_order['status'], db)
         
         # Emit WebSocket update
         emit_order_update(order['tracking_number'], serialize_order(updated_order))
@@ -258,9 +374,14 @@ def update_order(order_id):
 def delete_order(order_id):
     try:
         db = get_db()
-        result = db.orders.delete_one({'_id': ObjectId(order_id)})
-        if result.deleted_count == 0:
+        deleted = db.orders.find_one_and_delete(
+            {'_id': ObjectId(order_id)},
+            {'tracking_number': 1, 'user_id': 1, 'status': 1}
+        )
+        if not deleted:
             return jsonify({'success': False, 'error': 'Order not found'}), 404
+        order_cache.invalidate(deleted['tracking_number'])
+        stats_counters.order_deleted(deleted, db)
         return jsonify({'success': True, 'message': 'Order deleted'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -283,17 +404,24 @@ def get_order_insights(order_id):
 @orders_bp.route('/orders/route/<origin>/<destination>', methods=['GET'])
 def get_route_geometry(origin, destination):
     try:
-        route_info = route_service.get_route(origin, destination)
+        # Optional ?zoom= / ?tolerance= picks the matching precomputed simplification level
+        try:
+            tolerance = geometry_request(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        route_info = route_service.get_route(origin, destination, tolerance_m=tolerance or None)
+        
         return jsonify({'success': True, 'route': route_info})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def serialize_order(order):
+def serialize_order(order, geometry=None):
+    expand_order_geometry(order, geometry)
     order['_id'] = str(order['_id'])
-    order['created_at'] = order['created_at'].isoformat()
-    order['updated_at'] = order['updated_at'].isoformat()
-    for history in order['status_history']:
+    # Fields outside the requested view are simply absent
+    for field in ('created_at', 'updated_at', 'estimated_delivery'):
+        if isinstance(order.get(field), datetime):
+            order[field] = order[field].isoformat()
+    for history in order.get('status_history', []):
         history['timestamp'] = history['timestamp'].isoformat()
-    if 'estimated_delivery' in order and isinstance(order['estimated_delivery'], datetime):
-        order['estimated_delivery'] = order['estimated_delivery'].isoformat()
     return order
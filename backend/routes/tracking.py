@@ -1,11 +1,16 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 from utils.db import get_db
+from utils.geometry import encode_route_levels, geometry_request, expand_order_geometry
 
 tracking_bp = Blueprint('tracking', __name__)
 
 @tracking_bp.route('/tracking/<tracking_number>', methods=['GET'])
 def track_order(tracking_number):
     try:
+        try:
+            geometry = geometry_request(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         db = get_db()
         order = db.orders.find_one({'tracking_number': tracking_number})
         
@@ -29,7 +34,8 @@ def track_order(tracking_number):
             if route_result.get('success'):
                 order['route_distance_km'] = route_result.get('distance_km', 0)
                 order['route_duration_minutes'] = route_result.get('duration_minutes', 0)
-                order['route_geometry'] = route_result.get('geometry', [])
+                route_levels = encode_route_levels(route_result.get('geometry'))
+                order.update(route_levels)
                 
                 # Update in database
                 db.orders.update_one(
@@ -37,7 +43,7 @@ def track_order(tracking_number):
                     {'$set': {
                         'route_distance_km': order['route_distance_km'],
                         'route_duration_minutes': order['route_duration_minutes'],
-                        'route_geometry': order['route_geometry']
+                        **route_levels
                     }}
                 )
                 print(f"✅ Route calculated and saved: {order['route_distance_km']}km, {order['route_duration_minutes']}min")
@@ -49,7 +55,7 @@ def track_order(tracking_number):
         
         response = {
             'success': True,
-            'order': serialize_tracking_order(order),
+            'order': serialize_tracking_order(order, geometry),
             'agent': serialize_agent(agent) if agent else None
         }
         
@@ -57,7 +63,8 @@ def track_order(tracking_number):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def serialize_tracking_order(order):
+def serialize_tracking_order(order, geometry=None):
+    expand_order_geometry(order, geometry)
     order['_id'] = str(order['_id'])
     order['created_at'] = order['created_at'].isoformat()
     order['updated_at'] = order['updated_at'].isoformat()
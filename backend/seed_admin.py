@@ -4,6 +4,7 @@ Run this once: python seed_admin.py
 """
 from utils.db import init_db, get_db
 from models.user import User
+from utils.counters import stats_counters
 
 def create_initial_admin():
     init_db()
@@ -27,6 +28,7 @@ def create_initial_admin():
     admin['is_verified'] = True
     
     result = db.users.insert_one(admin)
+    stats_counters.user_created(admin, db)
     
     print("✅ Admin user created successfully!")
     print(f"📧 Email: {admin['email']}")
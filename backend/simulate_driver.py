@@ -44,7 +44,7 @@ if __name__ == '__main__':
     
     # Get order details to fetch route
     try:
-        response = requests.get(f'http://localhost:5000/api/tracking/{tracking_number}')
+        response = requests.get(f'http://localhost:5000/api/tracking/{tracking_number}', params={'geometry': 1})
         if response.status_code == 200:
             order = response.json()['order']
             
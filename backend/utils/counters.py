@@ -0,0 +1,204 @@
+import argparse
+from datetime import datetime
+from pymongo import UpdateOne, ReplaceOne
+from utils.db import get_db
+
+class StatsCounters:
+    """
+    Materialized order and user counters, maintained with $inc next to every
+    write that changes them, so dashboards read a couple of small documents
+    instead of counting collections:
+
+        {_id: 'orders', total, by_status: {status: n}}
+        {_id: 'orders:<user_id>', total, by_status: {status: n}}
+        {_id: 'users', total, active, by_role: {role: n}}
+
+    rebuild() recomputes every counter from the collections and reports drift.
+    """
+
+    COLLECTION = 'counters'
+    ORDERS = 'orders'
+    USERS = 'users'
+
+    @staticmethod
+    def user_key(user_id):
+        return f'orders:{user_id}'
+
+    # --- incremental updates -----------------------------------------------
+
+    def order_created(self, order, db=None):
+        self._apply(self._order_deltas(order.get('user_id'), {'total': 1, f"by_status.{order['status']}": 1}), db)
+
+    def order_deleted(self, order, db=None):
+        self._apply(self._order_deltas(order.get('user_id'), {'total': -1, f"by_status.{order['status']}": -1}), db)
+
+    def order_status_changed(self, user_id, old_status, new_status, db=None):
+        self.order_transitions([(user_id, old_status, new_status)], db)
+
+    def order_transitions(self, transitions, db=None):
+        """
+        Apply several status changes in one bulk_write.
+
+        Args:
+            transitions: iterable of (user_id, old_status, new_status)
+        """
+        deltas = {}
+        for user_id, old_status, new_status in transitions:
+            if old_status == new_status:
+                continue
+            change = {f'by_status.{old_status}': -1, f'by_status.{new_status}': 1}
+            for key, inc in self._order_deltas(user_id, change).items():
+                for field, value in inc.items():
+                    deltas.setdefault(key, {})[field] = deltas.get(key, {}).get(field, 0) + value
+        self._apply({key: {field: value for field, value in inc.items() if value} for key, inc in deltas.items()}, db)
+
+    def user_created(self, user, db=None):
+        inc = {'total': 1, f"by_role.{user['role']}": 1}
+        if user.get('is_active') is True:
+            inc['active'] = 1
+        self._apply({self.USERS: inc}, db)
+
+    def user_changed(self, before, after, db=None):
+        """Role or activation change; `before`/`after` hold role and is_active"""
+        inc = {}
+        if before['role'] != after['role']:
+            inc[f"by_role.{before['role']}"] = -1
+            inc[f"by_role.{after['role']}"] = 1
+        was_active, is_active = before.get('is_active') is True, after.get('is_active') is True
+        if was_active != is_active:
+            inc['active'] = 1 if is_active else -1
+        self._apply({self.USERS: inc}, db)
+
+    def _order_deltas(self, user_id, inc):
+        deltas = {self.ORDERS: dict(inc)}
+        if user_id:
+            deltas[self.user_key(user_id)] = dict(inc)
+        return deltas
+
+    def _apply(self, deltas, db=None):
+        updates = [
+            UpdateOne({'_id': key}, {'$inc': inc}, upsert=True)
+            for key, inc in deltas.items() if inc
+        ]
+        if updates:
+            self._collection(db).bulk_write(updates, ordered=False)
+
+    # --- reads -------------------------------------------------------------
+
+    def read(self, keys, db=None):
+        """
+        Returns:
+            {key: counter document} for the keys that exist (one query)
+        """
+        return {doc['_id']: doc for doc in self._collection(db).find({'_id': {'$in': list(keys)}})}
+
+    # --- reconciliation ----------------------------------------------------
+
+    def compute(self, db=None):
+        """Every counter recomputed from the orders and users collections"""
+        db = db if db is not None else get_db()
+        counters = {self.ORDERS: {'total': 0, 'by_status': {}}, self.USERS: {'total': 0, 'active': 0, 'by_role': {}}}
+
+        for row in db.orders.aggregate([
+            {'$sort': {'user_id': 1, 'status': 1}},
+            {'$group': {'_id': {'user_id': '$user_id', 'status': '$status'}, 'count': {'$sum': 1}}}
+        ]):
+            user_id, status = row['_id'].get('user_id'), row['_id'].get('status')
+            keys = [self.ORDERS] + ([self.user_key(user_id)] if user_id else [])
+            for key in keys:
+                counter = counters.setdefault(key, {'total': 0, 'by_status': {}})
+                counter['total'] += row['count']
+                counter['by_status'][status] = counter['by_status'].get(status, 0) + row['count']
+
+        users = counters[self.USERS]
+        for row in db.users.aggregate([
+            {'$sort': {'role': 1, 'is_active': 1}},
+            {'$group': {'_id': {'role': '$role', 'active': '$is_active'}, 'count': {'$sum': 1}}}
+        ]):
+            role = row['_id'].get('role')
+            users['total'] += row['count']
+            if row['_id'].get('active') is True:
+                users['active'] += row['count']
+            users['by_role'][role] = users['by_role'].get(role, 0) + row['count']
+        return counters
+
+    def rebuild(self, db=None, dry_run=False):
+        """
+        Recompute the counters, report how far the stored ones had drifted and
+        (unless dry_run) replace them. Increments landing while the counts run
+        can be lost, so a non-empty drift right after busy periods is expected
+        to clear on the next run.
+
+        Returns:
+            {'checked_at', 'counters', 'drift': [{'counter', 'field', 'stored', 'actual'}], 'applied'}
+        """
+        db = db if db is not None else get_db()
+        expected = self.compute(db)
+        stored = {doc['_id']: doc for doc in self._collection(db).find()}
+
+        drift = []
+        for key in sorted(set(expected) | set(stored)):
+            actual = self._flatten(expected.get(key, {}))
+            current = self._flatten(stored.get(key, {}))
+            for field in sorted(set(actual) | set(current)):
+                if actual.get(field, 0) != current.get(field, 0):
+                    drift.append({
+                        'counter': key,
+                        'field': field,
+                        'stored': current.get(field, 0),
+                        'actual': actual.get(field, 0)
+                    })
+
+        if not dry_run:
+            collection = self._collection(db)
+            collection.bulk_write([
+                ReplaceOne({'_id': key}, {'_id': key, **counter}, upsert=True)
+                for key, counter in expected.items()
+            ], ordered=False)
+            orphans = [key for key in stored if key not in expected]
+            if orphans:
+                collection.delete_many({'_id': {'$in': orphans}})
+
+        return {
+            'checked_at': datetime.utcnow().isoformat(),
+            'counters': len(expected),
+            'drift': drift,
+            'applied': not dry_run
+        }
+
+    def ensure_initialized(self, db=None):
+        """Build the counters on first start (nothing stored yet)"""
+        if self._collection(db).find_one({'_id': self.ORDERS}, {'_id': 1}) is None:
+            self.rebuild(db)
+
+    @staticmethod
+    def _flatten(counter):
+        flat = {}
+        for field, value in counter.items():
+            if field == '_id':
+                continue
+            if isinstance(value, dict):
+                for name, count in value.items():
+                    flat[f'{field}.{name}'] = count
+            else:
+                flat[field] = value
+        return flat
+
+    def _collection(self, db=None):
+        db = db if db is not None else get_db()
+        return db[self.COLLECTION]
+
+# Singleton instance
+stats_counters = StatsCounters()
+
+if __name__ == '__main__':
+    from utils.db import init_db
+    parser = argparse.ArgumentParser(description='Rebuild the materialized order/user counters')
+    parser.add_argument('--dry-run', action='store_true', help='only report drift')
+    args = parser.parse_args()
+    init_db()
+    report = stats_counters.rebuild(dry_run=args.dry_run)
+    for item in report['drift']:
+        print(f"⚠️ {item['counter']}.{item['field']}: stored {item['stored']}, actual {item['actual']}")
+    print(f"✅ {report['counters']} counters checked, {len(report['drift'])} drifted"
+          f"{'' if report['applied'] else ' (dry run, nothing written)'}")
@@ -0,0 +1,49 @@
+from datetime import datetime
+from pymongo import ReturnDocument
+from config import Config
+from utils.driver_index import driver_index
+
+def claim_driver(db, query, tracking_number):
+    """
+    Atomically claim one driver matching `query` (status must still be 'available')
+    and attach the order to it. Returns the updated driver, or None if another
+    request claimed it first / no driver matches.
+    """
+    driver = db.drivers.find_one_and_update(
+        {**query, 'status': 'available'},
+        {
+            '$set': {'status': 'on_route', 'updated_at': datetime.utcnow()},
+            '$push': {'assigned_orders': str(tracking_number)}
+        },
+        return_document=ReturnDocument.AFTER
+    )
+    if driver:
+        driver_index.update_status(driver['driver_id'], 'on_route')
+    return driver
+
+def claim_pickup_driver(db, city, pickup_coords, tracking_number):
+    """
+    Claim the nearest available pickup driver to the pickup point.
+    Candidates come from the in-memory spatial index; a candidate taken by a
+    concurrent request (claim conflict) is skipped and the next one tried,
+    for up to DISPATCH_CLAIM_RETRIES rounds. Falls back to any available
+    pickup driver in the city, claimed with the same atomic precondition.
+    """
+    if pickup_coords:
+        for _ in range(Config.DISPATCH_CLAIM_RETRIES):
+            candidates = driver_index.nearest(pickup_coords, k=Config.DISPATCH_CANDIDATES, driver_type='pickup', city=city)
+            if not candidates:
+                break
+            for distance_km, driver_id in candidates:
+                driver = claim_driver(db, {'driver_id': driver_id}, tracking_number)
+                if driver:
+                    print(f"🛵 Nearest driver {driver_id} at {distance_km:.2f}km")
+                    return driver
+                # Conflict or stale index entry: refresh it from MongoDB
+                current = db.drivers.find_one({'driver_id': driver_id}, {'status': 1})
+                if current:
+                    driver_index.update_status(driver_id, current.get('status'))
+                else:
+                    driver_index.remove(driver_id)
+    
+    return claim_driver(db, {'driver_type': 'pickup', 'city': city}, tracking_number)
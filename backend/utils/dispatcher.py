@@ -0,0 +1,368 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+from pymongo import UpdateOne
+from scipy.optimize import linear_sum_assignment
+from config import Config
+from utils.db import get_db
+from utils.driver_index import driver_index
+from utils.order_cache import order_cache
+from utils.counters import stats_counters
+from utils.route_optimizer import EARTH_RADIUS_KM
+from utils.websocket import emit_order_update
+
+# Cost given to pairs that must never be matched (beyond DISPATCH_MAX_KM)
+INFEASIBLE_COST = 1e9
+
+def pickup_cost_matrix(order_points, driver_points, driver_loads, load_weight_km=None,
+                       unknown_distance_km=None, max_km=None):
+    """
+    Driver x order assignment cost: haversine km from the driver to the pickup
+    point plus `load_weight_km` per order already on the driver. Pairs with an
+    unknown location cost `unknown_distance_km`; pairs further than `max_km`
+    are marked INFEASIBLE_COST.
+
+    Args:
+        order_points: list of [lat, lng] (or None) per order
+        driver_points: list of [lat, lng] (or None) per driver
+        driver_loads: list of assigned order counts per driver
+
+    Returns:
+        (cost matrix [drivers x orders], distance matrix in km, NaN where unknown)
+    """
+    load_weight_km = Config.DISPATCH_LOAD_WEIGHT_KM if load_weight_km is None else load_weight_km
+    unknown_distance_km = Config.DISPATCH_UNKNOWN_DISTANCE_KM if unknown_distance_km is None else unknown_distance_km
+    max_km = Config.DISPATCH_MAX_KM if max_km is None else max_km
+
+    def radians(points):
+        arr = np.array([p[:2] if p else (np.nan, np.nan) for p in points], dtype=np.float64).reshape(-1, 2)
+        return np.radians(arr)
+
+    drivers, orders = radians(driver_points), radians(order_points)
+    lat1, lon1 = drivers[:, 0:1], drivers[:, 1:2]
+    lat2, lon2 = orders[:, 0], orders[:, 1]
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    cost = np.where(np.isnan(distances), unknown_distance_km, distances)
+    cost = cost + load_weight_km * np.asarray(driver_loads, dtype=np.float64).reshape(-1, 1)
+    if max_km:
+        cost[distances > max_km] = INFEASIBLE_COST
+    return cost, distances
+
+def solve_assignment(cost):
+    """
+    Minimum-cost driver/order matching (Hungarian / Jonker-Volgenant via SciPy).
+    Works on rectangular matrices; infeasible pairs are dropped.
+
+    Returns:
+        list of (driver_row, order_col)
+    """
+    if cost.size == 0:
+        return []
+    rows, cols = linear_sum_assignment(cost)
+    return [(int(r), int(c)) for r, c in zip(rows, cols) if cost[r, c] < INFEASIBLE_COST]
+
+def greedy_assignment(cost):
+    """One order at a time, in arrival order, to the cheapest free driver (baseline)"""
+    taken, pairs = set(), []
+    for col in range(cost.shape[1]):
+        best = None
+        for row in np.argsort(cost[:, col]):
+            if int(row) not in taken and cost[row, col] < INFEASIBLE_COST:
+                best = int(row)
+                break
+        if best is not None:
+            taken.add(best)
+            pairs.append((best, col))
+    return pairs
+
+class BatchDispatcher:
+    """
+    Micro-batched dispatcher for in-city pickups.
+    New unassigned orders are queued with submit(); a background thread waits
+    up to `window_seconds` after the first queued order (or until `max_batch`
+    orders are waiting), then matches the whole batch against the available
+    pickup drivers of each city in one assignment problem and writes the
+    result back with bulk writes.
+
+    Drivers are still claimed with the 'available' precondition, so several
+    workers (or the immediate path in create_order) can never double-book a
+    driver; orders whose driver was lost are retried in the next batch.
+    """
+
+    def __init__(self, window_seconds=None, max_batch=None):
+        self.window_seconds = Config.DISPATCH_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.max_batch = max_batch or Config.DISPATCH_MAX_BATCH
+        self._pending = {}  # tracking_number -> {'city', 'pickup', 'queued_at'}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stop = threading.Event()
+        self._recent = deque(maxlen=50)
+        self._totals = {
+            'batches': 0, 'orders_seen': 0, 'assigned': 0, 'deferred': 0,
+            'claim_conflicts': 0, 'total_cost': 0.0, 'greedy_cost': 0.0
+        }
+
+    # --- queueing ----------------------------------------------------------
+
+    def submit(self, order):
+        """Queue an unassigned in-city order for the next batch"""
+        with self._condition:
+            self._pending.setdefault(order['tracking_number'], {
+                'city': order['sender']['city'],
+                'pickup': order['sender'].get('coordinates'),
+                'queued_at': time.monotonic()
+            })
+            self._condition.notify()
+
+    def load_pending(self, db=None):
+        """Queue in-city orders still waiting for a pickup driver (e.g. after a restart)"""
+        db = db if db is not None else get_db()
+        for order in db.orders.find(
+            {'delivery_type': 'in_city', 'status': 'assigned', 'assigned_pickup_driver': None},
+            {'tracking_number': 1, 'sender.city': 1, 'sender.coordinates': 1}
+        ):
+            self.submit(order)
+
+    # --- background loop ---------------------------------------------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        try:
+            self.load_pending()
+        except Exception as e:
+            print(f"⚠️ Could not load pending orders for dispatch: {e}")
+        self._thread = threading.Thread(target=self._run, name='dispatcher', daemon=True)
+        self._thread.start()
+        print(f"🚦 Batch dispatcher started (window {self.window_seconds}s, max batch {self.max_batch})")
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.dispatch(batch)
+            except Exception as e:
+                print(f"⚠️ Dispatch batch failed: {e}")
+                with self._condition:
+                    for tracking_number, entry in batch.items():
+                        self._pending.setdefault(tracking_number, entry)
+                self._stop.wait(self.window_seconds)
+
+    def _next_batch(self):
+        """Block until a window closes (or the batch is full) and take the batch"""
+        with self._condition:
+            while not self._pending and not self._stop.is_set():
+                self._condition.wait(timeout=1)
+            if self._stop.is_set():
+                return None
+            deadline = min(entry['queued_at'] for entry in self._pending.values()) + self.window_seconds
+            while len(self._pending) < self.max_batch and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(timeout=remaining)
+
+            oldest = sorted(self._pending, key=lambda tn: self._pending[tn]['queued_at'])[:self.max_batch]
+            return {tracking_number: self._pending.pop(tracking_number) for tracking_number in oldest}
+
+    # --- matching ----------------------------------------------------------
+
+    def dispatch(self, batch, db=None):
+        """
+        Match one batch ({tracking_number: entry}) and write the assignments.
+        Orders left without a driver stay queued for the next window.
+
+        Returns:
+            batch quality metrics (see stats()['last_batch'])
+        """
+        db = db if db is not None else get_db()
+        started = time.perf_counter()
+        now = time.monotonic()
+
+        by_city = {}
+        for tracking_number, entry in batch.items():
+            by_city.setdefault(entry['city'], []).append(tracking_number)
+
+        pairs, total_cost, greedy_cost, distances_km = [], 0.0, 0.0, []
+        for city, tracking_numbers in by_city.items():
+            drivers = list(db.drivers.aggregate([
+                {'$match': {'driver_type': 'pickup', 'city': city, 'status': 'available'}},
+                {'$project': {
+                    'driver_id': 1, 'name': 1, 'current_location': 1,
+                    'load': {'$size': {'$ifNull': ['$assigned_orders', []]}}
+                }}
+            ]))
+            if not drivers:
+                continue
+
+            cost, distances = pickup_cost_matrix(
+                [batch[tn]['pickup'] for tn in tracking_numbers],
+                [d.get('current_location') for d in drivers],
+                [d['load'] for d in drivers]
+            )
+            matched = solve_assignment(cost)
+            total_cost += float(sum(cost[r, c] for r, c in matched))
+            greedy_cost += float(sum(cost[r, c] for r, c in greedy_assignment(cost)))
+            for row, col in matched:
+                pairs.append((drivers[row], tracking_numbers[col]))
+                if not np.isnan(distances[row, col]):
+                    distances_km.append(float(distances[row, col]))
+        solve_ms = (time.perf_counter() - started) * 1000
+
+        assigned = self._write_assignments(db, pairs)
+
+        # Orders without a driver go back into the queue for the next window
+        deferred = [tn for tn in batch if tn not in assigned]
+        with self._condition:
+            for tracking_number in deferred:
+                self._pending.setdefault(tracking_number, {**batch[tracking_number], 'queued_at': time.monotonic()})
+
+        metrics = {
+            'at': datetime.utcnow().isoformat(),
+            'orders': len(batch),
+            'assigned': len(assigned),
+            'deferred': len(deferred),
+            'claim_conflicts': len(pairs) - len(assigned),
+            'total_cost': round(total_cost, 3),
+            'greedy_cost': round(greedy_cost, 3),
+            'improvement_vs_greedy_pct': round((greedy_cost - total_cost) / greedy_cost * 100, 2) if greedy_cost else 0.0,
+            'avg_pickup_km': round(sum(distances_km) / len(distances_km), 3) if distances_km else None,
+            'max_wait_ms': round((now - min(e['queued_at'] for e in batch.values())) * 1000, 1) if batch else 0.0,
+            'solve_ms': round(solve_ms, 2),
+            'total_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+        with self._condition:
+            self._recent.append(metrics)
+            self._totals['batches'] += 1
+            self._totals['orders_seen'] += len(batch)
+            self._totals['assigned'] += len(assigned)
+            self._totals['deferred'] += len(deferred)
+            self._totals['claim_conflicts'] += metrics['claim_conflicts']
+            self._totals['total_cost'] += total_cost
+            self._totals['greedy_cost'] += greedy_cost
+
+        if assigned:
+            print(f"🚦 Dispatched {len(assigned)}/{len(batch)} orders in {metrics['total_ms']}ms "
+                  f"({metrics['improvement_vs_greedy_pct']}% cheaper than greedy)")
+        return metrics
+
+    def _write_assignments(self, db, pairs):
+        """
+        Bulk-claim drivers (status precondition), then bulk-assign the orders
+        whose driver was won. A driver claimed for an order that was meanwhile
+        assigned elsewhere is released again.
+
+        Returns:
+            {tracking_number: driver_id} actually written
+        """
+        if not pairs:
+            return {}
+        now = datetime.utcnow()
+
+        db.drivers.bulk_write([
+            UpdateOne(
+                {'driver_id': driver['driver_id'], 'status': 'available'},
+                {'$set': {'status': 'on_route', 'updated_at': now},
+                 '$push': {'assigned_orders': tracking_number}}
+            )
+            for driver, tracking_number in pairs
+        ], ordered=False)
+
+        # Which claims won: the driver now carries the tracking number
+        tracking_numbers = [tn for _, tn in pairs]
+        won = {
+            (d['driver_id'], tn)
+            for d in db.drivers.find(
+                {'driver_id': {'$in': [driver['driver_id'] for driver, _ in pairs]},
+                 'assigned_orders': {'$in': tracking_numbers}},
+                {'driver_id': 1, 'assigned_orders': 1}
+            )
+            for tn in d['assigned_orders'] if tn in tracking_numbers
+        }
+        claimed = [(driver, tn) for driver, tn in pairs if (driver['driver_id'], tn) in won]
+        for driver, _ in claimed:
+            driver_index.update_status(driver['driver_id'], 'on_route')
+        if not claimed:
+            return {}
+
+        # Only orders still waiting in 'assigned' move on, which keeps the counters' transition exact
+        db.orders.bulk_write([
+            UpdateOne(
+                {'tracking_number': tn, 'status': 'assigned', 'assigned_pickup_driver': None},
+                {'$set': {'assigned_pickup_driver': driver['driver_id'], 'status': 'pickup_in_progress', 'updated_at': now},
+                 '$push': {'status_history': {
+                     'status': 'pickup_in_progress',
+                     'timestamp': now,
+                     'message': f"Chauffeur {driver['name']} en route pour ramassage"
+                 }}}
+            )
+            for driver, tn in claimed
+        ], ordered=False)
+
+        written_orders = list(db.orders.find(
+            {'tracking_number': {'$in': [tn for _, tn in claimed]}},
+            {'tracking_number': 1, 'assigned_pickup_driver': 1, 'user_id': 1}
+        ))
+        written = {order['tracking_number']: order['assigned_pickup_driver'] for order in written_orders}
+        stray = [(driver, tn) for driver, tn in claimed if written.get(tn) != driver['driver_id']]
+        stray_orders = {tn for _, tn in stray}
+        if stray:
+            db.drivers.bulk_write([
+                UpdateOne(
+                    {'driver_id': driver['driver_id'], 'status': 'on_route'},
+                    {'$set': {'status': 'available', 'updated_at': now}, '$pull': {'assigned_orders': tn}}
+                )
+                for driver, tn in stray
+            ], ordered=False)
+            for driver, _ in stray:
+                driver_index.update_status(driver['driver_id'], 'available')
+
+        assigned = {tn: driver['driver_id'] for driver, tn in claimed if tn not in stray_orders}
+        order_cache.invalidate(*[tn for _, tn in claimed])
+        stats_counters.order_transitions([
+            (order.get('user_id'), 'assigned', 'pickup_in_progress')
+            for order in written_orders if order['tracking_number'] in assigned
+        ], db)
+        for tn, driver_id in assigned.items():
+            emit_order_update(tn, {
+                'tracking_number': tn,
+                'status': 'pickup_in_progress',
+                'assigned_pickup_driver': driver_id
+            })
+        return assigned
+
+    # --- metrics -----------------------------------------------------------
+
+    def stats(self):
+        with self._condition:
+            totals = dict(self._totals)
+            recent = list(self._recent)
+            pending = len(self._pending)
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'window_seconds': self.window_seconds,
+            'max_batch': self.max_batch,
+            'pending': pending,
+            **{key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()},
+            'avg_batch_size': round(totals['orders_seen'] / totals['batches'], 2) if totals['batches'] else 0.0,
+            'improvement_vs_greedy_pct': round(
+                (totals['greedy_cost'] - totals['total_cost']) / totals['greedy_cost'] * 100, 2
+            ) if totals['greedy_cost'] else 0.0,
+            'last_batch': recent[-1] if recent else None
+        }
+
+# Singleton instance
+dispatcher = BatchDispatcher()
@@ -0,0 +1,229 @@
+import heapq
+import math
+import threading
+import time
+from config import Config
+from utils.db import get_db
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = 2 * math.pi * EARTH_RADIUS_KM / 360
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    """Haversine distance in km"""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+class DriverIndex:
+    """
+    In-process grid index of available drivers by current_location.
+    Only drivers with status 'available' and a known location sit in the grid
+    (one grid per driver_type and city); everyone else is tracked so that a later
+    location or status update can move them in.
+
+    The index is per process: a background thread (start_background_refresh)
+    reloads it from MongoDB every `reload_seconds` so that updates made by other
+    workers are picked up, while requests only read and update the current
+    snapshot. Callers must still claim drivers atomically in MongoDB.
+    """
+
+    def __init__(self, cell_degrees=None, reload_seconds=None):
+        self.cell_degrees = cell_degrees or Config.DRIVER_INDEX_CELL_DEGREES
+        self.reload_seconds = Config.DRIVER_INDEX_RELOAD_SECONDS if reload_seconds is None else reload_seconds
+        self._drivers = {}  # driver_id -> {'lat', 'lon', 'driver_type', 'city', 'status'}
+        self._grids = {}    # (driver_type, city) -> {(row, col): set(driver_id)}
+        self._bounds = {}   # (driver_type, city) -> [min_row, max_row, min_col, max_col] ever occupied
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._refresher = None
+        self._stop = threading.Event()
+
+    # --- maintenance -------------------------------------------------------
+
+    def load(self, drivers=None):
+        """(Re)build the index from driver documents (default: all drivers in MongoDB)"""
+        if drivers is None:
+            drivers = get_db().drivers.find(
+                {}, {'driver_id': 1, 'driver_type': 1, 'city': 1, 'status': 1, 'current_location': 1}
+            )
+        # Read everything before taking the lock so queries never wait on MongoDB
+        drivers = list(drivers)
+        with self._lock:
+            self._drivers.clear()
+            self._grids.clear()
+            self._bounds.clear()
+            for driver in drivers:
+                self._upsert(driver['driver_id'], {
+                    'location': driver.get('current_location'),
+                    'driver_type': driver.get('driver_type'),
+                    'city': driver.get('city'),
+                    'status': driver.get('status')
+                })
+            self._loaded_at = time.monotonic()
+
+    def start_background_refresh(self, interval_seconds=None):
+        """Load the index now and reload it every interval from a daemon thread"""
+        if self._refresher and self._refresher.is_alive():
+            return
+        interval = interval_seconds or self.reload_seconds
+        self._stop.clear()
+
+        def refresh_loop():
+            while not self._stop.is_set():
+                try:
+                    self.load()
+                except Exception as e:
+                    print(f"⚠️ Driver index reload failed: {e}")
+                if not interval:
+                    break  # reloading disabled: load once
+                self._stop.wait(interval)
+
+        self._refresher = threading.Thread(target=refresh_loop, name='driver-index-refresh', daemon=True)
+        self._refresher.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+
+    def upsert(self, driver_id, location=None, driver_type=None, city=None, status=None):
+        """Record a driver update; fields left as None keep their indexed value"""
+        with self._lock:
+            self._upsert(driver_id, {
+                'location': location,
+                'driver_type': driver_type,
+                'city': city,
+                'status': status
+            })
+
+    def update_location(self, driver_id, location):
+        self.upsert(driver_id, location=location)
+
+    def update_status(self, driver_id, status):
+        self.upsert(driver_id, status=status)
+
+    def remove(self, driver_id):
+        with self._lock:
+            entry = self._drivers.pop(driver_id, None)
+            if entry:
+                self._unbucket(driver_id, entry)
+
+    # --- queries -----------------------------------------------------------
+
+    def nearest(self, location, k=1, driver_type=None, city=None, max_km=None):
+        """
+        k nearest available drivers to `location` ([lat, lon]).
+
+        Returns:
+            list of (distance_km, driver_id), closest first
+        """
+        lat, lon = float(location[0]), float(location[1])
+        row, col = self._cell(lat, lon)
+
+        # Conservative km width of one cell ring (longitude degrees shrink with latitude)
+        ring_km = self.cell_degrees * KM_PER_DEGREE * max(math.cos(math.radians(abs(lat) + self.cell_degrees)), 0.01)
+
+        with self._lock:
+            keys = [key for key, grid in self._grids.items() if grid
+                    and (driver_type is None or key[0] == driver_type)
+                    and (city is None or key[1] == city)]
+            if not keys:
+                return []
+            grids = [self._grids[key] for key in keys]
+            # Only rings that intersect an occupied bounding box can hold drivers
+            all_bounds = [self._bounds[key] for key in keys]
+            first_ring = min(
+                max(bounds[0] - row, row - bounds[1], bounds[2] - col, col - bounds[3], 0)
+                for bounds in all_bounds
+            )
+            max_ring = max(
+                max(row - bounds[0], bounds[1] - row, col - bounds[2], bounds[3] - col)
+                for bounds in all_bounds
+            )
+
+            best = []  # max-heap of (-distance, driver_id), size <= k
+            for ring in range(first_ring, max_ring + 1):
+                if len(best) == k and (ring - 1) * ring_km > -best[0][0]:
+                    break
+                if max_km is not None and (ring - 1) * ring_km > max_km:
+                    break
+                for cell in self._ring_cells(row, col, ring):
+                    for grid in grids:
+                        for driver_id in grid.get(cell, ()):
+                            entry = self._drivers[driver_id]
+                            distance = _distance_km(lat, lon, entry['lat'], entry['lon'])
+                            if max_km is not None and distance > max_km:
+                                continue
+                            if len(best) < k:
+                                heapq.heappush(best, (-distance, driver_id))
+                            elif distance < -best[0][0]:
+                                heapq.heapreplace(best, (-distance, driver_id))
+
+        return sorted((-neg, driver_id) for neg, driver_id in best)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'drivers': len(self._drivers),
+                'indexed_available': sum(len(ids) for grid in self._grids.values() for ids in grid.values()),
+                'cells': sum(len(grid) for grid in self._grids.values()),
+                'cell_degrees': self.cell_degrees,
+                'loaded_seconds_ago': round(time.monotonic() - self._loaded_at) if self._loaded_at else None,
+                'refresher_running': bool(self._refresher and self._refresher.is_alive())
+            }
+
+    # --- internals ---------------------------------------------------------
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    @staticmethod
+    def _ring_cells(row, col, ring):
+        if ring == 0:
+            yield (row, col)
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield (row - ring, c)
+            yield (row + ring, c)
+        for r in range(row - ring + 1, row + ring):
+            yield (r, col - ring)
+            yield (r, col + ring)
+
+    def _upsert(self, driver_id, changes):
+        entry = self._drivers.get(driver_id)
+        if entry:
+            self._unbucket(driver_id, entry)
+        else:
+            entry = {'lat': None, 'lon': None, 'driver_type': None, 'city': None, 'status': None}
+            self._drivers[driver_id] = entry
+
+        location = changes.pop('location')
+        if location:
+            entry['lat'], entry['lon'] = float(location[0]), float(location[1])
+        for field, value in changes.items():
+            if value is not None:
+                entry[field] = value
+
+        if entry['status'] == 'available' and entry['lat'] is not None:
+            cell = self._cell(entry['lat'], entry['lon'])
+            key = (entry['driver_type'], entry['city'])
+            self._grids.setdefault(key, {}).setdefault(cell, set()).add(driver_id)
+            bounds = self._bounds.setdefault(key, [cell[0], cell[0], cell[1], cell[1]])
+            bounds[0], bounds[1] = min(bounds[0], cell[0]), max(bounds[1], cell[0])
+            bounds[2], bounds[3] = min(bounds[2], cell[1]), max(bounds[3], cell[1])
+
+    def _unbucket(self, driver_id, entry):
+        if entry['lat'] is None:
+            return
+        grid = self._grids.get((entry['driver_type'], entry['city']))
+        if not grid:
+            return
+        cell = self._cell(entry['lat'], entry['lon'])
+        bucket = grid.get(cell)
+        if bucket:
+            bucket.discard(driver_id)
+            if not bucket:
+                del grid[cell]
+
+# Singleton instance
+driver_index = DriverIndex()
@@ -1,6 +1,14 @@
-import requests
+import threading
+import time
 import polyline
 from config import Config
+from utils.route_cache import route_cache
+from utils.http_client import ServiceClient
+from utils.geometry import encode_route_levels, route_at_tolerance
+
+# Shared per-service clients: one keep-alive pool, one circuit breaker per upstream
+openroute_client = ServiceClient('openroute', timeout=(3, 10))
+openweather_client = ServiceClient('openweather', timeout=(3, 5))
 
 # Moroccan cities coordinates
 CITY_COORDS = {
@@ -17,28 +25,52 @@ CITY_COORDS = {
 }
 
 class RouteService:
-    def __init__(self):
+    def __init__(self, cache=route_cache, http=openroute_client):
         self.api_key = Config.OPENROUTE_API_KEY
+        self.cache = cache
+        self.http = http
         self.base_url = "https://api.openrouteservice.org/v2/directions/driving-car"
         if self.api_key and self.api_key != 'your_openroute_api_key_here':
             print(f"✅ OpenRouteService initialized with key: {self.api_key[:20]}...")
         else:
             print("⚠️ No OpenRouteService API key configured")
     
-    def get_route(self, origin, destination):
-        """Get optimized route between two points (coords or city names)"""
+    def get_route(self, origin, destination, tolerance_m=None):
+        """
+        Get optimized route between two points (coords or city names).
+        With tolerance_m, the geometry is the matching precomputed simplification level.
+        """
         # Handle coordinate pairs [lat, lon]
         if isinstance(origin, (list, tuple)) and isinstance(destination, (list, tuple)):
-            return self._get_route_by_coords(origin, destination)
+            return route_at_tolerance(self._get_cached_route(origin, destination), tolerance_m)
         
         # Handle city names
         if origin not in CITY_COORDS or destination not in CITY_COORDS:
-            return self._get_mock_route(origin, destination)
+            return route_at_tolerance(self._get_mock_route(origin, destination), tolerance_m)
         
         # Convert city names to coords and use coord-based routing
         origin_coords = [CITY_COORDS[origin][1], CITY_COORDS[origin][0]]  # [lat, lon]
         dest_coords = [CITY_COORDS[destination][1], CITY_COORDS[destination][0]]
-        return self._get_route_by_coords(origin_coords, dest_coords)
+        return route_at_tolerance(self._get_cached_route(origin_coords, dest_coords), tolerance_m)
+    
+    def _get_cached_route(self, origin_coords, destination_coords):
+        """Serve from the route cache, falling back to the API on a miss"""
+        if self.cache is None:
+            return self._get_route_by_coords(origin_coords, destination_coords)
+        
+        key = self.cache.make_key(origin_coords, destination_coords)
+        cached = self.cache.get(key)
+        if cached:
+            return cached
+        
+        route = self._get_route_by_coords(origin_coords, destination_coords)
+        # Mock routes are cheap to rebuild and must not outlive an API outage
+        if route.get('success') and route.get('source') != 'mock':
+            # Simplified once here, served per zoom level from the cache afterwards
+            levels = encode_route_levels(route.get('geometry'))['route_polyline_levels']
+            route = {**route, 'geometry_levels': levels}
+            self.cache.set(key, route)
+        return route
     
     def _get_route_by_coords(self, origin_coords, destination_coords):
         """Get route between two coordinate pairs using direct API call"""
@@ -57,11 +89,11 @@ class RouteService:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.post(
+            response = self.http.post(
                 self.base_url,
                 json={'coordinates': coords},
                 headers=headers,
-                timeout=10
+                idempotent=True  # a directions query, nothing is created upstream
             )
             
             data = response.json()
@@ -182,24 +214,49 @@ class RouteService:
         }
 
 class WeatherService:
-    def __init__(self):
+    def __init__(self, http=openweather_client, ttl_seconds=None):
         self.api_key = Config.WEATHER_API_KEY
+        self.http = http
         self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.ttl_seconds = ttl_seconds or Config.WEATHER_CACHE_TTL_SECONDS
+        self._cache = {}  # city -> (fetched_at monotonic, weather dict)
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stop = threading.Event()
+        self._counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_errors': 0}
         if self.api_key and self.api_key != 'your_openweather_api_key_here':
             print(f"✅ Weather API initialized with key: {self.api_key[:8]}...")
         else:
             print("⚠️ No Weather API key configured")
     
+    def _api_enabled(self):
+        return bool(self.api_key) and self.api_key != 'your_openweather_api_key_here'
+    
     def get_weather(self, city):
-        """Get current weather for a city"""
-        if not self.api_key or self.api_key == 'your_openweather_api_key_here':
+        """Get current weather for a city, served from the per-city cache when possible"""
+        if not self._api_enabled() or city not in CITY_COORDS:
             return self._get_mock_weather(city)
         
+        with self._lock:
+            entry = self._cache.get(city)
+            refreshing = self._refresher is not None and self._refresher.is_alive()
+            if entry:
+                fresh = time.monotonic() - entry[0] < self.ttl_seconds
+                # A stale entry is still served while the refresher keeps the city warm
+                if fresh or refreshing:
+                    self._counters['hits' if fresh else 'stale_hits'] += 1
+                    return dict(entry[1])
+            self._counters['misses'] += 1
+        
+        weather = self.refresh_city(city)
+        if weather is None:
+            return dict(entry[1]) if entry else self._get_mock_weather(city)
+        return weather
+    
+    def refresh_city(self, city):
+        """Fetch live weather for a city and store it in the cache (None on failure)"""
         try:
-            coords = CITY_COORDS.get(city)
-            if not coords:
-                return self._get_mock_weather(city)
-            
+            coords = CITY_COORDS[city]
             params = {
                 'lat': coords[1],
                 'lon': coords[0],
@@ -207,13 +264,13 @@ class WeatherService:
                 'units': 'metric'
             }
             
-            response = requests.get(self.base_url, params=params, timeout=5)
+            response = self.http.get(self.base_url, params=params)
             response.raise_for_status()
             data = response.json()
             
             print(f"✅ Real weather data for {city}: {data['main']['temp']}°C")
             
-            return {
+            weather = {
                 'city': city,
                 'temperature': round(data['main']['temp'], 1),
                 'condition': data['weather'][0]['main'],
@@ -222,9 +279,48 @@ class WeatherService:
                 'wind_speed': round(data['wind']['speed'], 1),
                 'source': 'openweather'
             }
+            with self._lock:
+                self._cache[city] = (time.monotonic(), weather)
+                self._counters['refreshes'] += 1
+            return dict(weather)
         except Exception as e:
             print(f"⚠️ Weather API error: {e}")
-            return self._get_mock_weather(city)
+            with self._lock:
+                self._counters['refresh_errors'] += 1
+            return None
+    
+    def start_background_refresh(self, interval_seconds=None):
+        """Keep every known city warm from a daemon thread (no-op without an API key)"""
+        if not self._api_enabled() or (self._refresher and self._refresher.is_alive()):
+            return
+        interval = interval_seconds or Config.WEATHER_REFRESH_SECONDS
+        self._stop.clear()
+        
+        def refresh_loop():
+            while not self._stop.is_set():
+                for city in CITY_COORDS:
+                    if self._stop.is_set():
+                        break
+                    self.refresh_city(city)
+                self._stop.wait(interval)
+        
+        self._refresher = threading.Thread(target=refresh_loop, name='weather-refresh', daemon=True)
+        self._refresher.start()
+    
+    def stop_background_refresh(self):
+        self._stop.set()
+    
+    def cache_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            ages = {city: round(now - fetched_at) for city, (fetched_at, _) in self._cache.items()}
+            return {
+                **self._counters,
+                'cities': len(self._cache),
+                'age_seconds': ages,
+                'ttl_seconds': self.ttl_seconds,
+                'refresher_running': bool(self._refresher and self._refresher.is_alive())
+            }
     
     def _get_mock_weather(self, city):
         """Mock weather data with variation"""
@@ -0,0 +1,94 @@
+from utils.db import get_db
+
+# Orders still moving through the network
+ACTIVE_ORDER_STATUSES = ['assigned', 'pickup_scheduled', 'pickup_in_progress', 'in_transit', 'out_for_delivery']
+
+def to_geojson_point(coords):
+    """[lat, lng] list -> GeoJSON Point ([lng, lat]); None if coords are missing"""
+    if not coords or len(coords) < 2 or coords[0] is None or coords[1] is None:
+        return None
+    return {'type': 'Point', 'coordinates': [float(coords[1]), float(coords[0])]}
+
+def backfill_geojson(db=None):
+    """
+    Backfill GeoJSON fields (2dsphere-indexed, see utils/indexes.py) on documents
+    written before they were maintained alongside the [lat, lng] arrays.
+    One-off migration (python -m utils.geo): the filters scan whole collections.
+
+    Returns:
+        {'drivers': n, 'sender': n, 'recipient': n} documents updated
+    """
+    db = db if db is not None else get_db()
+    updated = {}
+    updated['drivers'] = db.drivers.update_many(
+        {'current_location.1': {'$exists': True}, 'current_location_geo': {'$exists': False}},
+        [{'$set': {'current_location_geo': _point_from_array('$current_location')}}]
+    ).modified_count
+    for party in ('sender', 'recipient'):
+        updated[party] = db.orders.update_many(
+            {f'{party}.coordinates.1': {'$exists': True}, f'{party}.location': {'$exists': False}},
+            [{'$set': {f'{party}.location': _point_from_array(f'${party}.coordinates')}}]
+        ).modified_count
+    return updated
+
+def _point_from_array(field):
+    """Aggregation expression building a GeoJSON Point from a [lat, lng] array field"""
+    return {
+        'type': 'Point',
+        'coordinates': [
+            {'$toDouble': {'$arrayElemAt': [field, 1]}},
+            {'$toDouble': {'$arrayElemAt': [field, 0]}}
+        ]
+    }
+
+def drivers_near(point, max_km, driver_type=None, status='available', city=None, limit=20, db=None):
+    """
+    Drivers within max_km of point ([lat, lng]), closest first, served by the
+    2dsphere index. Each result carries `distance_km`.
+    """
+    db = db if db is not None else get_db()
+    query = {}
+    if driver_type:
+        query['driver_type'] = driver_type
+    if status:
+        query['status'] = status
+    if city:
+        query['city'] = city
+
+    pipeline = [
+        {'$geoNear': {
+            'near': to_geojson_point(point),
+            'key': 'current_location_geo',
+            'distanceField': 'distance_m',
+            'maxDistance': float(max_km) * 1000,
+            'spherical': True,
+            'query': query
+        }},
+        {'$limit': int(limit)}
+    ]
+    drivers = list(db.drivers.aggregate(pipeline))
+    for driver in drivers:
+        driver['distance_km'] = round(driver.pop('distance_m') / 1000, 3)
+    return drivers
+
+def orders_in_box(south_west, north_east, field='recipient', statuses=None, limit=200, projection=None, db=None):
+    """
+    Orders whose sender/recipient location lies inside the bounding box
+    (corners as [lat, lng]), served by the 2dsphere index.
+    """
+    db = db if db is not None else get_db()
+    (south, west), (north, east) = south_west, north_east
+    polygon = {
+        'type': 'Polygon',
+        'coordinates': [[[west, south], [east, south], [east, north], [west, north], [west, south]]]
+    }
+    query = {f'{field}.location': {'$geoWithin': {'$geometry': polygon}}}
+    query['status'] = {'$in': statuses or ACTIVE_ORDER_STATUSES}
+    return list(db.orders.find(query, projection).limit(int(limit)))
+
+if __name__ == '__main__':
+    from utils.db import init_db
+    init_db()
+    updated = backfill_geojson()
+    print(f"✅ GeoJSON backfilled: {updated['drivers']} drivers, "
+          f"{updated['sender']} order senders, {updated['recipient']} order recipients")
@@ -0,0 +1,180 @@
+import math
+import threading
+from collections import OrderedDict
+from config import Config
+
+# Equirectangular projection: meters per degree of latitude
+METERS_PER_DEGREE = 2 * math.pi * 6371000 / 360
+
+# Drop-off rings, outermost first: (name, status the order must be in, status it moves to, message)
+DROPOFF_RINGS = (
+    ('transit', 'pickup_in_progress', 'in_transit', 'Colis récupéré, en route vers la destination'),
+    ('approach', 'in_transit', 'out_for_delivery', 'Chauffeur proche de la destination'),
+    ('arrival', 'out_for_delivery', 'delivered', 'Colis livré avec succès'),
+)
+PICKUP_DEPARTED = ('in_transit', 'Colis récupéré, en route vers la destination')
+
+class OrderFences:
+    """
+    Precomputed fences of one order: a pickup circle around the sender and
+    concentric drop-off rings around the recipient. Each fence is entered at
+    its radius and only left again beyond radius + hysteresis, so GPS jitter
+    at the edge does not flap. Radii are kept squared in projected meters.
+    """
+
+    __slots__ = ('pickup', 'dropoff', 'rings', 'inside', 'visited_pickup', 'beyond_pickup')
+
+    def __init__(self, pickup_coords, dropoff_coords, radii, hysteresis_m):
+        self.pickup = self._center(pickup_coords, radii['pickup'], hysteresis_m)
+        self.dropoff = self._center(dropoff_coords, None, None)
+        self.rings = [
+            (name, radii[name] ** 2, (radii[name] + hysteresis_m) ** 2)
+            for name, _, _, _ in DROPOFF_RINGS
+        ] if self.dropoff else []
+        self.inside = {name: False for name in ('pickup', *(ring[0] for ring in self.rings))}
+        self.visited_pickup = False
+        self.beyond_pickup = False
+
+    @staticmethod
+    def _center(coords, radius_m, hysteresis_m):
+        if not coords or coords[0] is None or coords[1] is None:
+            return None
+        lat, lon = float(coords[0]), float(coords[1])
+        center = (lat, lon, math.cos(math.radians(lat)))
+        if radius_m is None:
+            return center
+        return center + (radius_m ** 2, (radius_m + hysteresis_m) ** 2)
+
+    @staticmethod
+    def distance_sq(center, lat, lon):
+        """Squared equirectangular distance (m²) from a precomputed center"""
+        dy = (lat - center[0]) * METERS_PER_DEGREE
+        dx = (lon - center[1]) * METERS_PER_DEGREE * center[2]
+        return dx * dx + dy * dy
+
+    def update(self, lat, lon):
+        """
+        Move the driver to (lat, lon) and update every fence.
+
+        Returns:
+            list of (fence, 'enter' | 'exit') transitions
+        """
+        events = []
+        inside = self.inside
+        if self.pickup:
+            c_lat, c_lon, cos_lat, enter_sq, exit_sq = self.pickup
+            dy = (lat - c_lat) * METERS_PER_DEGREE
+            dx = (lon - c_lon) * METERS_PER_DEGREE * cos_lat
+            d_sq = dx * dx + dy * dy
+            if not inside['pickup']:
+                if d_sq <= enter_sq:
+                    inside['pickup'] = self.visited_pickup = True
+                    events.append(('pickup', 'enter'))
+            elif d_sq > exit_sq:
+                inside['pickup'] = False
+                events.append(('pickup', 'exit'))
+            self.beyond_pickup = d_sq > exit_sq
+        if self.dropoff:
+            c_lat, c_lon, cos_lat = self.dropoff
+            dy = (lat - c_lat) * METERS_PER_DEGREE
+            dx = (lon - c_lon) * METERS_PER_DEGREE * cos_lat
+            d_sq = dx * dx + dy * dy
+            for name, enter_sq, exit_sq in self.rings:
+                if not inside[name]:
+                    if d_sq <= enter_sq:
+                        inside[name] = True
+                        events.append((name, 'enter'))
+                elif d_sq > exit_sq:
+                    inside[name] = False
+                    events.append((name, 'exit'))
+        return events
+
+    def next_status(self, status):
+        """
+        Status the order moves to given the current fence state, or None.
+        Picked up = left the pickup fence after having been inside it. When this
+        process never saw the pickup (restart, eviction, pings served by another
+        worker) or the order has no sender coordinates, the outer drop-off ring
+        decides, with the driver clear of the pickup fence if there is one.
+        """
+        if status == 'pickup_in_progress' and self.pickup:
+            if self.visited_pickup:
+                return PICKUP_DEPARTED if not self.inside['pickup'] else None
+            if not self.beyond_pickup:
+                return None
+        for name, from_status, to_status, message in DROPOFF_RINGS:
+            if status == from_status and self.inside.get(name):
+                return to_status, message
+        return None
+
+class GeofenceEngine:
+    """
+    Per-process registry of order fences, keyed by tracking number and built
+    on first use from the cached order state (no MongoDB reads). Bounded LRU;
+    evicted or forgotten orders are rebuilt with every fence 'outside'.
+    """
+
+    def __init__(self, radii=None, hysteresis_m=None, max_orders=None):
+        self.radii = radii or {
+            'pickup': Config.GEOFENCE_PICKUP_RADIUS_M,
+            'transit': Config.GEOFENCE_TRANSIT_RADIUS_M,
+            'approach': Config.GEOFENCE_APPROACH_RADIUS_M,
+            'arrival': Config.GEOFENCE_ARRIVAL_RADIUS_M
+        }
+        self.hysteresis_m = Config.GEOFENCE_HYSTERESIS_M if hysteresis_m is None else hysteresis_m
+        self.max_orders = max_orders or Config.ORDER_STATE_CACHE_SIZE
+        self._fences = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'evaluations': 0, 'events': 0, 'transitions': 0, 'built': 0}
+
+    def evaluate(self, order, location):
+        """
+        Evaluate one driver position against an order's fences.
+
+        Args:
+            order: order state with tracking_number, status, sender/recipient coordinates
+            location: [lat, lng]
+
+        Returns:
+            (events [(fence, 'enter' | 'exit')], (new_status, message) or None)
+        """
+        tracking_number = order['tracking_number']
+        with self._lock:
+            fences = self._fences.get(tracking_number)
+            if fences is None:
+                fences = OrderFences(
+                    (order.get('sender') or {}).get('coordinates'),
+                    (order.get('recipient') or {}).get('coordinates'),
+                    self.radii, self.hysteresis_m
+                )
+                self._fences[tracking_number] = fences
+                self._counters['built'] += 1
+                while len(self._fences) > self.max_orders:
+                    self._fences.popitem(last=False)
+            else:
+                self._fences.move_to_end(tracking_number)
+
+            events = fences.update(location[0], location[1])
+            transition = fences.next_status(order.get('status'))
+            self._counters['evaluations'] += 1
+            self._counters['events'] += len(events)
+            if transition:
+                self._counters['transitions'] += 1
+        return events, transition
+
+    def forget(self, *tracking_numbers):
+        with self._lock:
+            for tracking_number in tracking_numbers:
+                self._fences.pop(tracking_number, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'orders': len(self._fences),
+                'radii_m': dict(self.radii),
+                'hysteresis_m': self.hysteresis_m
+            }
+
+# Singleton instance
+geofence_engine = GeofenceEngine()
@@ -0,0 +1,170 @@
+import math
+import numpy as np
+import polyline
+
+# Google encoded polyline, 5 decimals (~1 m), same format OpenRouteService returns
+POLYLINE_PRECISION = 5
+
+# Web-map zoom levels accepted by ?zoom=
+MAX_ZOOM = 24
+
+# Precomputed Douglas-Peucker levels (tolerance in meters), roughly one screen
+# pixel at web-map zoom 7, 9, 11 and 13 (the zoom our maps open at) over Morocco;
+# closer zooms get full resolution
+SIMPLIFY_TOLERANCES_M = (1000, 250, 60, 15)
+REFERENCE_LATITUDE = 32.0
+EARTH_RADIUS_M = 6371000
+
+def encode_geometry(points):
+    """Encode a list of [lat, lon] points as a polyline string (None if empty)"""
+    if not points:
+        return None
+    return polyline.encode([(p[0], p[1]) for p in points], POLYLINE_PRECISION)
+
+def decode_geometry(encoded):
+    """Decode a polyline string back to a list of [lat, lon] points"""
+    if not encoded:
+        return []
+    return [[lat, lon] for lat, lon in polyline.decode(encoded, POLYLINE_PRECISION)]
+
+def simplify_geometry(points, tolerance_m):
+    """
+    Douglas-Peucker simplification of [lat, lon] points.
+    Distances use a local equirectangular projection, which is accurate
+    well below the tolerances used for display.
+    """
+    if not points or len(points) < 3 or tolerance_m <= 0:
+        return [[p[0], p[1]] for p in points or []]
+
+    pts = np.asarray(points, dtype=np.float64)[:, :2]
+    cos_lat = math.cos(math.radians(pts[:, 0].mean()))
+    xy = np.column_stack((np.radians(pts[:, 1]) * cos_lat, np.radians(pts[:, 0]))) * EARTH_RADIUS_M
+
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = xy[last] - xy[first]
+        offsets = xy[first + 1:last] - xy[first]
+        length_sq = segment @ segment
+        if length_sq == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            t = np.clip(offsets @ segment / length_sq, 0.0, 1.0)
+            distances = np.hypot(*(offsets - t[:, None] * segment).T)
+        worst = int(np.argmax(distances))
+        if distances[worst] > tolerance_m:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return pts[keep].tolist()
+
+def encode_route_levels(points):
+    """
+    Storage fields for a route: full-resolution polyline plus one simplified
+    polyline per SIMPLIFY_TOLERANCES_M entry (keyed by tolerance).
+    """
+    return {
+        'route_polyline': encode_geometry(points),
+        'route_polyline_levels': {
+            str(tolerance): encode_geometry(simplify_geometry(points, tolerance))
+            for tolerance in SIMPLIFY_TOLERANCES_M
+        } if points else {}
+    }
+
+def zoom_tolerance_m(zoom):
+    """Size of one web-map pixel (meters) at the given zoom level"""
+    return 156543.03 * math.cos(math.radians(REFERENCE_LATITUDE)) / (2 ** float(zoom))
+
+def _finite(value, name):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if not math.isfinite(number):
+        raise ValueError(f'{name} must be a number')
+    return number
+
+def geometry_request(args):
+    """
+    Parse geometry query parameters.
+
+    Returns:
+        None if the client did not ask for geometry, otherwise the acceptable
+        simplification tolerance in meters (0 = full resolution).
+        ?zoom=<level> or ?tolerance=<meters> imply ?geometry=1.
+
+    Raises:
+        ValueError: tolerance or zoom is not a finite number, or zoom is out of range
+    """
+    if args.get('tolerance') is not None:
+        return max(_finite(args['tolerance'], 'tolerance'), 0.0)
+    if args.get('zoom') is not None:
+        zoom = _finite(args['zoom'], 'zoom')
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ValueError(f'zoom must be between 0 and {MAX_ZOOM}')
+        return zoom_tolerance_m(zoom)
+    if str(args.get('geometry', '')).lower() in ('1', 'true', 'yes', 'decoded'):
+        return 0.0
+    return None
+
+def select_level(levels, tolerance_m):
+    """Coarsest precomputed level within the tolerance, or None for full resolution"""
+    fitting = [int(key) for key in (levels or {}) if int(key) <= tolerance_m]
+    return str(max(fitting)) if fitting else None
+
+def route_at_tolerance(route_info, tolerance_m=None):
+    """
+    Copy of a cached RouteService result for a response: 'geometry' is the coarsest
+    precomputed level within tolerance_m (None = full resolution), and the stored
+    'geometry_levels' are dropped. Routes cached without levels are simplified here.
+    """
+    route = {k: v for k, v in route_info.items() if k != 'geometry_levels'}
+    if tolerance_m is None or not route.get('geometry'):
+        return route
+    levels = route_info.get('geometry_levels')
+    if levels is None:
+        levels = encode_route_levels(route['geometry'])['route_polyline_levels']
+    level = select_level(levels, tolerance_m)
+    if level:
+        route['geometry'] = decode_geometry(levels[level])
+        route['geometry_tolerance_m'] = int(level)
+    return route
+
+def compact_route(route_info):
+    """Copy of a RouteService result with 'geometry' stored as 'polyline'"""
+    if not route_info:
+        return route_info
+    compact = {k: v for k, v in route_info.items() if k not in ('geometry', 'geometry_levels')}
+    compact['polyline'] = encode_geometry(route_info.get('geometry'))
+    return compact
+
+def expand_order_geometry(order, geometry=None):
+    """
+    Prepare stored order geometry for a response.
+    Orders keep only encoded polylines; the [lat, lon] list is decoded on request
+    (`geometry` is the tolerance from geometry_request, None = not requested),
+    from the coarsest precomputed level that fits the tolerance.
+    Legacy documents that still hold a `route_geometry` list are re-encoded.
+    """
+    legacy = order.pop('route_geometry', None)
+    if legacy and not order.get('route_polyline'):
+        order.update(encode_route_levels(legacy))
+
+    levels = order.pop('route_polyline_levels', None)
+    if geometry is not None:
+        level = select_level(levels, geometry)
+        encoded = levels[level] if level else order.get('route_polyline')
+        order['route_geometry'] = decode_geometry(encoded)
+        order['route_geometry_tolerance_m'] = int(level) if level else 0
+
+    insights_route = (order.get('delivery_insights') or {}).get('route')
+    if insights_route and 'geometry' in insights_route:
+        order['delivery_insights']['route'] = compact_route(insights_route)
+
+    return order
@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+
+# Statuses worth retrying: throttling and upstream/server failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods safe to send twice: only these are retried after a 5xx or a dropped connection
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Per-service circuit breaker.
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open once `reset_timeout` seconds have passed, letting one probe through;
+    half_open -> closed on success, back to open on failure.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or Config.CIRCUIT_RESET_SECONDS
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.short_circuited = 0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go to the upstream right now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at >= self.reset_timeout:
+                    self.state = self.HALF_OPEN
+                    self._probe_in_flight = False
+                else:
+                    self.short_circuited += 1
+                    return False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.short_circuited += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'short_circuited': self.short_circuited,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout_seconds': self.reset_timeout
+            }
+
+class ServiceClient:
+    """
+    HTTP client for one external service: pooled keep-alive session,
+    bounded retries with exponential backoff and full jitter, a circuit
+    breaker, and latency statistics.
+    """
+
+    def __init__(self, name, timeout=10, retries=None, backoff=None, breaker=None, session=None):
+        self.name = name
+        self.timeout = timeout
+        self.retries = Config.HTTP_RETRIES if retries is None else retries
+        self.backoff = Config.HTTP_BACKOFF_SECONDS if backoff is None else backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = session or _shared_session
+        self._latencies = deque(maxlen=500)
+        self._counters = {'requests': 0, 'attempts': 0, 'retries': 0, 'failures': 0}
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """
+        Send a request through the breaker.
+        Raises CircuitOpenError without touching the network while the circuit is open,
+        and the last error once retries are exhausted. 4xx responses (other than 429)
+        are returned as-is: the upstream is healthy, the request is not.
+        Only connect failures, 429 and 5xx on idempotent methods are retried; a read
+        timeout fails at once since the upstream may already be acting on the request.
+
+        Args:
+            idempotent: override for methods that are safe to repeat here (e.g. a POST query)
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit open")
+
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            self._counters['requests'] += 1
+
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        last_error = None
+        succeeded = False
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    # Full jitter: sleep anywhere in [0, backoff * 2^attempt)
+                    time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+                    with self._lock:
+                        self._counters['retries'] += 1
+
+                start = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except requests.ConnectionError as e:
+                    self._record_attempt(start)
+                    if not (idempotent or isinstance(e, requests.ConnectTimeout)):
+                        raise
+                    last_error = e
+                    continue
+                except requests.RequestException:
+                    # Read timeouts, redirect loops, bad URLs...: not worth another attempt
+                    self._record_attempt(start)
+                    raise
+
+                self._record_attempt(start)
+                if response.status_code in RETRY_STATUSES:
+                    last_error = requests.HTTPError(
+                        f"{self.name} returned {response.status_code}", response=response
+                    )
+                    if idempotent or response.status_code == 429:
+                        continue
+                    break
+
+                succeeded = True
+                self.breaker.record_success()
+                return response
+
+            raise last_error
+        finally:
+            # Whatever ended the call, the breaker hears about it (and a half-open probe is released)
+            if not succeeded:
+                with self._lock:
+                    self._counters['failures'] += 1
+                self.breaker.record_failure()
+
+    def _record_attempt(self, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._counters['attempts'] += 1
+            self._latencies.append(elapsed_ms)
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._latencies)
+            counters = dict(self._counters)
+
+        def percentile(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 1)
+
+        return {
+            **counters,
+            'latency_ms': {
+                'samples': len(samples),
+                'avg': round(sum(samples) / len(samples), 1) if samples else None,
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'max': round(samples[-1], 1) if samples else None
+            },
+            'circuit': self.breaker.stats()
+        }
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=Config.HTTP_POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# One keep-alive pool shared by every external service
+_shared_session = _build_session()
@@ -0,0 +1,172 @@
+import argparse
+from pymongo import IndexModel, ASCENDING, GEOSPHERE
+from pymongo.errors import PyMongoError
+from utils.db import get_db
+from utils.pagination import ORDER_LIST_SORT
+from utils.location_history import location_history
+from utils.route_cache import route_cache
+
+# Options that make two indexes on the same keys different
+COMPARED_OPTIONS = ('unique', 'sparse', 'expireAfterSeconds', 'partialFilterExpression')
+
+def required_indexes():
+    """
+    Every index the application's queries rely on, per collection.
+    Names are part of the declaration: an index is matched by name first.
+    """
+    return {
+        'orders': [
+            IndexModel('tracking_number', name='tracking_number_unique', unique=True),
+            # Order lists (keyset pagination), newest first, optionally per user / status
+            IndexModel(ORDER_LIST_SORT, name='created_at_id'),
+            IndexModel([('user_id', ASCENDING)] + ORDER_LIST_SORT, name='user_created_at_id'),
+            IndexModel([('user_id', ASCENDING), ('status', ASCENDING)] + ORDER_LIST_SORT,
+                       name='user_status_created_at_id'),
+            # Status-filtered lists (live tracking); also serves plain status lookups
+            IndexModel([('status', ASCENDING)] + ORDER_LIST_SORT, name='status_created_at_id'),
+            IndexModel([('sender.location', GEOSPHERE)], name='sender_location_2dsphere'),
+            IndexModel([('recipient.location', GEOSPHERE)], name='recipient_location_2dsphere')
+        ],
+        'users': [
+            IndexModel('email', name='email_unique', unique=True),
+            IndexModel([('role', ASCENDING), ('is_active', ASCENDING)], name='role_is_active')
+        ],
+        'drivers': [
+            IndexModel('driver_id', name='driver_id_unique', unique=True),
+            IndexModel([('driver_type', ASCENDING), ('city', ASCENDING), ('status', ASCENDING)],
+                       name='type_city_status'),
+            IndexModel([('current_location_geo', GEOSPHERE)], name='current_location_geo_2dsphere')
+        ],
+        'agents': [
+            IndexModel('agent_id', name='agent_id')
+        ],
+        location_history.COLLECTION: location_history.index_models(),
+        route_cache.COLLECTION: [
+            IndexModel('expires_at', name='expires_at_1', expireAfterSeconds=0)
+        ]
+    }
+
+def diff_indexes(existing, declared):
+    """
+    Compare a collection's index_information() with its declared IndexModels.
+
+    Returns:
+        {'present': [names], 'missing': [IndexModel], 'ttl_changes': [(name, seconds)],
+         'conflicts': [(name, reason)], 'unmanaged': [names]}
+    """
+    result = {'present': [], 'missing': [], 'ttl_changes': [], 'conflicts': [], 'unmanaged': []}
+    by_keys = {tuple(info['key']): name for name, info in existing.items()}
+    declared_names = set()
+
+    for model in declared:
+        spec = model.document
+        name, keys = spec['name'], tuple(spec['key'].items())
+        declared_names.add(name)
+        info = existing.get(name)
+        if info is None:
+            other = by_keys.get(keys)
+            if other:
+                result['conflicts'].append((name, f'same keys already indexed as {other!r}'))
+            else:
+                result['missing'].append(model)
+            continue
+        if tuple(tuple(key) for key in info['key']) != keys:
+            result['conflicts'].append((name, f"keys differ: {list(info['key'])} != {list(keys)}"))
+            continue
+
+        different = [option for option in COMPARED_OPTIONS if info.get(option) != spec.get(option)]
+        if different == ['expireAfterSeconds'] and spec.get('expireAfterSeconds') is not None \
+                and info.get('expireAfterSeconds') is not None:
+            # A TTL can be changed in place (collMod), no rebuild needed
+            result['ttl_changes'].append((name, spec['expireAfterSeconds']))
+        elif different:
+            result['conflicts'].append((name, f"options differ: {', '.join(different)}"))
+        else:
+            result['present'].append(name)
+
+    result['unmanaged'] = sorted(name for name in existing if name != '_id_' and name not in declared_names)
+    return result
+
+class IndexManager:
+    """
+    Creates the declared indexes, idempotently: existing indexes are left
+    alone, missing ones are built, TTL changes are applied in place.
+    Conflicting or undeclared indexes are only reported, never dropped.
+    """
+
+    def __init__(self, declarations=None):
+        self._declarations = declarations
+
+    def declarations(self):
+        return self._declarations if self._declarations is not None else required_indexes()
+
+    def ensure(self, db=None, dry_run=False):
+        """
+        Returns:
+            {collection: {'present', 'created', 'ttl_changes', 'conflicts', 'unmanaged', 'errors'}}
+        """
+        db = db if db is not None else get_db()
+        report = {}
+        for collection_name, declared in self.declarations().items():
+            collection = db[collection_name]
+            diff = diff_indexes(collection.index_information(), declared)
+            entry = {
+                'present': diff['present'],
+                'created': [model.document['name'] for model in diff['missing']],
+                'ttl_changes': [name for name, _ in diff['ttl_changes']],
+                'conflicts': [f'{name}: {reason}' for name, reason in diff['conflicts']],
+                'unmanaged': diff['unmanaged'],
+                'errors': []
+            }
+            report[collection_name] = entry
+            if dry_run:
+                continue
+
+            # One at a time: a failing index (e.g. duplicates under a unique key) must not block the rest
+            for model in diff['missing']:
+                try:
+                    collection.create_indexes([model])
+                except PyMongoError as e:
+                    entry['created'].remove(model.document['name'])
+                    entry['errors'].append(f"{model.document['name']}: {e}")
+            for name, seconds in diff['ttl_changes']:
+                try:
+                    db.command('collMod', collection_name, index={'name': name, 'expireAfterSeconds': seconds})
+                except PyMongoError as e:
+                    entry['ttl_changes'].remove(name)
+                    entry['errors'].append(f'{name}: {e}')
+        return report
+
+    @staticmethod
+    def summary(report):
+        """Log lines for a report: one per change or problem"""
+        lines = []
+        for collection_name, entry in report.items():
+            for name in entry['created']:
+                lines.append(f"✅ {collection_name}.{name} created")
+            for name in entry['ttl_changes']:
+                lines.append(f"✅ {collection_name}.{name} TTL updated")
+            for problem in entry['conflicts'] + entry['errors']:
+                lines.append(f"⚠️ {collection_name}.{problem}")
+        return lines
+
+# Singleton instance
+index_manager = IndexManager()
+
+def ensure_indexes(db=None, dry_run=False):
+    """Create the required indexes and log what changed"""
+    report = index_manager.ensure(db, dry_run=dry_run)
+    for line in IndexManager.summary(report):
+        print(line)
+    return report
+
+if __name__ == '__main__':
+    from utils.db import init_db
+    parser = argparse.ArgumentParser(description='Create the MongoDB indexes the application needs')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would change')
+    args = parser.parse_args()
+    init_db()
+    report = ensure_indexes(dry_run=args.dry_run)
+    for collection_name, entry in report.items():
+        print(f"📚 {collection_name}: {len(entry['present'])} present, {len(entry['created'])} "
+              f"{'to create' if args.dry_run else 'created'}, unmanaged: {', '.join(entry['unmanaged']) or '-'}")
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from config import Config
+from utils.db import get_db
+
+class LocationHistory:
+    """
+    Driver GPS trail stored as bucketed documents: one document per driver per
+    `bucket_minutes`, holding packed parallel arrays
+
+        {driver_id, bucket_start, count, first_at, last_at, orders: [tracking numbers],
+         t: [ms since bucket_start], lat: [...], lng: [...], order: [tracking number | None]}
+
+    so a day of 3 s pings is ~24 documents instead of ~28,800, and any range
+    for a driver or an order is served by a single indexed query. Buckets
+    expire after `retention_days` (TTL index on bucket_start).
+    """
+
+    COLLECTION = 'location_history'
+
+    def __init__(self, bucket_minutes=None, max_points=None, retention_days=None):
+        self.bucket_minutes = bucket_minutes or Config.LOCATION_HISTORY_BUCKET_MINUTES
+        self.max_points = max_points or Config.LOCATION_HISTORY_BUCKET_MAX_POINTS
+        self.retention_days = retention_days or Config.LOCATION_HISTORY_RETENTION_DAYS
+
+    def index_models(self):
+        return [
+            IndexModel([('driver_id', ASCENDING), ('bucket_start', ASCENDING)], name='driver_bucket'),
+            IndexModel([('orders', ASCENDING), ('bucket_start', ASCENDING)], name='orders_bucket'),
+            IndexModel('bucket_start', name='bucket_start_ttl', expireAfterSeconds=self.retention_days * 86400)
+        ]
+
+    def ensure_indexes(self, db=None):
+        self._collection(db).create_indexes(self.index_models())
+
+    def bucket_start(self, timestamp):
+        minutes = (timestamp.hour * 60 + timestamp.minute) // self.bucket_minutes * self.bucket_minutes
+        return timestamp.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+
+    # --- writes ------------------------------------------------------------
+
+    def bucket_updates(self, driver_id, points):
+        """
+        Upserts appending points to the driver's buckets (one per bucket touched,
+        more when a period gets more than `max_points`).
+
+        Args:
+            points: iterable of (timestamp, [lat, lng], tracking_number or None)
+
+        Returns:
+            list of pymongo UpdateOne, ready for bulk_write
+        """
+        buckets = {}
+        for timestamp, location, tracking_number in points:
+            buckets.setdefault(self.bucket_start(timestamp), []).append((timestamp, location, tracking_number))
+
+        updates = []
+        for start, period_points in buckets.items():
+            for chunk in range(0, len(period_points), self.max_points):
+                updates.append(self._bucket_update(driver_id, start, period_points[chunk:chunk + self.max_points]))
+        return updates
+
+    def _bucket_update(self, driver_id, start, bucket_points):
+        """Upsert appending at most max_points points to one bucket of the period"""
+        orders = sorted({tn for _, _, tn in bucket_points if tn})
+        update = {
+            '$push': {
+                't': {'$each': [int((ts - start).total_seconds() * 1000) for ts, _, _ in bucket_points]},
+                'lat': {'$each': [round(float(loc[0]), 6) for _, loc, _ in bucket_points]},
+                'lng': {'$each': [round(float(loc[1]), 6) for _, loc, _ in bucket_points]},
+                'order': {'$each': [tn for _, _, tn in bucket_points]}
+            },
+            '$inc': {'count': len(bucket_points)},
+            '$min': {'first_at': min(ts for ts, _, _ in bucket_points)},
+            '$max': {'last_at': max(ts for ts, _, _ in bucket_points)}
+        }
+        if orders:
+            update['$addToSet'] = {'orders': {'$each': orders}}
+        # Only a bucket with room for every point matches; otherwise the upsert opens
+        # a new one for the same period, so no bucket grows past max_points
+        return UpdateOne(
+            {'driver_id': driver_id, 'bucket_start': start, 'count': {'$lte': self.max_points - len(bucket_points)}},
+            update,
+            upsert=True
+        )
+
+    def record(self, driver_id, points, db=None):
+        """Append points for one driver"""
+        updates = self.bucket_updates(driver_id, points)
+        if updates:
+            self._collection(db).bulk_write(updates, ordered=False)
+
+    # --- reads -------------------------------------------------------------
+
+    def trail(self, start, end, driver_id=None, tracking_number=None, db=None):
+        """
+        Points recorded in [start, end) for a driver and/or an order, oldest first.
+
+        Returns:
+            list of [timestamp, lat, lng, tracking_number]
+        """
+        query = {'bucket_start': {'$gte': self.bucket_start(start), '$lt': end}}
+        if driver_id:
+            query['driver_id'] = driver_id
+        if tracking_number:
+            query['orders'] = tracking_number
+
+        points = []
+        for bucket in self._collection(db).find(query, {'_id': 0, 'bucket_start': 1, 't': 1, 'lat': 1, 'lng': 1, 'order': 1}):
+            base = bucket['bucket_start']
+            for offset, lat, lng, order in zip(bucket['t'], bucket['lat'], bucket['lng'], bucket['order']):
+                if tracking_number and order != tracking_number:
+                    continue
+                timestamp = base + timedelta(milliseconds=offset)
+                if start <= timestamp < end:
+                    points.append([timestamp, lat, lng, order])
+        points.sort(key=lambda point: point[0])
+        return points
+
+    def _collection(self, db=None):
+        db = db if db is not None else get_db()
+        return db[self.COLLECTION]
+
+# Singleton instance
+location_history = LocationHistory()
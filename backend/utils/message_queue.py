@@ -0,0 +1,133 @@
+import argparse
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+from socketio import PubSubManager
+
+RECONNECT_SECONDS = 1.0
+
+SUBSCRIBE = b'SUBSCRIBE\n'
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        broker = self.server
+        try:
+            for line in self.rfile:
+                if line == SUBSCRIBE:
+                    # Only listening connections receive messages; publishers never read
+                    with broker.lock:
+                        broker.clients.add(self.wfile)
+                    continue
+                if not line.strip():
+                    continue
+                with broker.lock:
+                    broker.relayed += 1
+                    dead = []
+                    for client in broker.clients:
+                        try:
+                            client.write(line)
+                            client.flush()
+                        except OSError:
+                            dead.append(client)
+                    for client in dead:
+                        broker.clients.discard(client)
+        finally:
+            with broker.lock:
+                broker.clients.discard(self.wfile)
+
+class LocalBroker(socketserver.ThreadingTCPServer):
+    """
+    Minimal stand-in for Redis when running several Socket.IO workers locally:
+    every newline-delimited message received is written to every subscribed
+    connection (including the sender's; PubSubManager skips its own messages).
+
+        python -m utils.message_queue --port 6390
+        SOCKETIO_MESSAGE_QUEUE=local://127.0.0.1:6390 FLASK_PORT=5000 python app.py
+        SOCKETIO_MESSAGE_QUEUE=local://127.0.0.1:6390 FLASK_PORT=5001 python app.py
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=6390):
+        super().__init__((host, port), _BrokerHandler)
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.relayed = 0
+
+    def start(self):
+        """Serve in a background thread; returns the bound port"""
+        threading.Thread(target=self.serve_forever, name='mq-broker', daemon=True).start()
+        return self.server_address[1]
+
+class LocalQueueManager(PubSubManager):
+    """
+    python-socketio client manager on top of LocalBroker (url local://host:port).
+    One connection publishes, another listens; both reconnect on failure.
+    """
+
+    name = 'local'
+
+    def __init__(self, url='local://127.0.0.1:6390', channel='socketio', write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        parsed = urlparse(url)
+        if parsed.scheme != 'local' or not parsed.port:
+            raise ValueError(f'unexpected message queue url: {url}')
+        self.address = (parsed.hostname or '127.0.0.1', parsed.port)
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _publish(self, data):
+        line = (self.json.dumps({'channel': self.channel, 'data': data}) + '\n').encode()
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = socket.create_connection(self.address, timeout=5)
+                    self._publisher.sendall(line)
+                    return
+                except OSError:
+                    if self._publisher is not None:
+                        self._publisher.close()
+                    self._publisher = None
+                    if attempt:
+                        raise
+
+    def _listen(self):
+        while True:
+            try:
+                with socket.create_connection(self.address) as conn:
+                    conn.sendall(SUBSCRIBE)
+                    for line in conn.makefile('rb'):
+                        try:
+                            message = self.json.loads(line)
+                        except ValueError:
+                            continue
+                        if message.get('channel') == self.channel:
+                            yield message['data']
+            except OSError as e:
+                self._get_logger().warning(f'message queue connection lost: {e}')
+            time.sleep(RECONNECT_SECONDS)
+
+def socketio_queue_options(url, channel):
+    """
+    SocketIO(...) keyword arguments for a message queue URL:
+    local:// uses the in-repo broker, anything else (redis://, amqp://, kafka://)
+    is handed to Flask-SocketIO. Empty url = single process.
+    """
+    if not url:
+        return {}
+    if url.startswith('local://'):
+        return {'client_manager': LocalQueueManager(url, channel=channel)}
+    return {'message_queue': url, 'channel': channel}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Socket.IO message broker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6390)
+    args = parser.parse_args()
+    broker = LocalBroker(args.host, args.port)
+    print(f"📡 Message broker listening on {args.host}:{args.port}")
+    broker.serve_forever()
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from utils.db import get_db
+
+# The only order fields location processing needs; none change during a trip
+# except status, which is kept current through set_status()/invalidate()
+ORDER_STATE_PROJECTION = {
+    '_id': 0,
+    'tracking_number': 1,
+    'user_id': 1,
+    'status': 1,
+    'sender.coordinates': 1,
+    'recipient.coordinates': 1
+}
+
+class OrderStateCache:
+    """
+    In-process LRU of the per-order state read on every GPS ping, keyed by
+    tracking number. Entries are primed when an order is created, written
+    through when the ping path itself progresses the status, and dropped by
+    every other status change (invalidate). The TTL bounds how long a change
+    made by another worker can go unseen.
+    """
+
+    def __init__(self, max_size=None, ttl_seconds=None):
+        self.max_size = max_size or Config.ORDER_STATE_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds or Config.ORDER_STATE_CACHE_TTL_SECONDS
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'loads': 0, 'invalidations': 0, 'evictions': 0, 'expired': 0}
+
+    def get(self, tracking_number, db=None):
+        """Cached state of one order (loaded from MongoDB on a miss), or None if unknown"""
+        return self.get_many([tracking_number], db).get(tracking_number)
+
+    def get_many(self, tracking_numbers, db=None):
+        """
+        States of several orders; misses are loaded with a single query.
+
+        Returns:
+            {tracking_number: {'tracking_number', 'user_id', 'status', 'sender', 'recipient'}}
+        """
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for tracking_number in set(tracking_numbers):
+                entry = self._entries.get(tracking_number)
+                if entry and entry[0] > now:
+                    self._entries.move_to_end(tracking_number)
+                    found[tracking_number] = self._copy(entry[1])
+                    self._counters['hits'] += 1
+                    continue
+                if entry:
+                    del self._entries[tracking_number]
+                    self._counters['expired'] += 1
+                missing.append(tracking_number)
+                self._counters['misses'] += 1
+
+        if missing:
+            db = db if db is not None else get_db()
+            query = {'tracking_number': missing[0] if len(missing) == 1 else {'$in': missing}}
+            for order in db.orders.find(query, ORDER_STATE_PROJECTION):
+                self.prime(order)
+                found[order['tracking_number']] = self._copy(order)
+            with self._lock:
+                self._counters['loads'] += 1
+        return found
+
+    def prime(self, order):
+        """Store the state of an order document we already hold"""
+        state = {
+            'tracking_number': order['tracking_number'],
+            'user_id': order.get('user_id'),
+            'status': order.get('status'),
+            'sender': {'coordinates': (order.get('sender') or {}).get('coordinates')},
+            'recipient': {'coordinates': (order.get('recipient') or {}).get('coordinates')}
+        }
+        with self._lock:
+            self._entries[state['tracking_number']] = (time.monotonic() + self.ttl_seconds, state)
+            self._entries.move_to_end(state['tracking_number'])
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def set_status(self, tracking_number, status):
+        """Write-through for a status change this process just persisted"""
+        with self._lock:
+            entry = self._entries.get(tracking_number)
+            if entry:
+                entry[1]['status'] = status
+
+    def invalidate(self, *tracking_numbers):
+        with self._lock:
+            for tracking_number in tracking_numbers:
+                if self._entries.pop(tracking_number, None):
+                    self._counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters['hits'] + counters['misses']
+        return {
+            **counters,
+            'hit_rate': round(counters['hits'] / lookups, 4) if lookups else 0.0,
+            'size': size,
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+    @staticmethod
+    def _copy(state):
+        return {
+            'tracking_number': state['tracking_number'],
+            'user_id': state.get('user_id'),
+            'status': state.get('status'),
+            'sender': dict(state.get('sender') or {}),
+            'recipient': dict(state.get('recipient') or {})
+        }
+
+# Singleton instance
+order_cache = OrderStateCache()
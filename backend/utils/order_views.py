@@ -0,0 +1,66 @@
+# Stored route geometry: the polylines plus the legacy decoded list
+ROUTE_GEOMETRY_FIELDS = ('route_polyline', 'route_polyline_levels', 'route_geometry')
+
+# Named response views as MongoDB projections (None = whole document).
+#   summary: what order lists and dashboards render, and what a reorder pre-fills
+#   detail:  one order's page (status history, insights) without stored geometry
+#   full:    the stored document
+ORDER_VIEWS = {
+    'summary': {
+        'tracking_number': 1,
+        'status': 1,
+        'sender.name': 1,
+        'sender.phone': 1,
+        'sender.address': 1,
+        'sender.city': 1,
+        'sender.coordinates': 1,
+        'recipient.name': 1,
+        'recipient.phone': 1,
+        'recipient.address': 1,
+        'recipient.city': 1,
+        'recipient.coordinates': 1,
+        'package': 1,
+        'delivery_type': 1,
+        'delivery_option': 1,
+        'warehouse_city': 1,
+        'assigned_agent': 1,
+        'assigned_pickup_driver': 1,
+        'assigned_intercity_driver': 1,
+        'route_distance_km': 1,
+        'route_duration_minutes': 1,
+        'estimated_delivery': 1,
+        'created_at': 1,
+        'updated_at': 1
+    },
+    'detail': {
+        **{field: 0 for field in ROUTE_GEOMETRY_FIELDS},
+        'delivery_insights.route.polyline': 0,
+        'sender.location': 0,
+        'recipient.location': 0
+    },
+    'full': None
+}
+
+def view_request(args, default='summary'):
+    """
+    Parse ?view= (summary, detail or full).
+
+    Returns:
+        view name; ValueError for an unknown view
+    """
+    view = (args.get('view') or default).lower()
+    if view not in ORDER_VIEWS:
+        raise ValueError(f"view must be one of: {', '.join(ORDER_VIEWS)}")
+    return view
+
+def order_projection(view, geometry=None):
+    """
+    MongoDB projection for a view. Route geometry is only read from disk when
+    the client asked for it (`geometry` from geometry_request, None = not requested).
+    """
+    projection = ORDER_VIEWS[view]
+    if projection is None or geometry is None:
+        return projection
+    if view == 'summary':
+        return {**projection, **{field: 1 for field in ROUTE_GEOMETRY_FIELDS}}
+    return {field: flag for field, flag in projection.items() if field not in ROUTE_GEOMETRY_FIELDS}
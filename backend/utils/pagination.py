@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+from config import Config
+
+EPOCH = datetime(1970, 1, 1)
+
+# Newest first; _id breaks ties between orders created in the same millisecond.
+# Backed by the created_at_id / user_*_created_at_id indexes (utils/indexes.py)
+ORDER_LIST_SORT = [('created_at', DESCENDING), ('_id', DESCENDING)]
+
+def page_size(args):
+    """?limit= clamped to [1, ORDERS_PAGE_SIZE_MAX] (default ORDERS_PAGE_SIZE)"""
+    limit = args.get('limit', Config.ORDERS_PAGE_SIZE, type=int) or Config.ORDERS_PAGE_SIZE
+    return max(1, min(limit, Config.ORDERS_PAGE_SIZE_MAX))
+
+def encode_cursor(doc, direction):
+    """Opaque token pointing just past `doc` in `direction` ('next' or 'prev')"""
+    # Integer milliseconds: MongoDB dates have no finer precision, and floats would round
+    millis = (doc['created_at'].replace(tzinfo=None) - EPOCH) // timedelta(milliseconds=1)
+    payload = {'t': millis, 'id': str(doc['_id']), 'd': direction}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """
+    Returns:
+        (created_at, ObjectId, direction); ValueError if the token is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        created_at = EPOCH + timedelta(milliseconds=int(payload['t']))
+        direction = payload['d']
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return created_at, ObjectId(payload['id']), direction
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError('Invalid page cursor') from e
+
+def keyset_page(collection, query, cursor=None, limit=None, projection=None):
+    """
+    One page of `query` in ORDER_LIST_SORT order, seeking on (created_at, _id)
+    instead of skipping, so every page costs the same as the first.
+
+    Args:
+        cursor: token from a previous page's 'next' / 'prev' (None = first page)
+
+    Returns:
+        (documents, page info {'limit', 'next', 'prev'}); next/prev are None at either end
+    """
+    limit = limit or Config.ORDERS_PAGE_SIZE
+    direction = 'next'
+    filters = dict(query)
+    if cursor:
+        created_at, oid, direction = decode_cursor(cursor)
+        op = '$lt' if direction == 'next' else '$gt'
+        seek = {'$or': [
+            {'created_at': {op: created_at}},
+            {'created_at': created_at, '_id': {op: oid}}
+        ]}
+        filters = {'$and': [query, seek]} if query else seek
+
+    # Backward pages walk the index the other way and are flipped afterwards
+    sort = ORDER_LIST_SORT if direction == 'next' else [(field, -order) for field, order in ORDER_LIST_SORT]
+    docs = list(collection.find(filters, projection).sort(sort).limit(limit + 1))
+    more = len(docs) > limit
+    docs = docs[:limit]
+    if direction == 'prev':
+        docs.reverse()
+
+    page = {'limit': limit, 'next': None, 'prev': None}
+    if docs:
+        if direction == 'next':
+            page['next'] = encode_cursor(docs[-1], 'next') if more else None
+            page['prev'] = encode_cursor(docs[0], 'prev') if cursor else None
+        else:
+            page['prev'] = encode_cursor(docs[0], 'prev') if more else None
+            page['next'] = encode_cursor(docs[-1], 'next')
+    return docs, page
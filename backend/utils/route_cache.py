@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from config import Config
+from utils.db import get_db
+
+class RouteCache:
+    """
+    Two-tier cache for RouteService results.
+    L1 is an in-process LRU bounded by size and TTL; L2 is a MongoDB collection
+    shared by every worker (documents expire through a TTL index).
+    Keys are origin/destination coordinates snapped to `precision` decimals.
+    """
+
+    COLLECTION = 'route_cache'
+
+    def __init__(self, max_size=None, ttl_seconds=None, precision=None):
+        self.max_size = max_size or Config.ROUTE_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds or Config.ROUTE_CACHE_TTL_SECONDS
+        self.precision = Config.ROUTE_CACHE_PRECISION if precision is None else precision
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'mongo_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expired': 0,
+            'mongo_errors': 0
+        }
+
+    def make_key(self, origin_coords, destination_coords):
+        """Normalised key: [lat, lon] pairs snapped to the configured precision"""
+        snapped = [round(float(value), self.precision)
+                   for value in (*origin_coords[:2], *destination_coords[:2])]
+        return '{:.{p}f},{:.{p}f}|{:.{p}f},{:.{p}f}'.format(*snapped, p=self.precision)
+
+    def get(self, key):
+        """Return a cached route (shallow copy) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                expires_at, route = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return dict(route)
+                del self._entries[key]
+                self._counters['expired'] += 1
+
+        route = self._mongo_get(key)
+        with self._lock:
+            if route is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['mongo_hits'] += 1
+
+        self._remember(key, route)
+        return dict(route)
+
+    def set(self, key, route):
+        """Store a route in both tiers"""
+        self._remember(key, route)
+        self._mongo_set(key, route)
+        with self._lock:
+            self._counters['stores'] += 1
+
+    def clear(self):
+        """Drop the in-process tier (the shared tier expires on its own)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        hits = counters['memory_hits'] + counters['mongo_hits']
+        lookups = hits + counters['misses']
+        return {
+            **counters,
+            'hits': hits,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'size': size,
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'precision': self.precision
+        }
+
+    def _remember(self, key, route):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, route)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def _collection(self):
+        # The expires_at TTL index is declared in utils/indexes.py
+        return get_db()[self.COLLECTION]
+
+    def _mongo_get(self, key):
+        try:
+            doc = self._collection().find_one({'_id': key, 'expires_at': {'$gt': datetime.utcnow()}})
+            return doc['route'] if doc else None
+        except Exception as e:
+            print(f"⚠️ Route cache read error: {e}")
+            with self._lock:
+                self._counters['mongo_errors'] += 1
+            return None
+
+    def _mongo_set(self, key, route):
+        try:
+            self._collection().update_one(
+                {'_id': key},
+                {'$set': {
+                    'route': route,
+                    'expires_at': datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Route cache write error: {e}")
+            with self._lock:
+                self._counters['mongo_errors'] += 1
+
+# Singleton instance shared by every RouteService
+route_cache = RouteCache()
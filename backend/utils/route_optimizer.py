@@ -1,30 +1,83 @@
-import math
+import time
 from typing import List, Dict, Tuple
 
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+IMPROVEMENT_EPS = 1e-9  # km; ignore floating-point noise gains
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Haversine distance (km) between points in degrees. Broadcasts over NumPy
+    arrays; every distance in this module goes through this one formula.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
 def calculate_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
     """Calculate Haversine distance between two coordinates in km"""
-    lat1, lon1 = coord1
-    lat2, lon2 = coord2
-    
-    R = 6371  # Earth radius in km
-    
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    
-    a = (math.sin(dlat / 2) ** 2 + 
-         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * 
-         math.sin(dlon / 2) ** 2)
-    
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    
-    return R * c
+    return float(haversine_km(coord1[0], coord1[1], coord2[0], coord2[1]))
+
+def haversine_matrix(coords) -> np.ndarray:
+    """
+    Compute all pairwise Haversine distances (km) in one batched NumPy pass.
+
+    Args:
+        coords: sequence or (n, 2) array of (lat, lon)
+
+    Returns:
+        (n, n) symmetric float64 matrix with a zero diagonal
+    """
+    points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    lat = points[:, 0]
+    lon = points[:, 1]
+    return haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+def build_distance_matrix(warehouse_coords: Tuple[float, float],
+                          delivery_points: List[Dict]) -> np.ndarray:
+    """
+    Distance matrix for a warehouse tour.
+    Index 0 is the warehouse, index i + 1 is delivery_points[i].
+    """
+    coords = [warehouse_coords] + [p['coordinates'] for p in delivery_points]
+    return haversine_matrix(coords)
+
+def nearest_neighbor_tour(matrix: np.ndarray) -> List[int]:
+    """
+    Nearest neighbor tour over a distance matrix, starting at index 0.
+
+    Returns:
+        Visit order as matrix indices, starting with 0 (the return leg is implicit)
+    """
+    n = len(matrix)
+    tour = [0]
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    current = 0
+
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, matrix[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        tour.append(current)
+
+    return tour
+
+def tour_length(matrix: np.ndarray, tour: List[int]) -> float:
+    """Length of a closed tour (including the leg back to tour[0])"""
+    if len(tour) < 2:
+        return 0.0
+
+    idx = np.asarray(tour)
+    return float(matrix[idx, np.roll(idx, -1)].sum())
 
 def optimize_delivery_route(warehouse_coords: Tuple[float, float], 
                             delivery_points: List[Dict]) -> List[Dict]:
     """
     Optimize route for inter-city truck starting from warehouse,
     visiting all delivery points, and returning to warehouse.
-    Uses nearest neighbor algorithm.
+    Uses nearest neighbor algorithm on a precomputed distance matrix.
     
     Args:
         warehouse_coords: (lat, lon) of starting warehouse
@@ -35,35 +88,327 @@ def optimize_delivery_route(warehouse_coords: Tuple[float, float],
     """
     if not delivery_points:
         return []
-    
-    unvisited = delivery_points.copy()
-    route = []
-    current_location = warehouse_coords
-    
-    # Nearest neighbor algorithm
-    while unvisited:
-        nearest = min(unvisited, 
-                     key=lambda p: calculate_distance(current_location, p['coordinates']))
-        route.append(nearest)
-        current_location = nearest['coordinates']
-        unvisited.remove(nearest)
-    
-    return route
+
+    matrix = build_distance_matrix(warehouse_coords, delivery_points)
+    tour = nearest_neighbor_tour(matrix)
+
+    return [delivery_points[i - 1] for i in tour[1:]]
 
 def calculate_total_distance(warehouse_coords: Tuple[float, float], 
-                            route: List[Dict]) -> float:
-    """Calculate total distance including return to warehouse"""
+                            route: List[Dict],
+                            matrix: np.ndarray = None) -> float:
+    """
+    Calculate total distance including return to warehouse.
+
+    If a matrix built by build_distance_matrix for this route order is given,
+    leg lengths are read from it instead of being recomputed.
+    """
     if not route:
         return 0
-    
-    total = 0
-    current = warehouse_coords
-    
-    for point in route:
-        total += calculate_distance(current, point['coordinates'])
-        current = point['coordinates']
-    
-    # Return to warehouse
-    total += calculate_distance(current, warehouse_coords)
-    
-    return total
+
+    if matrix is None:
+        coords = np.asarray([warehouse_coords] + [p['coordinates'] for p in route], dtype=np.float64)
+        legs = _haversine_legs(coords, np.roll(coords, -1, axis=0))
+        return float(legs.sum())
+
+    return tour_length(matrix, list(range(len(route) + 1)))
+
+def _haversine_legs(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """Element-wise Haversine distances (km) between two (n, 2) arrays"""
+    return haversine_km(origins[:, 0], origins[:, 1], destinations[:, 0], destinations[:, 1])
+
+def improve_tour(matrix: np.ndarray, tour: List[int], time_budget_s: float = 0.5,
+                 use_3opt: bool = False) -> Tuple[List[int], Dict]:
+    """
+    Local-search improvement of a closed tour built by a construction heuristic.
+    Applies 2-opt and Or-opt moves (and optionally 3-opt segment exchange)
+    until no improving move remains or the wall-clock budget runs out.
+    tour[0] (the warehouse) never moves.
+
+    Args:
+        matrix: distance matrix the tour indexes into
+        tour: visit order starting with the depot index
+        time_budget_s: wall-clock budget in seconds
+        use_3opt: also try 3-opt moves once 2-opt/Or-opt have converged
+
+    Returns:
+        (improved tour, stats dict with before/after distances and move counts)
+    """
+    start = time.perf_counter()
+    deadline = start + max(time_budget_s, 0)
+    initial = tour_length(matrix, tour)
+    moves = {'two_opt': 0, 'or_opt': 0, 'three_opt': 0}
+    converged = True
+
+    t = np.asarray(tour, dtype=np.intp)
+    if len(t) > 3:
+        converged = False
+        while time.perf_counter() < deadline:
+            improved = _two_opt_pass(matrix, t, deadline, moves)
+            t, or_improved = _or_opt_pass(matrix, t, deadline, moves)
+            improved = improved or or_improved
+            if not improved and use_3opt:
+                t, improved = _three_opt_pass(matrix, t, deadline, moves)
+            if not improved:
+                converged = time.perf_counter() < deadline
+                break
+
+    final = tour_length(matrix, t)
+    stats = {
+        'initial_distance_km': round(initial, 2),
+        'total_distance_km': round(final, 2),
+        'improvement_pct': round((initial - final) / initial * 100, 2) if initial else 0.0,
+        'moves': moves,
+        'converged': converged,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+    return [int(i) for i in t], stats
+
+def _two_opt_pass(matrix: np.ndarray, t: np.ndarray, deadline: float, moves: Dict) -> bool:
+    """One sweep of best-improvement 2-opt per edge; reverses t in place"""
+    n = len(t)
+    improved = False
+
+    for i in range(n - 2):
+        if time.perf_counter() >= deadline:
+            break
+        while True:
+            # Edge (t[i], t[i+1]) against every non-adjacent edge (t[j], t[j+1])
+            js = np.arange(i + 2, n if i > 0 else n - 1)
+            if len(js) == 0:
+                break
+            a, b = t[i], t[i + 1]
+            c, d = t[js], t[(js + 1) % n]
+            gain = matrix[a, b] + matrix[c, d] - matrix[a, c] - matrix[b, d]
+            best = int(np.argmax(gain))
+            if gain[best] <= IMPROVEMENT_EPS:
+                break
+            j = int(js[best])
+            t[i + 1:j + 1] = t[i + 1:j + 1][::-1]
+            moves['two_opt'] += 1
+            improved = True
+
+    return improved
+
+def _or_opt_pass(matrix: np.ndarray, t: np.ndarray, deadline: float,
+                 moves: Dict) -> Tuple[np.ndarray, bool]:
+    """Relocate segments of 1-3 stops (optionally reversed) to their best position"""
+    n = len(t)
+    improved = False
+
+    for length in (1, 2, 3):
+        i = 1
+        while i + length <= n:
+            if time.perf_counter() >= deadline:
+                return t, improved
+            p, s0, s1, nx = t[i - 1], t[i], t[i + length - 1], t[(i + length) % n]
+            removal_gain = matrix[p, s0] + matrix[s1, nx] - matrix[p, nx]
+
+            # Candidate insertion edges (t[j], t[j+1]) outside the segment
+            js = np.arange(n)
+            js = js[(js < i - 1) | (js > i + length - 1)]
+            if len(js) == 0:
+                break
+            c, d = t[js], t[(js + 1) % n]
+            forward = matrix[c, s0] + matrix[s1, d] - matrix[c, d]
+            backward = matrix[c, s1] + matrix[s0, d] - matrix[c, d]
+            cost = np.minimum(forward, backward)
+            best = int(np.argmin(cost))
+
+            if removal_gain - cost[best] > IMPROVEMENT_EPS:
+                j = int(js[best])
+                segment = t[i:i + length]
+                if backward[best] < forward[best]:
+                    segment = segment[::-1]
+                rest = np.concatenate((t[:i], t[i + length:]))
+                pos = j + 1 if j < i else j - length + 1
+                t = np.concatenate((rest[:pos], segment, rest[pos:]))
+                moves['or_opt'] += 1
+                improved = True
+            else:
+                i += 1
+
+    return t, improved
+
+def _three_opt_pass(matrix: np.ndarray, t: np.ndarray, deadline: float,
+                    moves: Dict) -> Tuple[np.ndarray, bool]:
+    """First-improvement 3-opt segment exchange: a-b..c-d..e-f becomes a-d..e-b..c-f"""
+    n = len(t)
+
+    for i in range(n - 3):
+        for j in range(i + 1, n - 2):
+            if time.perf_counter() >= deadline:
+                return t, False
+            ks = np.arange(j + 1, n)
+            a, b, c, d = t[i], t[i + 1], t[j], t[j + 1]
+            e, f = t[ks], t[(ks + 1) % n]
+            gain = (matrix[a, b] + matrix[c, d] + matrix[e, f]
+                    - matrix[a, d] - matrix[e, b] - matrix[c, f])
+            best = int(np.argmax(gain))
+            if gain[best] > IMPROVEMENT_EPS:
+                k = int(ks[best])
+                t = np.concatenate((t[:i + 1], t[j + 1:k + 1], t[i + 1:j + 1], t[k + 1:]))
+                moves['three_opt'] += 1
+                return t, True
+
+    return t, False
+
+def plan_capacitated_routes(matrix: np.ndarray, demands: List[float],
+                            capacities: List[float]) -> Tuple[List[List[int]], List[int]]:
+    """
+    Split stops into per-vehicle tours that respect vehicle capacity (CVRP).
+    Vehicles are filled largest first; each tour greedily extends to the nearest
+    unvisited stop that still fits in the remaining capacity.
+
+    Args:
+        matrix: distance matrix, index 0 is the depot
+        demands: load of each matrix index (demands[0] is ignored)
+        capacities: capacity of each available vehicle
+
+    Returns:
+        (tours, unassigned) where tours[v] is the tour of vehicle v (starting with 0,
+        empty list if unused) and unassigned lists stop indices no vehicle could take
+    """
+    n = len(matrix)
+    demand = np.asarray(demands, dtype=np.float64)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    tours = [[] for _ in capacities]
+
+    for v in sorted(range(len(capacities)), key=lambda k: -capacities[k]):
+        if visited.all():
+            break
+        remaining = float(capacities[v])
+        tour = [0]
+        current = 0
+        while True:
+            row = np.where(visited | (demand > remaining), np.inf, matrix[current])
+            nxt = int(np.argmin(row))
+            if not np.isfinite(row[nxt]):
+                break
+            visited[nxt] = True
+            remaining -= demand[nxt]
+            tour.append(nxt)
+            current = nxt
+        if len(tour) > 1:
+            tours[v] = tour
+
+    unassigned = [int(i) for i in np.flatnonzero(~visited)]
+    return tours, unassigned
+
+# Relative weight of a stop's lateness, by package urgency
+URGENCY_PRIORITIES = {'normal': 1.0, 'high': 3.0, 'express': 10.0}
+LATENESS_PENALTY = 10.0  # cost of one weighted late minute, in travel minutes
+
+def schedule_tour(travel_minutes: np.ndarray, tour: List[int], earliest: List[float],
+                  latest: List[float], service_minutes: float = 0) -> Dict:
+    """
+    Simulate a tour against time windows (minutes from departure at tour[0]).
+    A vehicle arriving before a window opens waits for it.
+
+    Returns:
+        dict of per-position 'arrival', 'start', 'lateness' lists plus
+        'travel_minutes' and 'end' (back at the depot)
+    """
+    arrival, start, lateness = [0.0], [0.0], [0.0]
+    clock = 0.0
+    travel = 0.0
+    for prev, stop in zip(tour, tour[1:]):
+        leg = travel_minutes[prev, stop]
+        travel += leg
+        arrive = clock + leg
+        begin = max(arrive, earliest[stop])
+        arrival.append(arrive)
+        start.append(begin)
+        lateness.append(max(0.0, begin - latest[stop]))
+        clock = begin + service_minutes
+
+    back = travel_minutes[tour[-1], tour[0]] if len(tour) > 1 else 0.0
+    return {
+        'arrival': arrival,
+        'start': start,
+        'lateness': lateness,
+        'travel_minutes': travel + back,
+        'end': clock + back
+    }
+
+def _schedule_cost(schedule: Dict, tour: List[int], priorities: List[float]) -> float:
+    weighted = sum(priorities[stop] * late for stop, late in zip(tour, schedule['lateness']))
+    return schedule['travel_minutes'] + LATENESS_PENALTY * weighted
+
+def sequence_with_time_windows(matrix: np.ndarray, earliest: List[float], latest: List[float],
+                               priorities: List[float], speed_kmh: float = 50,
+                               service_minutes: float = 5,
+                               time_budget_s: float = 0.1) -> Tuple[List[int], Dict]:
+    """
+    Urgency- and time-window-aware stop sequencing for one vehicle.
+
+    Construction picks the next stop by its time to service start scaled down by
+    priority, plus a heavy penalty for any weighted lateness; a repair pass then
+    tries to move late stops earlier while the budget allows.
+
+    Args:
+        matrix: distance matrix (km), index 0 is the depot
+        earliest / latest: window bounds per matrix index, minutes from departure
+            (use 0 / inf for unconstrained stops)
+        priorities: weight per matrix index (see URGENCY_PRIORITIES)
+        speed_kmh: average speed used to turn distances into travel times
+        service_minutes: handling time spent at each stop
+
+    Returns:
+        (tour starting with 0, schedule dict from schedule_tour plus 'cost')
+    """
+    deadline = time.perf_counter() + max(time_budget_s, 0)
+    travel = matrix / speed_kmh * 60
+    n = len(matrix)
+    open_at = np.asarray(earliest, dtype=np.float64)
+    close_at = np.asarray(latest, dtype=np.float64)
+    weight = np.asarray(priorities, dtype=np.float64)
+
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    tour = [0]
+    current = 0
+    clock = 0.0
+    for _ in range(n - 1):
+        begin = np.maximum(clock + travel[current], open_at)
+        late = np.maximum(0.0, begin - close_at)
+        score = (begin - clock) / weight + LATENESS_PENALTY * weight * late
+        score[visited] = np.inf
+        current = int(np.argmin(score))
+        visited[current] = True
+        tour.append(current)
+        clock = begin[current] + service_minutes
+
+    earliest = open_at.tolist()
+    latest = close_at.tolist()
+    priorities = weight.tolist()
+    schedule = schedule_tour(travel, tour, earliest, latest, service_minutes)
+    cost = _schedule_cost(schedule, tour, priorities)
+
+    # Repair: move each late stop (worst first) to its best earlier position
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        late_positions = sorted(
+            (pos for pos in range(1, len(tour)) if schedule['lateness'][pos] > 0),
+            key=lambda pos: -priorities[tour[pos]] * schedule['lateness'][pos]
+        )
+        for pos in late_positions:
+            stop = tour[pos]
+            rest = tour[:pos] + tour[pos + 1:]
+            for target in range(1, pos):
+                if time.perf_counter() >= deadline:
+                    break
+                candidate = rest[:target] + [stop] + rest[target:]
+                candidate_schedule = schedule_tour(travel, candidate, earliest, latest, service_minutes)
+                candidate_cost = _schedule_cost(candidate_schedule, candidate, priorities)
+                if candidate_cost < cost - IMPROVEMENT_EPS:
+                    tour, schedule, cost = candidate, candidate_schedule, candidate_cost
+                    improved = True
+                    break
+            if improved:
+                break
+
+    schedule['cost'] = cost
+    return tour, schedule
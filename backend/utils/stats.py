@@ -0,0 +1,85 @@
+import threading
+import time
+from config import Config
+from utils.counters import stats_counters
+from models.user import User
+
+def user_order_stats(user_id, db=None):
+    """Counters shown on a client's order list (materialized, one document)"""
+    key = stats_counters.user_key(user_id)
+    counter = stats_counters.read([key], db).get(key, {})
+    by_status = {status: count for status, count in counter.get('by_status', {}).items() if count}
+    return {
+        'total': counter.get('total', 0),
+        'pending': by_status.get('pending', 0),
+        'in_transit': by_status.get('in_transit', 0),
+        'delivered': by_status.get('delivered', 0),
+        'by_status': by_status
+    }
+
+def system_stats(db=None):
+    """Admin dashboard counters, read from the materialized counters (one query)"""
+    counters = stats_counters.read([stats_counters.USERS, stats_counters.ORDERS], db)
+    users = counters.get(stats_counters.USERS, {})
+    orders = counters.get(stats_counters.ORDERS, {})
+    roles = users.get('by_role', {})
+    by_status = {status: count for status, count in orders.get('by_status', {}).items() if count}
+    return {
+        'total_users': users.get('total', 0),
+        'active_users': users.get('active', 0),
+        'clients': roles.get(User.ROLE_CLIENT, 0),
+        'enterprises': roles.get(User.ROLE_ENTERPRISE, 0),
+        'employees': roles.get(User.ROLE_EMPLOYEE, 0),
+        'total_orders': orders.get('total', 0),
+        'pending_orders': by_status.get('pending', 0),
+        'in_transit_orders': by_status.get('in_transit', 0),
+        'delivered_orders': by_status.get('delivered', 0),
+        'orders_by_status': by_status
+    }
+
+class AdminStatsCache:
+    """
+    Holds the admin dashboard counters for a few seconds: the dashboard polls,
+    and every admin/employee sees the same numbers. Only one request computes
+    a refresh; the others keep serving the previous value meanwhile.
+    """
+
+    def __init__(self, ttl_seconds=None):
+        self.ttl_seconds = Config.ADMIN_STATS_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._value = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._counters = {'hits': 0, 'misses': 0}
+
+    def get(self, db=None):
+        with self._lock:
+            if self._value is not None and (time.monotonic() < self._expires or self._refreshing):
+                self._counters['hits'] += 1
+                return self._value
+            self._counters['misses'] += 1
+            self._refreshing = True
+        try:
+            value = system_stats(db)
+            with self._lock:
+                self._value = value
+                self._expires = time.monotonic() + self.ttl_seconds
+            return value
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self):
+        with self._lock:
+            self._expires = 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'ttl_seconds': self.ttl_seconds,
+                'age_seconds': round(time.monotonic() - (self._expires - self.ttl_seconds), 1) if self._value else None
+            }
+
+# Singleton instance
+admin_stats = AdminStatsCache()
@@ -1,7 +1,140 @@
+import threading
+import time
+from collections import deque
 from flask_socketio import SocketIO, emit, join_room, leave_room
+from config import Config
+from utils.message_queue import socketio_queue_options
 
 socketio = None
 
+# Window for per-room emit rates and idle time after which a room's stats are dropped
+RATE_WINDOW_SECONDS = 60
+ROOM_IDLE_SECONDS = 300
+
+class Broadcaster:
+    """
+    Coalescing broadcaster for high-frequency, last-value-wins events
+    (driver positions). publish() only records the latest payload per
+    (room, event); a background tick flushes every room once per
+    `tick_seconds`, so positions superseded within a tick are dropped instead
+    of being sent. A tick of 0 emits immediately.
+    """
+    
+    def __init__(self, tick_seconds=None, emit_fn=None):
+        self.tick_seconds = Config.BROADCAST_TICK_SECONDS if tick_seconds is None else tick_seconds
+        self._emit_fn = emit_fn
+        self._pending = {}  # (room, event) -> payload
+        self._rooms = {}    # room -> {'published', 'emitted', 'superseded', 'emits': deque, 'last_seen'}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._totals = {'published': 0, 'emitted': 0, 'superseded': 0, 'flushes': 0, 'errors': 0}
+    
+    def publish(self, room, event, data):
+        """Queue `data` as the latest value of `event` for `room`"""
+        if not self.tick_seconds:
+            with self._lock:
+                self._room(room)['published'] += 1
+                self._totals['published'] += 1
+            self._emit(room, event, data)
+            return
+        
+        with self._lock:
+            stats = self._room(room)
+            stats['published'] += 1
+            self._totals['published'] += 1
+            if (room, event) in self._pending:
+                stats['superseded'] += 1
+                self._totals['superseded'] += 1
+            self._pending[(room, event)] = data
+        self._ensure_started()
+    
+    def flush(self):
+        """Emit the latest pending value of every room (called on each tick)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._totals['flushes'] += 1
+        for (room, event), data in pending.items():
+            self._emit(room, event, data)
+        self._prune()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def stats(self, top=20):
+        now = time.monotonic()
+        with self._lock:
+            rooms = []
+            for room, stats in self._rooms.items():
+                while stats['emits'] and now - stats['emits'][0] > RATE_WINDOW_SECONDS:
+                    stats['emits'].popleft()
+                rooms.append({
+                    'room': room,
+                    'published': stats['published'],
+                    'emitted': stats['emitted'],
+                    'superseded': stats['superseded'],
+                    'emits_per_second': round(len(stats['emits']) / RATE_WINDOW_SECONDS, 3)
+                })
+            totals = dict(self._totals)
+            pending = len(self._pending)
+        rooms.sort(key=lambda r: (r['emits_per_second'], r['published']), reverse=True)
+        return {
+            **totals,
+            'tick_seconds': self.tick_seconds,
+            'pending': pending,
+            'rooms': len(rooms),
+            'busiest_rooms': rooms[:top]
+        }
+    
+    def _emit(self, room, event, data):
+        emit_fn = self._emit_fn or (socketio.emit if socketio else None)
+        if emit_fn is None:
+            return
+        try:
+            emit_fn(event, data, room=room)
+        except Exception as e:
+            print(f"⚠️ Broadcast to {room} failed: {e}")
+            with self._lock:
+                self._totals['errors'] += 1
+            return
+        with self._lock:
+            stats = self._room(room)
+            stats['emitted'] += 1
+            stats['emits'].append(time.monotonic())
+            self._totals['emitted'] += 1
+    
+    def _room(self, room):
+        stats = self._rooms.get(room)
+        if stats is None:
+            stats = {'published': 0, 'emitted': 0, 'superseded': 0, 'emits': deque(), 'last_seen': 0}
+            self._rooms[room] = stats
+        stats['last_seen'] = time.monotonic()
+        return stats
+    
+    def _prune(self):
+        now = time.monotonic()
+        with self._lock:
+            for room in [r for r, stats in self._rooms.items() if now - stats['last_seen'] > ROOM_IDLE_SECONDS]:
+                del self._rooms[room]
+    
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='broadcaster', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while not self._stop.wait(self.tick_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Broadcaster flush failed: {e}")
+        self.flush()
+
 def init_socketio(app):
     global socketio
     socketio = SocketIO(
@@ -11,7 +144,9 @@ def init_socketio(app):
         logger=True,
         engineio_logger=True,
         ping_timeout=60,
-        ping_interval=25
+        ping_interval=25,
+        # Shared queue so emits from any worker reach clients connected to the others
+        **socketio_queue_options(Config.SOCKETIO_MESSAGE_QUEUE, Config.SOCKETIO_CHANNEL)
     )
     
     @socketio.on('subscribe_order')
@@ -33,3 +168,14 @@ def init_socketio(app):
 def emit_order_update(tracking_number, order_data):
     if socketio:
         socketio.emit('order_update', order_data, room=tracking_number)
+
+def emit_driver_location(tracking_number, location_data):
+    # Coalesced: subscribers get at most one position per room per tick
+    broadcaster.publish(tracking_number, 'driver_location_update', location_data)
+
+def emit_geofence_event(tracking_number, event_data):
+    if socketio:
+        socketio.emit('geofence_event', event_data, room=tracking_number)
+
+# Singleton instance
+broadcaster = Broadcaster()
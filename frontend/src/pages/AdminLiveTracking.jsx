@@ -19,6 +19,10 @@ const driverIcon = new L.Icon({
   popupAnchor: [0, -40]
 });
 
+const ACTIVE_STATUSES = ['pickup_in_progress', 'in_transit', 'out_for_delivery'];
+// Sent as ?zoom= so the API returns route geometry simplified for this map
+const MAP_ZOOM = 13;
+
 export default function AdminLiveTracking() {
   const { isAdmin } = useAuth();
   const navigate = useNavigate();
@@ -45,10 +49,16 @@ export default function AdminLiveTracking() {
 
   const fetchActiveOrders = async () => {
     try {
-      const data = await apiClient.get('/orders');
-      const active = data.orders.filter(order => 
-        ['pickup_in_progress', 'in_transit', 'out_for_delivery'].includes(order.status)
-      );
+      // Server-side status filter, paged through to the end (not just the first page)
+      const active = [];
+      let cursor = null;
+      do {
+        const data = await apiClient.get('/orders', {
+          params: { zoom: MAP_ZOOM, status: ACTIVE_STATUSES.join(','), limit: 200, cursor }
+        });
+        active.push(...(data.orders || []));
+        cursor = data.page?.next || null;
+      } while (cursor);
       setActiveOrders(active);
       if (!selectedOrder && active.length > 0) {
         setSelectedOrder(active[0]);
@@ -232,7 +242,7 @@ export default function AdminLiveTracking() {
                         (selectedOrder.sender.coordinates[0] + selectedOrder.recipient.coordinates[0]) / 2,
                         (selectedOrder.sender.coordinates[1] + selectedOrder.recipient.coordinates[1]) / 2
                       ]}
-                      zoom={13}
+                      zoom={MAP_ZOOM}
                       style={{ height: '100%', width: '100%' }}
                     >
                       <TileLayer
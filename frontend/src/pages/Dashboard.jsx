@@ -15,6 +15,7 @@ export default function Dashboard() {
   const navigate = useNavigate();
   const { orders, loading } = useOrders();
   const [agents, setAgents] = useState([]);
+  const [systemStats, setSystemStats] = useState(null);
 
   useEffect(() => {
     if (!isAdmin() && !isEmployee()) {
@@ -25,6 +26,7 @@ export default function Dashboard() {
 
   useEffect(() => {
     fetchAgents();
+    fetchStats();
   }, []);
 
   const fetchAgents = async () => {
@@ -36,16 +38,26 @@ export default function Dashboard() {
     }
   };
 
+  // Totals come from the server-side counters: the order list is only the first page
+  const fetchStats = async () => {
+    try {
+      const data = await apiClient.get('/admin/stats');
+      setSystemStats(data.stats || null);
+    } catch (error) {
+      console.error('Error fetching stats:', error);
+    }
+  };
+
   const stats = [
     {
       label: 'Total Commandes',
-      value: orders.length,
+      value: systemStats?.total_orders ?? '-',
       icon: Package,
       color: 'bg-blue-500',
     },
     {
       label: 'En Livraison',
-      value: orders.filter(o => o.status === 'in_transit').length,
+      value: systemStats?.in_transit_orders ?? '-',
       icon: Truck,
       color: 'bg-green-500',
     },
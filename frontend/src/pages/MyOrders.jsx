@@ -15,6 +15,8 @@ export default function MyOrders() {
   const [orders, setOrders] = useState([]);
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
 
@@ -32,6 +34,7 @@ export default function MyOrders() {
       const params = statusFilter !== 'all' ? { status: statusFilter } : {};
       const data = await apiClient.get('/orders/my-orders', { params });
       setOrders(data.orders);
+      setNextCursor(data.page?.next || null);
       setStats(data.stats);
     } catch (error) {
       console.error('Error fetching orders:', error);
@@ -40,6 +43,23 @@ export default function MyOrders() {
     }
   };
 
+  // Next page appended to the list, so the search covers every loaded order
+  const loadMoreOrders = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const params = { cursor: nextCursor };
+      if (statusFilter !== 'all') params.status = statusFilter;
+      const data = await apiClient.get('/orders/my-orders', { params });
+      setOrders((current) => [...current, ...data.orders]);
+      setNextCursor(data.page?.next || null);
+    } catch (error) {
+      console.error('Error fetching orders:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filteredOrders = orders.filter(order =>
     order.tracking_number.toLowerCase().includes(searchTerm.toLowerCase()) ||
     order.recipient?.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
@@ -209,6 +229,14 @@ export default function MyOrders() {
               ))}
             </div>
           )}
+
+          {!loading && nextCursor && (
+            <div className="text-center mt-6">
+              <Button variant="secondary" onClick={loadMoreOrders} disabled={loadingMore}>
+                {loadingMore ? 'Chargement...' : 'Charger plus de commandes'}
+              </Button>
+            </div>
+          )}
         </motion.div>
       </div>
     </div>
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from utils.dispatcher import pickup_cost_matrix, solve_assignment, greedy_assignment
+
+CENTER = (33.5731, -7.6163)  # Casablanca
+BATCHES = [(10, 15), (50, 60), (100, 120), (300, 300)]  # (orders, drivers)
+ROUNDS = 10
+
+def random_points(n, rng):
+    return [[CENTER[0] + rng.uniform(-0.1, 0.1), CENTER[1] + rng.uniform(-0.1, 0.1)] for _ in range(n)]
+
+def main():
+    print("🚦 Batch dispatcher benchmark (optimal assignment vs greedy one-by-one)")
+    print("=" * 72)
+    print(f"  {'orders':>6} {'drivers':>7} {'greedy km':>10} {'optimal km':>10} {'saving':>7} {'build ms':>9} {'solve ms':>9}")
+
+    rng = random.Random(17)
+    for n_orders, n_drivers in BATCHES:
+        greedy_total = optimal_total = build_ms = solve_ms = 0.0
+        for _ in range(ROUNDS):
+            orders, drivers = random_points(n_orders, rng), random_points(n_drivers, rng)
+            loads = [rng.randint(0, 3) for _ in range(n_drivers)]
+
+            start = time.perf_counter()
+            cost, _ = pickup_cost_matrix(orders, drivers, loads)
+            build_ms += (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            pairs = solve_assignment(cost)
+            solve_ms += (time.perf_counter() - start) * 1000
+
+            optimal_total += sum(cost[r, c] for r, c in pairs)
+            greedy_total += sum(cost[r, c] for r, c in greedy_assignment(cost))
+
+        saving = (greedy_total - optimal_total) / greedy_total * 100
+        print(f"  {n_orders:>6} {n_drivers:>7} {greedy_total / ROUNDS:>10.1f} {optimal_total / ROUNDS:>10.1f} "
+              f"{saving:>6.1f}% {build_ms / ROUNDS:>9.2f} {solve_ms / ROUNDS:>9.2f}")
+
+if __name__ == '__main__':
+    main()
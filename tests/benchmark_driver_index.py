@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from utils.driver_index import DriverIndex, _distance_km
+
+# City centers [lat, lon] and a ~20 km box around each
+CITIES = {
+    'Casablanca': (33.5731, -7.6163),
+    'Rabat': (34.0209, -6.8498),
+    'Marrakech': (31.6295, -7.9811),
+    'Fès': (34.0181, -4.9998),
+    'Tanger': (35.7595, -5.8137),
+    'Agadir': (30.4278, -9.5981),
+}
+DRIVERS = 10000
+QUERIES = 2000
+K = 5
+
+def make_drivers(n, seed=7):
+    rng = random.Random(seed)
+    drivers = []
+    for i in range(n):
+        city = rng.choice(list(CITIES))
+        lat, lon = CITIES[city]
+        drivers.append({
+            'driver_id': f'DRV{i}',
+            'driver_type': 'pickup',
+            'city': city,
+            'status': 'available' if rng.random() < 0.7 else 'on_route',
+            'current_location': [lat + rng.uniform(-0.1, 0.1), lon + rng.uniform(-0.1, 0.1)]
+        })
+    return drivers
+
+def brute_force(drivers, location, city, k):
+    candidates = [
+        (_distance_km(location[0], location[1], *d['current_location']), d['driver_id'])
+        for d in drivers
+        if d['status'] == 'available' and d['driver_type'] == 'pickup' and d['city'] == city
+    ]
+    return sorted(candidates)[:k]
+
+def main():
+    print(f"🛵 Driver index benchmark ({DRIVERS} drivers, k={K})")
+    print("=" * 60)
+
+    drivers = make_drivers(DRIVERS)
+    index = DriverIndex(reload_seconds=0)
+
+    start = time.perf_counter()
+    index.load(drivers)
+    print(f"  Build:        {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    rng = random.Random(11)
+    queries = []
+    for _ in range(QUERIES):
+        city = rng.choice(list(CITIES))
+        lat, lon = CITIES[city]
+        queries.append(([lat + rng.uniform(-0.1, 0.1), lon + rng.uniform(-0.1, 0.1)], city))
+
+    start = time.perf_counter()
+    results = [index.nearest(loc, k=K, driver_type='pickup', city=city) for loc, city in queries]
+    indexed_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+    start = time.perf_counter()
+    expected = [brute_force(drivers, loc, city, K) for loc, city in queries[:200]]
+    scan_us = (time.perf_counter() - start) / 200 * 1e6
+
+    for got, want in zip(results, expected):
+        assert [d for d, _ in got] == [d for d, _ in want], 'index disagrees with brute force'
+
+    start = time.perf_counter()
+    for i in range(QUERIES):
+        index.update_location(f'DRV{i}', queries[i][0])
+    update_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+    print(f"  k-nearest:    {indexed_us:8.1f} µs/query")
+    print(f"  Linear scan:  {scan_us:8.1f} µs/query ({scan_us / indexed_us:.0f}x slower)")
+    print(f"  Location upd: {update_us:8.1f} µs/update")
+    print(f"  {index.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from utils.geofence import GeofenceEngine, OrderFences
+from utils.driver_index import _distance_km
+
+CENTER = (33.5731, -7.6163)  # Casablanca
+ORDERS = 1000
+PINGS = 200000
+
+def random_point(rng, spread=0.08):
+    return [CENTER[0] + rng.uniform(-spread, spread), CENTER[1] + rng.uniform(-spread, spread)]
+
+def inline_haversine(order, location):
+    """Previous per-ping check: haversine to the recipient against fixed thresholds"""
+    distance = _distance_km(location[0], location[1], *order['recipient']['coordinates'])
+    status = order['status']
+    if status == 'pickup_in_progress' and distance < 5:
+        return 'in_transit'
+    if status == 'in_transit' and distance < 1:
+        return 'out_for_delivery'
+    if status == 'out_for_delivery' and distance < 0.1:
+        return 'delivered'
+    return None
+
+def main():
+    print(f"📍 Geofence benchmark ({ORDERS} active orders, {PINGS} pings)")
+    print("=" * 60)
+
+    rng = random.Random(23)
+    orders = [{
+        'tracking_number': f'CTM{i:010d}',
+        'status': rng.choice(['pickup_in_progress', 'in_transit', 'out_for_delivery']),
+        'sender': {'coordinates': random_point(rng)},
+        'recipient': {'coordinates': random_point(rng)}
+    } for i in range(ORDERS)]
+    pings = [(orders[rng.randrange(ORDERS)], random_point(rng, 0.1)) for _ in range(PINGS)]
+
+    engine = GeofenceEngine(max_orders=ORDERS)
+    start = time.perf_counter()
+    for order in orders:
+        engine.evaluate(order, order['sender']['coordinates'])
+    build = time.perf_counter() - start
+
+    # Statuses are not advanced so every ping exercises the full check
+    start = time.perf_counter()
+    for order, location in pings:
+        engine.evaluate(order, location)
+    fenced = time.perf_counter() - start
+
+    # Fence math alone (no registry lookup / lock)
+    fences = {o['tracking_number']: OrderFences(o['sender']['coordinates'], o['recipient']['coordinates'], engine.radii, engine.hysteresis_m)
+              for o in orders}
+    start = time.perf_counter()
+    for order, location in pings:
+        fences[order['tracking_number']].update(location[0], location[1])
+    raw = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for order, location in pings:
+        inline_haversine(order, location)
+    inline = time.perf_counter() - start
+
+    stats = engine.stats()
+    print(f"  Fence build:          {build / ORDERS * 1e6:8.2f} µs/order")
+    print(f"  Geofence engine:      {PINGS / fenced:10,.0f} evaluations/s  ({fenced / PINGS * 1e6:.2f} µs, 4 fences + hysteresis)")
+    print(f"  Fence math only:      {PINGS / raw:10,.0f} evaluations/s  ({raw / PINGS * 1e6:.2f} µs, 2 equirectangular distances)")
+    print(f"  Inline haversine:     {PINGS / inline:10,.0f} evaluations/s  ({inline / PINGS * 1e6:.2f} µs, 1 distance)")
+    print(f"  Fence events:         {stats['events']:10,}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import math
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from utils.route_optimizer import (
+    optimize_delivery_route,
+    calculate_total_distance
+)
+
+# Casablanca hub and a box around the city
+WAREHOUSE = (33.6091, -7.5372)
+SIZES = [50, 500, 2000]
+
+def make_points(n, seed=42):
+    rng = random.Random(seed)
+    return [{
+        'order_id': str(i),
+        'coordinates': (33.45 + rng.random() * 0.25, -7.75 + rng.random() * 0.35),
+        'address': f'Stop {i}'
+    } for i in range(n)]
+
+def scalar_distance(coord1, coord2):
+    """Previous per-pair haversine, on Python floats"""
+    lat1, lon1 = coord1
+    lat2, lon2 = coord2
+    a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * 6371 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+def scalar_route(warehouse_coords, delivery_points):
+    """Previous implementation: per-pair Python haversine + list.remove"""
+    unvisited = delivery_points.copy()
+    route = []
+    current_location = warehouse_coords
+    while unvisited:
+        nearest = min(unvisited,
+                      key=lambda p: scalar_distance(current_location, p['coordinates']))
+        route.append(nearest)
+        current_location = nearest['coordinates']
+        unvisited.remove(nearest)
+    return route
+
+def scalar_total(warehouse_coords, route):
+    total = 0
+    current = warehouse_coords
+    for point in route:
+        total += scalar_distance(current, point['coordinates'])
+        current = point['coordinates']
+    return total + scalar_distance(current, warehouse_coords)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    print("🚚 Route optimizer benchmark (nearest neighbor + total distance)")
+    print("=" * 60)
+    print(f"{'stops':>6} {'scalar (s)':>12} {'matrix (s)':>12} {'speedup':>9} {'km':>10}")
+
+    for n in SIZES:
+        points = make_points(n)
+
+        old_route, old_time = timed(scalar_route, WAREHOUSE, points)
+        old_km, old_total_time = timed(scalar_total, WAREHOUSE, old_route)
+
+        new_route, new_time = timed(optimize_delivery_route, WAREHOUSE, points)
+        new_km, new_total_time = timed(calculate_total_distance, WAREHOUSE, new_route)
+
+        assert abs(old_km - new_km) < 1e-6 * max(old_km, 1), f"route mismatch at n={n}"
+
+        old_elapsed = old_time + old_total_time
+        new_elapsed = new_time + new_total_time
+        print(f"{n:>6} {old_elapsed:>12.4f} {new_elapsed:>12.4f} "
+              f"{old_elapsed / new_elapsed:>8.1f}x {new_km:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+from config import Config
+
+class ReadRecorder(monitoring.CommandListener):
+    """Names of the read commands sent to MongoDB"""
+    READS = {'find', 'getMore', 'aggregate', 'count', 'distinct'}
+
+    def __init__(self):
+        self.reads = []
+
+    def started(self, event):
+        if event.command_name in self.READS:
+            self.reads.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+_recorder = ReadRecorder()
+
+@pytest.fixture(scope='session')
+def mongo():
+    """Client on the configured MongoDB, shared by the session (skipped if unreachable)"""
+    client = MongoClient(Config.MONGODB_URI, serverSelectionTimeoutMS=1000, event_listeners=[_recorder])
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        client.close()
+        pytest.skip('MongoDB not reachable')
+    yield client
+    client.close()
+
+@pytest.fixture
+def db(mongo):
+    """Empty throwaway database, dropped afterwards; each test seeds what it needs"""
+    name = f'ctm_test_{uuid.uuid4().hex[:8]}'
+    yield mongo[name]
+    mongo.drop_database(name)
+
+@pytest.fixture
+def app_db(db):
+    """The throwaway database installed as the application's database (route tests)"""
+    import utils.db
+    previous, utils.db.db = utils.db.db, db
+    yield db
+    utils.db.db = previous
+
+@pytest.fixture
+def mongo_reads(mongo):
+    """Read commands recorded from now on"""
+    _recorder.reads.clear()
+    return _recorder
@@ -0,0 +1,20 @@
+"""Minimal Socket.IO worker used by test_socketio_fanout.py (port as argv[1])"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from flask import Flask, request, jsonify
+from utils.websocket import init_socketio, emit_driver_location
+
+app = Flask(__name__)
+socketio = init_socketio(app)
+
+@app.route('/api/driver/location', methods=['POST'])
+def update_driver_location():
+    data = request.json
+    emit_driver_location(data['tracking_number'], data)
+    return jsonify({'success': True, 'worker': os.getpid()})
+
+if __name__ == '__main__':
+    socketio.run(app, host='127.0.0.1', port=int(sys.argv[1]), allow_unsafe_werkzeug=True)
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from utils.websocket import Broadcaster
+
+class Recorder:
+    """Stands in for socketio.emit and records what would be sent"""
+
+    def __init__(self):
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def __call__(self, event, data, room=None):
+        with self.lock:
+            self.sent.append((room, event, data))
+
+def test_latest_value_per_room_wins():
+    sent = Recorder()
+    broadcaster = Broadcaster(tick_seconds=60, emit_fn=sent)
+    for i in range(10):
+        broadcaster.publish('CTM1', 'driver_location_update', {'seq': i})
+        broadcaster.publish('CTM2', 'driver_location_update', {'seq': i * 10})
+    broadcaster.publish('CTM1', 'other_event', {'seq': 'x'})
+    assert sent.sent == []
+
+    broadcaster.flush()
+    assert sorted(sent.sent, key=repr) == sorted([
+        ('CTM1', 'driver_location_update', {'seq': 9}),
+        ('CTM2', 'driver_location_update', {'seq': 90}),
+        ('CTM1', 'other_event', {'seq': 'x'})
+    ], key=repr)
+
+    stats = broadcaster.stats()
+    assert stats['published'] == 21
+    assert stats['superseded'] == 18
+    assert stats['emitted'] == 3
+    rooms = {r['room']: r for r in stats['busiest_rooms']}
+    assert rooms['CTM1']['published'] == 11 and rooms['CTM1']['emitted'] == 2
+
+    # Nothing new: the next tick sends nothing
+    broadcaster.flush()
+    assert len(sent.sent) == 3
+    broadcaster.stop()
+
+def test_tick_limits_emit_rate():
+    sent = Recorder()
+    broadcaster = Broadcaster(tick_seconds=0.1, emit_fn=sent)
+    started = time.monotonic()
+    seq = 0
+    while time.monotonic() - started < 0.55:
+        broadcaster.publish('CTM1', 'driver_location_update', {'seq': seq})
+        seq += 1
+        time.sleep(0.002)
+    broadcaster.stop()
+    time.sleep(0.15)
+
+    emitted = [data['seq'] for _, _, data in sent.sent]
+    assert seq > 100
+    assert 4 <= len(emitted) <= 8
+    assert emitted == sorted(emitted)
+    assert emitted[-1] == seq - 1  # the final position is never dropped
+
+def test_zero_tick_emits_immediately():
+    sent = Recorder()
+    broadcaster = Broadcaster(tick_seconds=0, emit_fn=sent)
+    for i in range(3):
+        broadcaster.publish('CTM1', 'driver_location_update', {'seq': i})
+    assert [data['seq'] for _, _, data in sent.sent] == [0, 1, 2]
+    assert broadcaster.stats()['superseded'] == 0
+
+def test_emit_failures_are_counted():
+    def failing(event, data, room=None):
+        raise RuntimeError('client gone')
+
+    broadcaster = Broadcaster(tick_seconds=0, emit_fn=failing)
+    broadcaster.publish('CTM1', 'driver_location_update', {})
+    stats = broadcaster.stats()
+    assert stats['errors'] == 1 and stats['emitted'] == 0
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"  ✅ {name}")
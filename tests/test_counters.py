@@ -0,0 +1,99 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from utils.counters import StatsCounters
+from utils.stats import system_stats, user_order_stats
+
+class RecordingCollection:
+    def __init__(self):
+        self.writes = []
+
+    def bulk_write(self, requests, ordered=True):
+        self.writes.append([(op._filter, op._doc) for op in requests])
+
+def test_transitions_are_merged_per_counter():
+    counters, collection = StatsCounters(), RecordingCollection()
+    counters.order_transitions([
+        ('u1', 'assigned', 'pickup_in_progress'),
+        ('u1', 'pickup_in_progress', 'in_transit'),
+        ('u2', 'in_transit', 'in_transit'),
+        (None, 'assigned', 'in_transit')
+    ], db={'counters': collection})
+    assert len(collection.writes) == 1
+    # pickup_in_progress was entered and left again within the batch
+    assert {f['_id']: doc['$inc'] for f, doc in collection.writes[0]} == {
+        'orders': {'by_status.assigned': -2, 'by_status.in_transit': 2},
+        'orders:u1': {'by_status.assigned': -1, 'by_status.in_transit': 1}
+    }
+
+def test_user_changes_move_role_and_active_counters():
+    counters, collection = StatsCounters(), RecordingCollection()
+    counters.user_changed({'role': 'client', 'is_active': True}, {'role': 'enterprise', 'is_active': False},
+                          db={'counters': collection})
+    counters.user_changed({'role': 'client', 'is_active': False}, {'role': 'client', 'is_active': False},
+                          db={'counters': collection})
+    assert len(collection.writes) == 1
+    assert collection.writes[0][0][1] == {'$inc': {'by_role.client': -1, 'by_role.enterprise': 1, 'active': -1}}
+
+def test_incremental_counters_match_a_rebuild(db):
+    counters = StatsCounters()
+    for i in range(30):
+        order = {'tracking_number': f'CTM{i}', 'user_id': f'u{i % 3}', 'status': 'assigned'}
+        db.orders.insert_one(order)
+        counters.order_created(order, db)
+    for i in range(0, 30, 2):
+        db.orders.update_one({'tracking_number': f'CTM{i}'}, {'$set': {'status': 'in_transit'}})
+        counters.order_status_changed(f'u{i % 3}', 'assigned', 'in_transit', db)
+    deleted = db.orders.find_one_and_delete({'tracking_number': 'CTM1'})
+    counters.order_deleted(deleted, db)
+    for role, active in (('client', True), ('client', True), ('employee', True)):
+        user = {'role': role, 'is_active': active}
+        db.users.insert_one(user)
+        counters.user_created(user, db)
+    counters.user_changed({'role': 'client', 'is_active': True}, {'role': 'client', 'is_active': False}, db)
+    db.users.update_one({'role': 'client'}, {'$set': {'is_active': False}})
+    
+    assert counters.rebuild(db, dry_run=True)['drift'] == []
+    stats = system_stats(db)
+    assert (stats['total_orders'], stats['in_transit_orders'], stats['active_users'], stats['clients']) == (29, 15, 2, 2)
+    assert user_order_stats('u1', db)['total'] == db.orders.count_documents({'user_id': 'u1'})
+    
+    # A write that bypassed the counters shows up as drift and is repaired
+    db.orders.insert_one({'tracking_number': 'CTMX', 'user_id': 'u1', 'status': 'pending'})
+    report = counters.rebuild(db)
+    assert {(d['counter'], d['field']) for d in report['drift']} == {
+        ('orders', 'total'), ('orders', 'by_status.pending'),
+        ('orders:u1', 'total'), ('orders:u1', 'by_status.pending')
+    }
+    assert counters.rebuild(db, dry_run=True)['drift'] == []
+
+def test_order_update_racing_a_status_change_keeps_counters_exact(app_db, monkeypatch):
+    from flask import Flask
+    from models.order import Order
+    from routes import orders as orders_route
+    from utils.counters import stats_counters
+    db = app_db
+    order = {'tracking_number': 'CTMRACE', 'user_id': 'u1', 'status': 'assigned', 'status_history': []}
+    db.orders.insert_one(order)
+    stats_counters.rebuild(db)
+    update_status = Order.update_status
+
+    def update_status_after_a_gps_transition(order, new_status, message='', agent_id=None):
+        # Another writer moves the order between our read and our write
+        db.orders.update_one({'_id': order['_id']}, {'$set': {'status': 'in_transit'}})
+        stats_counters.order_status_changed('u1', 'assigned', 'in_transit', db)
+        return update_status(order, new_status, message, agent_id)
+    monkeypatch.setattr(orders_route.Order, 'update_status', staticmethod(update_status_after_a_gps_transition))
+
+    app = Flask(__name__)
+    app.register_blueprint(orders_route.orders_bp, url_prefix='/api')
+    response = app.test_client().put(f"/api/orders/{order['_id']}", json={'status': 'delivered'})
+    assert response.status_code == 409
+    assert db.orders.find_one({'_id': order['_id']})['status'] == 'in_transit'
+    assert stats_counters.rebuild(db, dry_run=True)['drift'] == []
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,88 @@
+import os
+import sys
+import random
+from itertools import permutations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import numpy as np
+import pytest
+from utils.driver_index import driver_index
+from utils.dispatcher import (
+    BatchDispatcher, pickup_cost_matrix, solve_assignment, greedy_assignment, INFEASIBLE_COST
+)
+
+CASABLANCA = (33.5731, -7.6163)
+
+def random_points(n, rng):
+    return [[CASABLANCA[0] + rng.uniform(-0.08, 0.08), CASABLANCA[1] + rng.uniform(-0.08, 0.08)] for _ in range(n)]
+
+def test_assignment_matches_brute_force():
+    rng = random.Random(3)
+    for _ in range(20):
+        cost, _ = pickup_cost_matrix(random_points(5, rng), random_points(6, rng), [rng.randint(0, 4) for _ in range(6)])
+        pairs = solve_assignment(cost)
+        best = min(sum(cost[r, c] for c, r in enumerate(rows)) for rows in permutations(range(6), 5))
+        assert len(pairs) == 5
+        assert sum(cost[r, c] for r, c in pairs) == pytest.approx(best)
+
+def test_assignment_never_worse_than_greedy():
+    rng = random.Random(5)
+    for _ in range(20):
+        cost, _ = pickup_cost_matrix(random_points(30, rng), random_points(25, rng), [0] * 25)
+        optimal = sum(cost[r, c] for r, c in solve_assignment(cost))
+        greedy = sum(cost[r, c] for r, c in greedy_assignment(cost))
+        assert optimal <= greedy + 1e-9
+
+def test_cost_matrix_load_unknown_and_limit():
+    cost, distances = pickup_cost_matrix(
+        [[33.57, -7.61], None],
+        [[33.57, -7.61], [33.90, -7.61]],
+        [2, 0],
+        load_weight_km=1.0, unknown_distance_km=15, max_km=10
+    )
+    assert cost.shape == (2, 2)
+    assert cost[0, 0] == pytest.approx(2.0)          # same spot, two orders on the driver
+    assert cost[1, 0] == INFEASIBLE_COST             # ~37 km away
+    assert np.isnan(distances[0, 1]) and cost[0, 1] == pytest.approx(17.0)
+    # The far driver can still take the order without coordinates
+    assert sorted(solve_assignment(cost)) == [(0, 0), (1, 1)]
+
+def test_dispatch_batch_writes_assignments(db):
+    rng = random.Random(9)
+    drivers = [{
+        'driver_id': f'PKP_TEST_{i}', 'name': f'Test Driver {i}', 'driver_type': 'pickup',
+        'city': 'Casablanca', 'status': 'available', 'current_location': point, 'assigned_orders': []
+    } for i, point in enumerate(random_points(8, rng))]
+    db.drivers.insert_many(drivers)
+    driver_index.load(db.drivers.find())
+
+    orders = [{
+        'tracking_number': f'CTMTEST{i:06d}', 'delivery_type': 'in_city', 'status': 'assigned',
+        'assigned_pickup_driver': None, 'status_history': [],
+        'sender': {'city': 'Casablanca', 'coordinates': point}
+    } for i, point in enumerate(random_points(10, rng))]
+    db.orders.insert_many(orders)
+
+    dispatcher = BatchDispatcher(window_seconds=0, max_batch=50)
+    dispatcher.load_pending(db)
+    metrics = dispatcher.dispatch(dispatcher._next_batch(), db)
+
+    assert metrics['orders'] == 10
+    assert metrics['assigned'] == 8
+    assert metrics['deferred'] == 2
+    assert metrics['total_cost'] <= metrics['greedy_cost'] + 1e-6
+    assert dispatcher.stats()['pending'] == 2
+
+    assigned = list(db.orders.find({'assigned_pickup_driver': {'$ne': None}}))
+    assert len(assigned) == 8
+    assert len({o['assigned_pickup_driver'] for o in assigned}) == 8
+    for driver in db.drivers.find():
+        assert driver['status'] == 'on_route'
+        assert len(driver['assigned_orders']) == 1
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn) and fn.__code__.co_argcount == 0:
+            fn()
+            print(f"  ✅ {name}")
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from utils.driver_index import DriverIndex, driver_index
+from utils.dispatch import claim_pickup_driver
+
+DRIVERS = 20
+ORDERS = 200
+WORKERS = 32
+CITY = 'Casablanca'
+
+def seed_drivers(db):
+    db.drivers.insert_many([{
+        'driver_id': f'PKP_TEST_{i}',
+        'name': f'Test Driver {i}',
+        'driver_type': 'pickup',
+        'city': CITY,
+        'status': 'available',
+        'current_location': [33.57 + i * 0.001, -7.61],
+        'assigned_orders': []
+    } for i in range(DRIVERS)])
+    driver_index.load(db.drivers.find())
+
+def test_index_requests_never_load_from_mongodb(monkeypatch):
+    import utils.db
+    monkeypatch.setattr(utils.db, 'db', object())  # any collection access would fail
+    index = DriverIndex(reload_seconds=1)
+    index.upsert('PKP_1', location=[33.57, -7.61], driver_type='pickup', city=CITY, status='available')
+    assert index.nearest([33.575, -7.61], driver_type='pickup', city=CITY)[0][1] == 'PKP_1'
+
+def test_background_refresh_loads_the_index(app_db):
+    seed_drivers(app_db)
+    index = DriverIndex(reload_seconds=60)
+    index.start_background_refresh()
+    try:
+        deadline = time.monotonic() + 5
+        while index.stats()['loaded_seconds_ago'] is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert index.stats()['indexed_available'] == DRIVERS
+        assert index.stats()['refresher_running']
+    finally:
+        index.stop_background_refresh()
+
+def test_parallel_claims_never_double_book(db):
+    seed_drivers(db)
+    pickup = [33.575, -7.61]
+
+    def create(i):
+        driver = claim_pickup_driver(db, CITY, pickup, f'CTMTEST{i:06d}')
+        return driver['driver_id'] if driver else None
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        claimed = [d for d in pool.map(create, range(ORDERS)) if d]
+
+    # Every driver claimed at most once, and every driver got exactly one order
+    counts = Counter(claimed)
+    assert len(claimed) == DRIVERS
+    assert all(n == 1 for n in counts.values())
+    for driver in db.drivers.find():
+        assert driver['status'] == 'on_route'
+        assert len(driver['assigned_orders']) == 1
+
+def test_claims_without_coordinates_use_atomic_fallback(db):
+    seed_drivers(db)
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        claimed = [d for d in pool.map(
+            lambda i: (claim_pickup_driver(db, CITY, None, f'CTMTEST{i:06d}') or {}).get('driver_id'),
+            range(ORDERS)
+        ) if d]
+
+    assert sorted(claimed) == sorted(f'PKP_TEST_{i}' for i in range(DRIVERS))
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from routes.orders import fan_out
+
+def slow(value, seconds):
+    def call():
+        time.sleep(seconds)
+        return value
+    return call
+
+def failing():
+    raise RuntimeError('upstream down')
+
+def test_all_results_within_deadline():
+    results, degraded = fan_out({
+        'route': (slow('r', 0.05), lambda: 'mock-r'),
+        'weather': (slow('w', 0.05), lambda: 'mock-w')
+    }, 1)
+    assert results == {'route': 'r', 'weather': 'w'}
+    assert degraded == []
+
+def test_lookups_run_concurrently():
+    start = time.perf_counter()
+    fan_out({name: (slow(name, 0.2), lambda: None) for name in ('a', 'b', 'c')}, 1)
+    assert time.perf_counter() - start < 0.5
+
+def test_deadline_returns_partial_results():
+    release = threading.Event()
+    start = time.perf_counter()
+    results, degraded = fan_out({
+        'route': (slow('r', 0), lambda: 'mock-r'),
+        'weather': (lambda: release.wait(5) and 'w', lambda: 'mock-w')
+    }, 0.2)
+    elapsed = time.perf_counter() - start
+    release.set()
+    assert results == {'route': 'r', 'weather': 'mock-w'}
+    assert degraded == ['weather']
+    assert elapsed < 1
+
+def test_errors_fall_back():
+    results, degraded = fan_out({
+        'route': (failing, lambda: 'mock-r'),
+        'traffic': (slow('t', 0), lambda: 'unknown')
+    }, 1)
+    assert results == {'route': 'mock-r', 'traffic': 't'}
+    assert degraded == ['route']
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
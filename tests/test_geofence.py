@@ -0,0 +1,126 @@
+import os
+import sys
+import math
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from utils.geofence import GeofenceEngine, OrderFences, METERS_PER_DEGREE
+from utils.driver_index import _distance_km
+
+PICKUP = [33.5890, -7.6030]
+DROPOFF = [33.5731, -7.6163]
+RADII = {'pickup': 150, 'transit': 5000, 'approach': 1000, 'arrival': 100}
+
+def offset(point, north_m, east_m=0.0):
+    """Point moved north/east by the given meters"""
+    lat = point[0] + north_m / METERS_PER_DEGREE
+    lon = point[1] + east_m / (METERS_PER_DEGREE * math.cos(math.radians(point[0])))
+    return [lat, lon]
+
+def make_order(status='pickup_in_progress', pickup=PICKUP, dropoff=DROPOFF, tracking_number='CTM1'):
+    return {
+        'tracking_number': tracking_number,
+        'status': status,
+        'sender': {'coordinates': pickup},
+        'recipient': {'coordinates': dropoff}
+    }
+
+def drive(engine, order, path):
+    """Feed positions, applying transitions to the order like the ping path does"""
+    statuses, events = [], []
+    for location in path:
+        fired, transition = engine.evaluate(order, location)
+        events.extend(fired)
+        if transition:
+            order['status'] = transition[0]
+            statuses.append(transition[0])
+    return statuses, events
+
+def test_equirectangular_matches_haversine_at_city_scale():
+    rng = random.Random(1)
+    fence = OrderFences(None, DROPOFF, RADII, 0)
+    for _ in range(200):
+        point = offset(DROPOFF, rng.uniform(-6000, 6000), rng.uniform(-6000, 6000))
+        approx = math.sqrt(OrderFences.distance_sq(fence.dropoff, *point))
+        exact = _distance_km(*DROPOFF, *point) * 1000
+        assert approx == pytest.approx(exact, rel=2e-3, abs=0.5)
+
+def test_full_trip_progression():
+    engine = GeofenceEngine(radii=RADII, hysteresis_m=30)
+    order = make_order()
+    path = [
+        offset(PICKUP, 600), offset(PICKUP, 100), offset(PICKUP, 20),   # arrive at pickup
+        offset(PICKUP, -300),                                           # leave with the parcel
+        offset(DROPOFF, 3000), offset(DROPOFF, 800), offset(DROPOFF, 400),
+        offset(DROPOFF, 60)
+    ]
+    statuses, events = drive(engine, order, path)
+    assert statuses == ['in_transit', 'out_for_delivery', 'delivered']
+    assert ('pickup', 'enter') in events and ('pickup', 'exit') in events
+    assert events.index(('pickup', 'enter')) < events.index(('pickup', 'exit'))
+
+def test_not_picked_up_while_at_pickup():
+    engine = GeofenceEngine(radii=RADII, hysteresis_m=30)
+    order = make_order()
+    # Far from the destination, then waiting at the sender (inside the transit ring)
+    statuses, _ = drive(engine, order, [offset(DROPOFF, 8000), offset(PICKUP, 100), offset(PICKUP, 160)])
+    assert statuses == []
+    assert order['status'] == 'pickup_in_progress'
+
+def test_unseen_pickup_falls_back_to_transit_ring():
+    # Fences rebuilt after the pickup happened (restart, eviction, another worker)
+    engine = GeofenceEngine(radii=RADII, hysteresis_m=30)
+    order = make_order()
+    statuses, _ = drive(engine, order, [offset(DROPOFF, 8000), offset(DROPOFF, 3000), offset(DROPOFF, 800)])
+    assert statuses == ['in_transit', 'out_for_delivery']
+
+    # Still within pickup radius + hysteresis: not departed yet
+    engine = GeofenceEngine(radii=RADII, hysteresis_m=30)
+    order = make_order(tracking_number='CTM2')
+    statuses, _ = drive(engine, order, [offset(PICKUP, 170)])
+    assert statuses == []
+
+def test_hysteresis_suppresses_jitter_at_fence_edge():
+    engine = GeofenceEngine(radii=RADII, hysteresis_m=40)
+    order = make_order(status='in_transit')
+    # +/- 25 m jitter around the 1000 m approach radius, after one clear entry
+    path = [offset(DROPOFF, 1200), offset(DROPOFF, 990)]
+    path += [offset(DROPOFF, 1000 + (25 if i % 2 else -25)) for i in range(20)]
+    _, events = drive(engine, order, path)
+    assert [e for e in events if e[0] == 'approach'] == [('approach', 'enter')]
+
+    # Without hysteresis the same trace flaps on every ping
+    flappy = GeofenceEngine(radii=RADII, hysteresis_m=0)
+    _, events = drive(flappy, make_order(status='in_transit', tracking_number='CTM2'), path)
+    assert len([e for e in events if e[0] == 'approach']) > 10
+
+def test_order_without_pickup_coordinates_uses_transit_ring():
+    engine = GeofenceEngine(radii=RADII, hysteresis_m=30)
+    order = make_order(pickup=None)
+    statuses, _ = drive(engine, order, [offset(DROPOFF, 8000), offset(DROPOFF, 4000)])
+    assert statuses == ['in_transit']
+
+def test_status_catches_up_when_already_inside_a_ring():
+    # Pickup lies inside the approach ring: the approach 'enter' happens while
+    # the order is still pickup_in_progress, yet out_for_delivery follows
+    engine = GeofenceEngine(radii=RADII, hysteresis_m=30)
+    pickup = offset(DROPOFF, 700)
+    order = make_order(pickup=pickup)
+    statuses, _ = drive(engine, order, [pickup, offset(DROPOFF, 400), offset(DROPOFF, 300), offset(DROPOFF, 10)])
+    assert statuses == ['in_transit', 'out_for_delivery', 'delivered']
+
+def test_forget_and_lru_bound():
+    engine = GeofenceEngine(radii=RADII, hysteresis_m=30, max_orders=2)
+    for tn in ('A', 'B', 'C'):
+        engine.evaluate(make_order(tracking_number=tn), PICKUP)
+    assert engine.stats()['orders'] == 2
+    engine.forget('C')
+    assert engine.stats()['orders'] == 1
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"  ✅ {name}")
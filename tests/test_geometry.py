@@ -0,0 +1,165 @@
+import os
+import sys
+import math
+import random
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from utils.geometry import (
+    encode_geometry, decode_geometry, simplify_geometry, encode_route_levels,
+    geometry_request, select_level, zoom_tolerance_m, route_at_tolerance, SIMPLIFY_TOLERANCES_M
+)
+from utils.geo import to_geojson_point, orders_in_box, ACTIVE_ORDER_STATUSES
+
+def winding_route(n=2000, seed=5):
+    """Casablanca -> Rabat-ish trace with small wiggles"""
+    rng = random.Random(seed)
+    return [
+        [33.5731 + 0.45 * i / n + rng.uniform(-2e-4, 2e-4), -7.6163 + 0.77 * i / n + 0.01 * math.sin(i / 40)]
+        for i in range(n)
+    ]
+
+def deviation_m(point, a, b):
+    """Distance (m) from point to segment a-b, equirectangular around point"""
+    cos_lat = math.cos(math.radians(point[0]))
+    def xy(p):
+        return ((p[1] - point[1]) * cos_lat * 111195, (p[0] - point[0]) * 111195)
+    (ax, ay), (bx, by) = xy(a), xy(b)
+    dx, dy = bx - ax, by - ay
+    t = 0.0 if dx == dy == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / (dx * dx + dy * dy)))
+    return math.hypot(ax + t * dx, ay + t * dy)
+
+def test_encode_decode_round_trip():
+    route = winding_route(300)
+    decoded = decode_geometry(encode_geometry(route))
+    assert len(decoded) == len(route)
+    for (lat, lon), (d_lat, d_lon) in zip(route, decoded):
+        assert abs(lat - d_lat) <= 5e-6 and abs(lon - d_lon) <= 5e-6
+    assert encode_geometry([]) is None
+    assert decode_geometry(None) == []
+
+def test_simplification_levels_are_monotone_and_within_tolerance():
+    route = winding_route()
+    # Finest level first: each coarser level keeps strictly fewer points
+    previous = len(route) + 1
+    for tolerance in sorted(SIMPLIFY_TOLERANCES_M):
+        simplified = simplify_geometry(route, tolerance)
+        assert simplified[0] == route[0] and simplified[-1] == route[-1]
+        assert len(simplified) < previous
+        previous = len(simplified)
+
+    # Every dropped point stays within the tolerance of the segment that replaced it
+    tolerance = 250
+    kept = [route.index(point) for point in simplify_geometry(route, tolerance)]
+    for start, end in zip(kept, kept[1:]):
+        for point in route[start + 1:end]:
+            assert deviation_m(point, route[start], route[end]) <= tolerance * 1.01
+
+def test_encode_route_levels_keys():
+    levels = encode_route_levels(winding_route(500))
+    assert set(levels['route_polyline_levels']) == {str(t) for t in SIMPLIFY_TOLERANCES_M}
+    assert encode_route_levels([]) == {'route_polyline': None, 'route_polyline_levels': {}}
+
+def test_select_level():
+    levels = {str(t): 'x' for t in SIMPLIFY_TOLERANCES_M}
+    assert select_level(levels, 0) is None
+    assert select_level(levels, 14) is None
+    assert select_level(levels, 59) == '15'
+    assert select_level(levels, 60) == '60'
+    assert select_level(levels, 400) == '250'
+    assert select_level(levels, 5000) == '1000'
+    assert select_level(None, 5000) is None
+
+def test_typical_map_zooms_get_a_simplified_level():
+    levels = {str(t): 'x' for t in SIMPLIFY_TOLERANCES_M}
+    for zoom in (7, 9, 11, 13):
+        assert select_level(levels, zoom_tolerance_m(zoom)) is not None
+    assert select_level(levels, zoom_tolerance_m(15)) is None
+
+def test_route_at_tolerance_serves_precomputed_levels():
+    route = winding_route(500)
+    cached = {'success': True, 'geometry': route, 'geometry_levels': {'60': encode_geometry(route[::100])}}
+    served = route_at_tolerance(cached, 100)
+    assert served['geometry'] == decode_geometry(cached['geometry_levels']['60'])
+    assert served['geometry_tolerance_m'] == 60
+    assert 'geometry_levels' not in served and 'geometry_levels' not in route_at_tolerance(cached)
+    assert route_at_tolerance(cached)['geometry'] is route
+
+    # Routes cached before levels were stored are simplified on the fly
+    legacy = route_at_tolerance({'success': True, 'geometry': route}, 100)
+    assert legacy['geometry'] == decode_geometry(encode_geometry(simplify_geometry(route, 60)))
+
+def test_geometry_request():
+    assert geometry_request({}) is None
+    assert geometry_request({'geometry': '1'}) == 0.0
+    assert geometry_request({'tolerance': '120'}) == 120.0
+    assert geometry_request({'tolerance': '-5'}) == 0.0
+    assert geometry_request({'zoom': '9'}) == pytest.approx(zoom_tolerance_m(9))
+    assert zoom_tolerance_m(10) == pytest.approx(zoom_tolerance_m(9) / 2)
+
+@pytest.mark.parametrize('args', [{'tolerance': 'abc'}, {'tolerance': 'nan'}, {'zoom': 'far'}, {'zoom': '1e6'}])
+def test_geometry_request_rejects_bad_input(args):
+    with pytest.raises(ValueError):
+        geometry_request(args)
+
+@pytest.mark.parametrize('url', [
+    '/api/tracking/CTM0000000001?tolerance=abc',
+    '/api/orders/route/Casablanca/Rabat?tolerance=abc',
+    '/api/orders/route/Casablanca/Rabat?zoom=1e6'
+])
+def test_bad_tolerance_is_a_client_error(url):
+    from flask import Flask
+    from routes.tracking import tracking_bp
+    from routes.orders import orders_bp
+    app = Flask(__name__)
+    app.register_blueprint(tracking_bp, url_prefix='/api')
+    app.register_blueprint(orders_bp, url_prefix='/api')
+    response = app.test_client().get(url)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_to_geojson_point_swaps_to_lng_lat():
+    assert to_geojson_point([33.5731, -7.6163]) == {'type': 'Point', 'coordinates': [-7.6163, 33.5731]}
+    assert to_geojson_point(['33.5', '-7.6']) == {'type': 'Point', 'coordinates': [-7.6, 33.5]}
+    assert to_geojson_point(None) is None
+    assert to_geojson_point([33.5]) is None
+    assert to_geojson_point([None, -7.6]) is None
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return self
+
+    def limit(self, n):
+        return []
+
+def test_orders_in_box_polygon_is_lng_lat_and_closed():
+    orders = QueryRecorder()
+    orders_in_box([33.5, -7.7], [33.7, -7.5], db=SimpleNamespace(orders=orders))
+    query = orders.queries[0]
+    ring = query['recipient.location']['$geoWithin']['$geometry']['coordinates'][0]
+    assert ring == [[-7.7, 33.5], [-7.5, 33.5], [-7.5, 33.7], [-7.7, 33.7], [-7.7, 33.5]]
+    assert query['status'] == {'$in': ACTIVE_ORDER_STATUSES}
+
+def test_orders_in_box_on_mongodb(db):
+    from utils.indexes import index_manager
+    index_manager.ensure(db)
+    inside, outside = [33.58, -7.62], [34.02, -6.84]
+    db.orders.insert_many([
+        {'tracking_number': 'CTM_IN', 'status': 'in_transit',
+         'recipient': {'coordinates': inside, 'location': to_geojson_point(inside)}},
+        {'tracking_number': 'CTM_OUT', 'status': 'in_transit',
+         'recipient': {'coordinates': outside, 'location': to_geojson_point(outside)}},
+        {'tracking_number': 'CTM_DONE', 'status': 'delivered',
+         'recipient': {'coordinates': inside, 'location': to_geojson_point(inside)}}
+    ])
+    found = orders_in_box([33.5, -7.7], [33.7, -7.5], db=db)
+    assert [order['tracking_number'] for order in found] == ['CTM_IN']
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import requests
+from utils.http_client import ServiceClient, CircuitBreaker, CircuitOpenError
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Replies with the next status in server.script (200 once the script is exhausted);
+    'slow' answers after 0.5 s, 'loop' redirects to itself.
+    """
+
+    def do_GET(self):
+        self.server.hits += 1
+        status = self.server.script.pop(0) if self.server.script else 200
+        if status == 'slow':
+            time.sleep(0.5)
+            status = 200
+        if status == 'loop':
+            self.server.script.insert(0, 'loop')
+            self.send_response(302)
+            self.send_header('Location', self.path)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'status': status}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+def start_stub(script=None):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.script = list(script or [])
+    server.hits = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/'
+
+def make_client(retries=2, threshold=3, reset=60):
+    return ServiceClient(
+        'stub', timeout=2, retries=retries, backoff=0.001,
+        breaker=CircuitBreaker(failure_threshold=threshold, reset_timeout=reset),
+        session=requests.Session()
+    )
+
+def test_retries_transient_errors_then_succeeds():
+    server, url = start_stub([503, 502])
+    client = make_client(retries=2)
+    try:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert server.hits == 3
+        stats = client.stats()
+        assert stats['retries'] == 2
+        assert stats['latency_ms']['samples'] == 3
+        assert stats['circuit']['state'] == CircuitBreaker.CLOSED
+    finally:
+        server.shutdown()
+
+def test_client_errors_are_not_retried():
+    server, url = start_stub([404])
+    client = make_client()
+    try:
+        assert client.get(url).status_code == 404
+        assert server.hits == 1
+        assert client.stats()['circuit']['consecutive_failures'] == 0
+    finally:
+        server.shutdown()
+
+def test_breaker_opens_and_short_circuits():
+    server, url = start_stub([500] * 20)
+    client = make_client(retries=0, threshold=3)
+    try:
+        for _ in range(3):
+            try:
+                client.get(url)
+                assert False, 'expected HTTPError'
+            except requests.HTTPError:
+                pass
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+        hits = server.hits
+        try:
+            client.get(url)
+            assert False, 'expected CircuitOpenError'
+        except CircuitOpenError:
+            pass
+        assert server.hits == hits
+        assert client.stats()['circuit']['short_circuited'] == 1
+    finally:
+        server.shutdown()
+
+def test_breaker_half_open_probe_closes_on_success():
+    server, url = start_stub([500, 500])
+    client = make_client(retries=0, threshold=2, reset=0.05)
+    try:
+        for _ in range(2):
+            try:
+                client.get(url)
+            except requests.HTTPError:
+                pass
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+        threading.Event().wait(0.1)
+        assert client.get(url).status_code == 200
+        assert client.breaker.state == CircuitBreaker.CLOSED
+    finally:
+        server.shutdown()
+
+def test_read_timeout_is_not_retried():
+    server, url = start_stub(['slow', 'slow'])
+    client = make_client(retries=2)
+    try:
+        try:
+            client.get(url, timeout=(1, 0.1))
+            assert False, 'expected ReadTimeout'
+        except requests.ReadTimeout:
+            pass
+        assert server.hits == 1
+        assert client.stats()['failures'] == 1
+    finally:
+        server.shutdown()
+
+def test_post_5xx_is_not_retried_unless_idempotent():
+    server, url = start_stub([503, 503])
+    client = make_client(retries=2)
+    try:
+        try:
+            client.post(url)
+            assert False, 'expected HTTPError'
+        except requests.HTTPError:
+            pass
+        assert server.hits == 1
+        assert client.post(url, idempotent=True).status_code == 200
+        assert server.hits == 3
+    finally:
+        server.shutdown()
+
+def test_other_request_errors_release_half_open_probe():
+    server, url = start_stub([500, 'loop'])
+    client = make_client(retries=0, threshold=1, reset=0.05)
+    client.session.max_redirects = 3
+    try:
+        try:
+            client.get(url)
+        except requests.HTTPError:
+            pass
+        threading.Event().wait(0.1)
+
+        # The half-open probe dies on a redirect loop: the breaker must still hear about it
+        try:
+            client.get(url)
+            assert False, 'expected TooManyRedirects'
+        except requests.TooManyRedirects:
+            pass
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+        server.script.clear()
+        threading.Event().wait(0.1)
+        assert client.get(url).status_code == 200
+        assert client.breaker.state == CircuitBreaker.CLOSED
+    finally:
+        server.shutdown()
+
+def test_unreachable_upstream_counts_as_failure():
+    server, url = start_stub()
+    server.shutdown()
+    server.server_close()
+    client = make_client(retries=1, threshold=1)
+    try:
+        client.get(url)
+        assert False, 'expected ConnectionError'
+    except requests.ConnectionError:
+        pass
+    assert client.breaker.state == CircuitBreaker.OPEN
+    assert client.stats()['attempts'] == 2
+
+def test_route_service_falls_back_to_mock_while_open():
+    from utils.external_services import RouteService
+
+    server, url = start_stub([500] * 20)
+    client = make_client(retries=0, threshold=1)
+    try:
+        service = RouteService(cache=None, http=client)
+        service.api_key = 'test-key'
+        service.base_url = url
+
+        first = service.get_route([33.57, -7.61], [33.60, -7.55])
+        assert first['source'] == 'mock'
+        hits = server.hits
+
+        second = service.get_route([33.57, -7.61], [33.60, -7.55])
+        assert second['source'] == 'mock'
+        assert server.hits == hits
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"  ✅ {name}")
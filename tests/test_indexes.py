@@ -0,0 +1,135 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from pymongo import IndexModel
+from utils.indexes import IndexManager, diff_indexes, required_indexes
+from utils.pagination import ORDER_LIST_SORT
+from utils.geo import ACTIVE_ORDER_STATUSES
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+# (collection, filter, sort) of every query issued on a request or GPS ping path
+HOT_FINDS = [
+    ('orders', {'tracking_number': 'CTM0000000001'}, None),
+    ('orders', {'tracking_number': {'$in': ['CTM0000000001', 'CTM0000000002']}}, None),
+    ('orders', {}, ORDER_LIST_SORT),
+    ('orders', {'user_id': 'u1'}, ORDER_LIST_SORT),
+    ('orders', {'user_id': 'u1', 'status': 'pending'}, ORDER_LIST_SORT),
+    ('orders', {'status': {'$in': ACTIVE_ORDER_STATUSES}}, ORDER_LIST_SORT),
+    ('orders', {'delivery_type': 'in_city', 'status': 'assigned', 'assigned_pickup_driver': None}, None),
+    ('orders', {
+        'recipient.location': {'$geoWithin': {'$geometry': {
+            'type': 'Polygon', 'coordinates': [[[-7.7, 33.5], [-7.5, 33.5], [-7.5, 33.7], [-7.7, 33.7], [-7.7, 33.5]]]
+        }}},
+        'status': {'$in': ACTIVE_ORDER_STATUSES}
+    }, None),
+    ('users', {'email': 'client1@ctm.ma'}, None),
+    ('users', {'role': 'admin'}, None),
+    ('drivers', {'driver_id': 'PKP_CAS_001'}, None),
+    ('drivers', {'driver_type': 'pickup', 'city': 'Casablanca', 'status': 'available'}, None),
+    ('drivers', {'driver_type': 'inter_city', 'status': 'available'}, None),
+    ('drivers', {'driver_id': {'$in': ['PKP_CAS_001']}, 'assigned_orders': {'$in': ['CTM0000000001']}}, None),
+    ('agents', {'agent_id': 'AGT001'}, None),
+    ('location_history', {'driver_id': 'PKP_CAS_001', 'bucket_start': {'$gte': NOW - timedelta(days=1), '$lt': NOW}}, None),
+    ('location_history', {'orders': 'CTM0000000001', 'bucket_start': {'$gte': NOW - timedelta(days=1), '$lt': NOW}}, None),
+    ('route_cache', {'_id': 'key', 'expires_at': {'$gt': NOW}}, None),
+    ('counters', {'_id': {'$in': ['orders', 'users']}}, None)
+]
+
+HOT_AGGREGATES = [
+    ('drivers', [{'$match': {'driver_type': 'pickup', 'city': 'Casablanca', 'status': 'available'}}]),
+    ('orders', [
+        {'$sort': {'user_id': 1, 'status': 1}},
+        {'$group': {'_id': {'user_id': '$user_id', 'status': '$status'}, 'count': {'$sum': 1}}}
+    ]),
+    ('users', [
+        {'$sort': {'role': 1, 'is_active': 1}},
+        {'$group': {'_id': {'role': '$role', 'active': '$is_active'}, 'count': {'$sum': 1}}}
+    ])
+]
+
+def stages(plan):
+    """Every 'stage' name in an explain() output"""
+    if isinstance(plan, dict):
+        found = [plan['stage']] if isinstance(plan.get('stage'), str) else []
+        for value in plan.values():
+            found += stages(value)
+        return found
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in stages(item)]
+    return []
+
+def test_declarations():
+    declared = required_indexes()
+    orders = {model.document['name']: model.document for model in declared['orders']}
+    assert orders['tracking_number_unique']['unique'] is True
+    assert {model.document['name'] for model in declared['users']} >= {'email_unique'}
+    for collection, models in declared.items():
+        names = [model.document['name'] for model in models]
+        assert len(names) == len(set(names)), collection
+
+def test_diff_indexes():
+    existing = {
+        '_id_': {'key': [('_id', 1)]},
+        'status': {'key': [('status', 1)]},
+        'ttl': {'key': [('at', 1)], 'expireAfterSeconds': 60},
+        'tracking_number_1': {'key': [('tracking_number', 1)]},
+        'legacy': {'key': [('legacy', 1)]}
+    }
+    declared = [
+        IndexModel('status', name='status'),
+        IndexModel('at', name='ttl', expireAfterSeconds=120),
+        IndexModel('tracking_number', name='tracking_number_unique', unique=True),
+        IndexModel('email', name='email_unique', unique=True)
+    ]
+    diff = diff_indexes(existing, declared)
+    assert diff['present'] == ['status']
+    assert diff['ttl_changes'] == [('ttl', 120)]
+    assert [model.document['name'] for model in diff['missing']] == ['email_unique']
+    assert [name for name, _ in diff['conflicts']] == ['tracking_number_unique']
+    assert diff['unmanaged'] == ['legacy', 'tracking_number_1']
+
+def seed(db):
+    """Enough documents for the planner to prefer an index over a scan"""
+    db.orders.insert_many([
+        {'tracking_number': f'CTM{i:010d}', 'user_id': f'u{i % 5}', 'status': 'pending', 'created_at': NOW}
+        for i in range(50)
+    ])
+    db.users.insert_many([{'email': f'client{i}@ctm.ma', 'role': 'client', 'is_active': True} for i in range(20)])
+    db.drivers.insert_many([
+        {'driver_id': f'PKP_CAS_{i:03d}', 'driver_type': 'pickup', 'city': 'Casablanca', 'status': 'available'}
+        for i in range(20)
+    ])
+
+def test_ensure_is_idempotent(db):
+    seed(db)
+    manager = IndexManager()
+    first = manager.ensure(db)
+    assert all(not entry['errors'] and not entry['conflicts'] for entry in first.values())
+    assert 'tracking_number_unique' in first['orders']['created']
+
+    second = manager.ensure(db)
+    assert all(not entry['created'] and not entry['ttl_changes'] for entry in second.values())
+
+def test_hot_queries_use_indexes(db):
+    seed(db)
+    IndexManager().ensure(db)
+    scans = []
+    for collection, query, sort in HOT_FINDS:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort).limit(50)
+        if 'COLLSCAN' in stages(cursor.explain()):
+            scans.append((collection, query))
+    for collection, pipeline in HOT_AGGREGATES:
+        plan = db.command('aggregate', collection, pipeline=pipeline, explain=True)
+        if 'COLLSCAN' in stages(plan):
+            scans.append((collection, pipeline))
+    assert scans == []
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,145 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from flask import Flask
+from config import Config
+from utils.order_cache import order_cache
+from routes.driver_tracking import driver_tracking_bp, parse_timestamp
+
+DESTINATION = [33.5731, -7.6163]
+
+def test_parse_timestamp_formats():
+    expected = datetime(2024, 5, 1, 12, 0, 0)
+    assert parse_timestamp('2024-05-01T12:00:00Z') == expected
+    assert parse_timestamp('2024-05-01T13:00:00+01:00') == expected
+    assert parse_timestamp(1714564800) == expected
+    assert parse_timestamp(1714564800000) == expected
+    with pytest.raises(ValueError):
+        parse_timestamp('yesterday')
+
+@pytest.fixture
+def client(app_db):
+    """Test client on a throwaway database (skipped if MongoDB is unreachable)"""
+    app = Flask(__name__)
+    app.register_blueprint(driver_tracking_bp, url_prefix='/api')
+    return app.test_client(), app_db
+
+def test_batch_applies_points_in_timestamp_order(client):
+    http, db = client
+    db.drivers.insert_one({'driver_id': 'PKP_TEST_1', 'driver_type': 'pickup', 'city': 'Casablanca', 'status': 'on_route'})
+    db.orders.insert_one({
+        'tracking_number': 'CTMTEST000001', 'status': 'pickup_in_progress', 'status_history': [],
+        'recipient': {'coordinates': DESTINATION}
+    })
+
+    # Sent out of order; the closest point is the latest
+    response = http.post('/api/driver/location/batch', json={
+        'driver_id': 'PKP_TEST_1',
+        'tracking_number': 'CTMTEST000001',
+        'points': [
+            {'location': [33.5732, -7.6163], 'timestamp': '2024-05-01T12:02:00Z'},
+            {'location': [33.6500, -7.6163], 'timestamp': '2024-05-01T12:00:00Z'},
+            {'location': [33.5780, -7.6163], 'timestamp': '2024-05-01T12:01:00Z'},
+            {'timestamp': '2024-05-01T12:03:00Z'}
+        ]
+    })
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['accepted'] == 3 and body['rejected'] == 1
+    assert [r['success'] for r in body['results']] == [True, True, True, False]
+    assert [r.get('latest') for r in body['results'][:3]] == [True, False, False]
+    assert [r.get('status') for r in body['results'][:3]] == ['out_for_delivery', None, 'in_transit']
+
+    driver = db.drivers.find_one({'driver_id': 'PKP_TEST_1'})
+    assert driver['current_location'] == [33.5732, -7.6163]
+    assert driver['last_location_update'] == datetime(2024, 5, 1, 12, 2)
+
+    order = db.orders.find_one({'tracking_number': 'CTMTEST000001'})
+    assert order['status'] == 'out_for_delivery'
+    assert [h['status'] for h in order['status_history']] == ['in_transit', 'out_for_delivery']
+
+def test_late_batch_does_not_move_driver_back(client):
+    http, db = client
+    db.drivers.insert_one({
+        'driver_id': 'PKP_TEST_2', 'driver_type': 'pickup', 'city': 'Casablanca', 'status': 'on_route',
+        'current_location': DESTINATION, 'last_location_update': datetime(2024, 5, 1, 13, 0)
+    })
+    db.orders.insert_one({
+        'tracking_number': 'CTMTEST000002', 'status': 'pickup_in_progress', 'status_history': [],
+        'recipient': {'coordinates': DESTINATION}
+    })
+
+    # An offline buffer flushed after a newer live ping
+    response = http.post('/api/driver/location/batch', json={
+        'driver_id': 'PKP_TEST_2',
+        'tracking_number': 'CTMTEST000002',
+        'points': [{'location': [33.5780, -7.6163], 'timestamp': '2024-05-01T12:00:00Z'}]
+    })
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['results'][0]['success'] is True
+    assert body['results'][0]['latest'] is False
+    # Old positions do not progress the order either
+    assert 'status' not in body['results'][0]
+    assert db.orders.find_one({'tracking_number': 'CTMTEST000002'})['status'] == 'pickup_in_progress'
+
+    driver = db.drivers.find_one({'driver_id': 'PKP_TEST_2'})
+    assert driver['current_location'] == DESTINATION
+    assert driver['last_location_update'] == datetime(2024, 5, 1, 13, 0)
+
+def test_stale_cached_status_is_not_overwritten(client):
+    http, db = client
+    order = {
+        'tracking_number': 'CTMTEST000003', 'status': 'pickup_in_progress', 'status_history': [],
+        'recipient': {'coordinates': DESTINATION}
+    }
+    db.orders.insert_one(dict(order))
+    order_cache.prime(order)
+    # Another worker cancels the order; this process still caches pickup_in_progress
+    db.orders.update_one({'tracking_number': 'CTMTEST000003'}, {'$set': {'status': 'cancelled'}})
+
+    response = http.post('/api/driver/location', json={
+        'driver_id': 'PKP_TEST_3', 'tracking_number': 'CTMTEST000003', 'location': [33.5780, -7.6163]
+    })
+    assert response.status_code == 200
+    assert db.orders.find_one({'tracking_number': 'CTMTEST000003'})['status'] == 'cancelled'
+    assert order_cache.get('CTMTEST000003', db)['status'] == 'cancelled'
+
+def test_batch_drops_only_the_order_with_a_stale_cached_status(client):
+    http, db = client
+    for tracking_number in ('CTMTEST000004', 'CTMTEST000005'):
+        order = {
+            'tracking_number': tracking_number, 'status': 'pickup_in_progress', 'status_history': [],
+            'recipient': {'coordinates': DESTINATION}
+        }
+        db.orders.insert_one(dict(order))
+        order_cache.prime(order)
+    db.orders.update_one({'tracking_number': 'CTMTEST000005'}, {'$set': {'status': 'cancelled'}})
+    db.drivers.insert_many([{'driver_id': 'PKP_TEST_4', 'status': 'on_route'}, {'driver_id': 'PKP_TEST_5', 'status': 'on_route'}])
+
+    response = http.post('/api/driver/location/batch', json={'points': [
+        {'driver_id': 'PKP_TEST_4', 'tracking_number': 'CTMTEST000004', 'location': [33.5780, -7.6163]},
+        {'driver_id': 'PKP_TEST_5', 'tracking_number': 'CTMTEST000005', 'location': [33.5780, -7.6163]}
+    ]})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [r.get('status') for r in body['results']] == ['in_transit', None]
+    assert db.orders.find_one({'tracking_number': 'CTMTEST000004'})['status'] == 'in_transit'
+    assert db.orders.find_one({'tracking_number': 'CTMTEST000005'})['status'] == 'cancelled'
+    assert order_cache.get('CTMTEST000005', db)['status'] == 'cancelled'
+
+def test_batch_rejects_empty_and_oversized(client):
+    http, _ = client
+    assert http.post('/api/driver/location/batch', json={'points': []}).status_code == 400
+    points = [{'driver_id': 'X', 'location': [0, 0]}] * (Config.LOCATION_BATCH_MAX_POINTS + 1)
+    assert http.post('/api/driver/location/batch', json={'points': points}).status_code == 413
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn) and fn.__code__.co_argcount == 0:
+            fn()
+            print(f"  ✅ {name}")
@@ -0,0 +1,83 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from utils.location_history import LocationHistory
+
+# Yesterday, so the buckets are well inside the retention TTL
+DAY = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+def test_bucket_start_floors_to_period():
+    history = LocationHistory(bucket_minutes=15)
+    assert history.bucket_start(datetime(2024, 5, 1, 10, 44, 59, 999)) == datetime(2024, 5, 1, 10, 30)
+    assert history.bucket_start(datetime(2024, 5, 1, 23, 59)) == datetime(2024, 5, 1, 23, 45)
+
+def test_bucket_updates_pack_points_per_bucket():
+    history = LocationHistory(bucket_minutes=60, max_points=100)
+    updates = history.bucket_updates('PKP_1', [
+        (datetime(2024, 5, 1, 9, 59, 58), [33.5, -7.6], 'CTM1'),
+        (datetime(2024, 5, 1, 10, 0, 1, 500000), [33.51, -7.61], 'CTM1'),
+        (datetime(2024, 5, 1, 10, 0, 4), [33.52, -7.62], None)
+    ])
+    assert len(updates) == 2
+    ten = updates[1]._doc
+    assert updates[1]._filter == {'driver_id': 'PKP_1', 'bucket_start': datetime(2024, 5, 1, 10), 'count': {'$lte': 98}}
+    assert ten['$push']['t'] == {'$each': [1500, 4000]}
+    assert ten['$push']['order'] == {'$each': ['CTM1', None]}
+    assert ten['$inc'] == {'count': 2}
+    assert ten['$addToSet'] == {'orders': {'$each': ['CTM1']}}
+
+def test_large_batches_are_split_at_bucket_capacity():
+    history = LocationHistory(bucket_minutes=60, max_points=3)
+    updates = history.bucket_updates('PKP_1', [
+        (datetime(2024, 5, 1, 10, 0, i), [33.5, -7.6], None) for i in range(7)
+    ])
+    assert [u._doc['$inc']['count'] for u in updates] == [3, 3, 1]
+    assert [u._filter['count'] for u in updates] == [{'$lte': 0}, {'$lte': 0}, {'$lte': 2}]
+
+def test_buckets_never_exceed_max_points(db):
+    history = LocationHistory(bucket_minutes=60, max_points=100)
+    second = 0
+    for size in (60, 60, 250, 1, 99):
+        history.record('PKP_1', [(DAY + timedelta(seconds=second + i), [33.5, -7.6], None) for i in range(size)], db)
+        second += size
+
+    counts = [bucket['count'] for bucket in db[history.COLLECTION].find()]
+    assert sum(counts) == 470
+    assert max(counts) <= 100
+    assert len(history.trail(DAY, DAY + timedelta(hours=1), driver_id='PKP_1', db=db)) == 470
+
+def test_full_day_trail_in_one_read(db, mongo_reads):
+    history = LocationHistory(bucket_minutes=60, max_points=2000, retention_days=90)
+    history.ensure_indexes(db)
+
+    # One ping every 3 s for 24 h, two orders during the day
+    points = [
+        (DAY + timedelta(seconds=3 * i), [33.5 + i * 1e-6, -7.6], 'CTM_AM' if i < 14400 else 'CTM_PM')
+        for i in range(28800)
+    ]
+    for chunk in range(0, len(points), 500):
+        history.record('PKP_1', points[chunk:chunk + 500], db)
+    history.record('PKP_2', [(DAY + timedelta(hours=5), [34.0, -6.8], None)], db)
+
+    assert db[history.COLLECTION].count_documents({'driver_id': 'PKP_1'}) == 24
+
+    mongo_reads.reads.clear()
+    trail = history.trail(DAY, DAY + timedelta(days=1), driver_id='PKP_1', db=db)
+    assert mongo_reads.reads == ['find']
+    assert len(trail) == 28800
+    assert trail[0] == [DAY, 33.5, -7.6, 'CTM_AM']
+    assert all(a[0] < b[0] for a, b in zip(trail, trail[1:]))
+
+    afternoon = history.trail(DAY, DAY + timedelta(days=1), tracking_number='CTM_PM', db=db)
+    assert len(afternoon) == 14400
+    assert afternoon[0][0] == DAY + timedelta(hours=12)
+
+    window = history.trail(DAY + timedelta(hours=5, minutes=30), DAY + timedelta(hours=6), driver_id='PKP_1', db=db)
+    assert len(window) == 600
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
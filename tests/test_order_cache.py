@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from flask import Flask
+from utils.order_cache import OrderStateCache, order_cache
+from utils.driver_index import driver_index
+from routes.driver_tracking import driver_tracking_bp
+
+def make_order(tracking_number, status='in_transit'):
+    return {
+        'tracking_number': tracking_number,
+        'user_id': 'u1',
+        'status': status,
+        'sender': {'name': 'A', 'coordinates': [33.59, -7.60]},
+        'recipient': {'name': 'B', 'coordinates': [33.57, -7.61]},
+        'route_polyline': 'x' * 100
+    }
+
+def test_primed_entries_are_served_without_a_database():
+    cache = OrderStateCache(max_size=10, ttl_seconds=60)
+    cache.prime(make_order('CTM1'))
+    state = cache.get_many(['CTM1'], db=object())  # any read would fail on this db
+    assert state['CTM1'] == {
+        'tracking_number': 'CTM1', 'user_id': 'u1', 'status': 'in_transit',
+        'sender': {'coordinates': [33.59, -7.60]}, 'recipient': {'coordinates': [33.57, -7.61]}
+    }
+    # Callers get copies
+    state['CTM1']['status'] = 'tampered'
+    assert cache.get('CTM1', db=object())['status'] == 'in_transit'
+    assert cache.stats()['hits'] == 2
+
+def test_status_write_through_and_invalidation():
+    cache = OrderStateCache(max_size=10, ttl_seconds=60)
+    cache.prime(make_order('CTM1'))
+    cache.set_status('CTM1', 'out_for_delivery')
+    assert cache.get('CTM1', db=object())['status'] == 'out_for_delivery'
+
+    cache.invalidate('CTM1', 'UNKNOWN')
+    assert cache.stats()['invalidations'] == 1
+    assert cache.stats()['size'] == 0
+
+def test_lru_eviction_and_ttl():
+    cache = OrderStateCache(max_size=2, ttl_seconds=0.05)
+    for tn in ('CTM1', 'CTM2', 'CTM3'):
+        cache.prime(make_order(tn))
+    assert cache.stats()['evictions'] == 1
+    assert 'CTM1' not in cache._entries
+
+    time.sleep(0.1)
+    assert cache._entries['CTM2'][0] < time.monotonic()
+
+def test_ping_path_does_no_mongo_reads(app_db, mongo_reads):
+    db = app_db
+    order = make_order('CTMTEST000002')
+    order['status_history'] = []
+    db.orders.insert_one(order)
+    db.drivers.insert_one({'driver_id': 'PKP_TEST_2', 'status': 'on_route'})
+    order_cache.prime(order)
+    # The driver index is loaded at startup, never by a ping
+    driver_index.load(db.drivers.find())
+    try:
+        app = Flask(__name__)
+        app.register_blueprint(driver_tracking_bp, url_prefix='/api')
+        http = app.test_client()
+
+        mongo_reads.reads.clear()
+        for location in ([33.60, -7.60], [33.575, -7.61], [33.5701, -7.6101]):
+            response = http.post('/api/driver/location', json={
+                'driver_id': 'PKP_TEST_2', 'tracking_number': 'CTMTEST000002', 'location': location
+            })
+            assert response.status_code == 200
+        assert mongo_reads.reads == []
+
+        # The cached status followed the progression written to MongoDB
+        assert order_cache.get('CTMTEST000002')['status'] == 'delivered'
+        assert db.orders.find_one({'tracking_number': 'CTMTEST000002'})['status'] == 'delivered'
+    finally:
+        order_cache.invalidate('CTMTEST000002')
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
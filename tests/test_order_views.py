@@ -0,0 +1,55 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from utils.order_views import view_request, order_projection
+
+def test_view_request_defaults_and_rejects_unknown():
+    assert view_request({}) == 'summary'
+    assert view_request({}, default='full') == 'full'
+    assert view_request({'view': 'Detail'}) == 'detail'
+    with pytest.raises(ValueError):
+        view_request({'view': 'everything'})
+
+def test_geometry_is_only_projected_on_request():
+    assert 'route_polyline' not in order_projection('summary')
+    assert order_projection('summary', 0.0)['route_polyline_levels'] == 1
+    assert order_projection('detail')['route_polyline'] == 0
+    assert 'route_polyline' not in order_projection('detail', 0.0)
+    assert order_projection('detail', 0.0)['delivery_insights.route.polyline'] == 0
+    assert order_projection('full') is None
+
+def seed_order(db):
+    """One order carrying every heavy field"""
+    db.orders.insert_one({
+        'tracking_number': 'CTM0000000001',
+        'status': 'in_transit',
+        'sender': {'name': 'A', 'phone': '0600000000', 'city': 'Casablanca', 'coordinates': [33.5, -7.6], 'location': {'type': 'Point', 'coordinates': [-7.6, 33.5]}},
+        'recipient': {'name': 'B', 'city': 'Casablanca', 'coordinates': [33.6, -7.5]},
+        'status_history': [{'status': 'in_transit', 'timestamp': datetime(2024, 5, 1), 'message': ''}] * 50,
+        'route_polyline': 'x' * 5000,
+        'route_polyline_levels': {'5': 'y' * 2000},
+        'delivery_insights': {'route': {'distance_km': 12, 'polyline': 'z' * 5000}, 'weather': {'temp': 20}},
+        'created_at': datetime(2024, 5, 1),
+        'updated_at': datetime(2024, 5, 1)
+    })
+    return db.orders
+
+def test_views_read_only_their_fields(db):
+    orders = seed_order(db)
+    summary = orders.find_one({}, order_projection('summary'))
+    assert summary['sender'] == {'name': 'A', 'phone': '0600000000', 'city': 'Casablanca', 'coordinates': [33.5, -7.6]}
+    assert not {'status_history', 'delivery_insights', 'route_polyline'} & set(summary)
+    
+    detail = orders.find_one({}, order_projection('detail'))
+    assert len(detail['status_history']) == 50
+    assert detail['delivery_insights']['route'] == {'distance_km': 12}
+    assert 'route_polyline' not in detail and 'location' not in detail['sender']
+    
+    assert 'route_polyline_levels' in orders.find_one({}, order_projection('full'))
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
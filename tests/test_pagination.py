@@ -0,0 +1,63 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from bson import ObjectId
+from utils.pagination import encode_cursor, decode_cursor, keyset_page
+from utils.indexes import index_manager
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    created_at = datetime(2024, 5, 1, 10, 0, 0, 123000)
+    token = encode_cursor({'created_at': created_at, '_id': oid}, 'next')
+    assert '=' not in token
+    assert decode_cursor(token) == (created_at, oid, 'next')
+
+@pytest.mark.parametrize('token', ['', 'not-a-cursor', 'eyJ0IjoxfQ', encode_cursor({'created_at': datetime(2024, 1, 1), '_id': ObjectId()}, 'next')[:-4]])
+def test_invalid_cursor_raises_value_error(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+def seed_orders(db):
+    """25 orders of two users, indexes in place"""
+    index_manager.ensure(db)
+    base = datetime(2024, 5, 1)
+    # Pairs of orders share a created_at so the _id tie-break is exercised
+    db.orders.insert_many([
+        {'tracking_number': f'CTM{i:010d}', 'user_id': 'u1' if i % 3 else 'u2', 'status': 'pending', 'created_at': base + timedelta(seconds=i // 2)}
+        for i in range(25)
+    ])
+    return db.orders
+
+def test_pages_forward_and_back_without_gaps(db):
+    orders = seed_orders(db)
+    expected = [doc['_id'] for doc in orders.find({'user_id': 'u1'}).sort([('created_at', -1), ('_id', -1)])]
+    
+    seen, pages, cursor = [], [], None
+    while True:
+        docs, page = keyset_page(orders, {'user_id': 'u1'}, cursor, 4)
+        pages.append((docs, page))
+        seen += [doc['_id'] for doc in docs]
+        cursor = page['next']
+        if not cursor:
+            break
+    assert seen == expected
+    assert pages[0][1]['prev'] is None
+    
+    # Walking back from the last page returns the same pages
+    docs, page = pages[-1]
+    for previous_docs, _ in reversed(pages[:-1]):
+        docs, page = keyset_page(orders, {'user_id': 'u1'}, page['prev'], 4)
+        assert [doc['_id'] for doc in docs] == [doc['_id'] for doc in previous_docs]
+    assert page['prev'] is None
+
+def test_first_page_uses_index(db):
+    orders = seed_orders(db)
+    plan = orders.find({'user_id': 'u1'}).sort([('created_at', -1), ('_id', -1)]).limit(5).explain()
+    assert 'COLLSCAN' not in str(plan['queryPlanner']['winningPlan'])
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from pymongo.errors import PyMongoError
+import utils.db
+from utils.route_cache import RouteCache
+
+ROUTE = {'distance_km': 12.5, 'duration_minutes': 18, 'source': 'openroute'}
+
+class MemoryCollection:
+    """Shared tier stand-in: find_one / update_one over a dict (or failing on demand)"""
+
+    def __init__(self, fail=False):
+        self.docs = {}
+        self.fail = fail
+
+    def find_one(self, query):
+        if self.fail:
+            raise PyMongoError('connection refused')
+        doc = self.docs.get(query['_id'])
+        return doc if doc and doc['expires_at'] > query['expires_at']['$gt'] else None
+
+    def update_one(self, query, update, upsert=False):
+        if self.fail:
+            raise PyMongoError('connection refused')
+        self.docs[query['_id']] = dict(update['$set'], _id=query['_id'])
+
+@pytest.fixture
+def shared(monkeypatch):
+    collection = MemoryCollection()
+    monkeypatch.setattr(utils.db, 'db', {RouteCache.COLLECTION: collection})
+    return collection
+
+def test_keys_snap_to_precision():
+    cache = RouteCache(max_size=10, ttl_seconds=60, precision=3)
+    assert cache.make_key([33.57312, -7.61628], [34.0209, -6.8498]) == '33.573,-7.616|34.021,-6.850'
+    assert cache.make_key([33.57312, -7.61628], [34.0209, -6.8498]) == cache.make_key([33.5734, -7.6158], [34.021, -6.85])
+
+def test_memory_entries_expire_after_ttl(shared):
+    cache = RouteCache(max_size=10, ttl_seconds=0.05)
+    cache.set('a', ROUTE)
+    shared.docs.clear()
+    assert cache.get('a') == ROUTE
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert stats['memory_hits'] == 1 and stats['expired'] == 1 and stats['misses'] == 1
+
+def test_lru_evicts_least_recently_used(shared):
+    cache = RouteCache(max_size=2, ttl_seconds=60)
+    cache.set('a', ROUTE)
+    cache.set('b', ROUTE)
+    cache.get('a')
+    cache.set('c', ROUTE)
+    assert list(cache._entries) == ['a', 'c']
+    assert cache.stats()['evictions'] == 1
+
+def test_memory_miss_falls_back_to_shared_tier(shared):
+    writer = RouteCache(max_size=10, ttl_seconds=60)
+    writer.set('a', ROUTE)
+
+    # Another worker: empty memory tier, same shared tier
+    reader = RouteCache(max_size=10, ttl_seconds=60)
+    assert reader.get('a') == ROUTE
+    assert reader.get('a') == ROUTE
+    stats = reader.stats()
+    assert stats['mongo_hits'] == 1 and stats['memory_hits'] == 1
+
+def test_returned_routes_are_copies(shared):
+    cache = RouteCache(max_size=10, ttl_seconds=60)
+    cache.set('a', dict(ROUTE))
+    cache.get('a')['source'] = 'mock'
+    assert cache.get('a')['source'] == 'openroute'
+
+def test_shared_tier_errors_degrade_to_a_miss(monkeypatch):
+    monkeypatch.setattr(utils.db, 'db', {RouteCache.COLLECTION: MemoryCollection(fail=True)})
+    cache = RouteCache(max_size=10, ttl_seconds=60)
+    cache.set('a', ROUTE)
+    assert cache.get('a') == ROUTE
+    assert cache.get('b') is None
+    assert cache.stats()['mongo_errors'] == 2
+
+def test_shared_tier_on_mongodb(app_db):
+    RouteCache(max_size=10, ttl_seconds=60).set('a', ROUTE)
+    doc = app_db[RouteCache.COLLECTION].find_one({'_id': 'a'})
+    assert doc['route'] == ROUTE
+
+    reader = RouteCache(max_size=10, ttl_seconds=60)
+    assert reader.get('a') == ROUTE
+    assert reader.stats()['mongo_hits'] == 1
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import numpy as np
+import pytest
+from utils.route_optimizer import (
+    calculate_distance,
+    calculate_total_distance,
+    haversine_matrix,
+    nearest_neighbor_tour,
+    tour_length,
+    improve_tour,
+    plan_capacitated_routes,
+    schedule_tour,
+    sequence_with_time_windows,
+    _two_opt_pass,
+    _or_opt_pass,
+    _three_opt_pass
+)
+
+WAREHOUSE = (33.6091, -7.5372)
+INF = float('inf')
+
+def make_matrix(n, seed):
+    """Warehouse plus n random stops around Casablanca"""
+    rng = random.Random(seed)
+    coords = [WAREHOUSE] + [(33.45 + rng.random() * 0.25, -7.75 + rng.random() * 0.35) for _ in range(n)]
+    return haversine_matrix(coords)
+
+def random_tour(n, seed):
+    stops = list(range(1, n + 1))
+    random.Random(seed).shuffle(stops)
+    return [0] + stops
+
+def test_scalar_and_matrix_distances_agree():
+    rng = random.Random(3)
+    coords = [WAREHOUSE] + [(33.45 + rng.random() * 0.25, -7.75 + rng.random() * 0.35) for _ in range(20)]
+    matrix = haversine_matrix(coords)
+    for i, j in ((0, 1), (5, 17), (12, 3)):
+        assert calculate_distance(coords[i], coords[j]) == matrix[i, j]
+    route = [{'coordinates': c} for c in coords[1:]]
+    assert calculate_total_distance(WAREHOUSE, route) == pytest.approx(tour_length(matrix, list(range(21))))
+    assert calculate_distance((33.5731, -7.6163), (34.0209, -6.8498)) == pytest.approx(86.58, abs=0.01)
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('use_3opt', [False, True])
+def test_improve_tour_never_lengthens_and_keeps_depot(seed, use_3opt):
+    matrix = make_matrix(40, seed)
+    for tour in (nearest_neighbor_tour(matrix), random_tour(40, seed)):
+        improved, stats = improve_tour(matrix, tour, time_budget_s=2, use_3opt=use_3opt)
+        assert improved[0] == 0
+        assert sorted(improved) == sorted(tour)
+        assert tour_length(matrix, improved) <= tour_length(matrix, tour) + 1e-9
+        assert stats['total_distance_km'] <= stats['initial_distance_km']
+
+@pytest.mark.parametrize('move', [_two_opt_pass, _or_opt_pass, _three_opt_pass])
+def test_each_move_never_lengthens_and_keeps_depot(move):
+    matrix = make_matrix(25, 7)
+    moves = {'two_opt': 0, 'or_opt': 0, 'three_opt': 0}
+    t = np.asarray(random_tour(25, 7), dtype=np.intp)
+    before = tour_length(matrix, t)
+    for _ in range(20):
+        result = move(matrix, t, time.perf_counter() + 1, moves)
+        # _two_opt_pass works in place and returns a flag; the others return the new tour
+        t, improved = (t, result) if isinstance(result, bool) else result
+        after = tour_length(matrix, t)
+        assert t[0] == 0
+        assert sorted(t.tolist()) == list(range(26))
+        assert after <= before + 1e-9
+        before = after
+        if not improved:
+            break
+    assert sum(moves.values()) > 0
+
+def test_two_opt_uncrosses_a_square():
+    # Corners of a square visited diagonally: the optimum is the perimeter
+    coords = [(33.60, -7.60), (33.61, -7.60), (33.61, -7.59), (33.60, -7.59)]
+    matrix = haversine_matrix(coords)
+    improved, stats = improve_tour(matrix, [0, 2, 1, 3])
+    assert improved[0] == 0
+    assert tour_length(matrix, improved) == pytest.approx(tour_length(matrix, [0, 1, 2, 3]))
+    assert stats['converged'] is True
+
+def test_improve_tour_with_no_budget_returns_a_valid_tour():
+    matrix = make_matrix(30, 3)
+    tour = random_tour(30, 3)
+    improved, stats = improve_tour(matrix, tour, time_budget_s=0)
+    assert improved == tour
+    assert stats['converged'] is False
+
+@pytest.mark.parametrize('seed', range(5))
+def test_capacity_is_never_exceeded(seed):
+    rng = random.Random(seed)
+    matrix = make_matrix(30, seed)
+    demands = [0] + [rng.choice([1, 2, 5, 8]) for _ in range(30)]
+    capacities = [20, 12, 12]
+    tours, unassigned = plan_capacitated_routes(matrix, demands, capacities)
+
+    served = []
+    for vehicle, tour in enumerate(tours):
+        if tour:
+            assert tour[0] == 0
+            assert sum(demands[stop] for stop in tour[1:]) <= capacities[vehicle]
+            served += tour[1:]
+    # Every stop exactly once: on a tour or reported
+    assert sorted(served + unassigned) == list(range(1, 31))
+    assert len(served) == len(set(served))
+
+def test_oversize_order_is_reported_unassigned():
+    matrix = make_matrix(4, 1)
+    tours, unassigned = plan_capacitated_routes(matrix, [0, 2, 50, 3, 1], [10, 6])
+    assert unassigned == [2]
+    assert sorted(stop for tour in tours for stop in tour[1:]) == [1, 3, 4]
+
+def test_schedule_tour_waits_and_reports_lateness():
+    # Stops 10 and 20 minutes out on a line, 5 minutes of service each
+    travel = np.array([[0, 10, 20], [10, 0, 10], [20, 10, 0]], dtype=np.float64)
+    schedule = schedule_tour(travel, [0, 1, 2], earliest=[0, 30, 0], latest=[INF, 60, 40], service_minutes=5)
+    assert schedule['arrival'] == [0.0, 10.0, 45.0]
+    assert schedule['start'] == [0.0, 30.0, 45.0]     # waits at stop 1 until its window opens
+    assert schedule['lateness'] == [0.0, 0.0, 5.0]    # stop 2 closed at 40
+    assert schedule['travel_minutes'] == 40.0
+    assert schedule['end'] == 70.0
+
+def test_late_window_stop_is_served_first():
+    # Stop 3 is the farthest but closes early: it must come before the others
+    coords = [WAREHOUSE, (33.61, -7.54), (33.62, -7.54), (33.66, -7.54)]
+    matrix = haversine_matrix(coords)
+    earliest = [0, 0, 0, 0]
+    latest = [INF, INF, INF, 10]
+    tour, schedule = sequence_with_time_windows(matrix, earliest, latest, [1, 1, 1, 10])
+    assert tour[0] == 0 and tour[1] == 3
+    assert schedule['lateness'][1] == 0.0
+    assert sorted(tour) == [0, 1, 2, 3]
+
+def test_infeasible_window_is_visited_and_reported_late():
+    # Stop 2 closes before a vehicle could possibly reach it
+    coords = [WAREHOUSE, (33.62, -7.54), (33.70, -7.54)]
+    matrix = haversine_matrix(coords)
+    reach = matrix[0, 2] / 50 * 60
+    tour, schedule = sequence_with_time_windows(matrix, [0, 0, 0], [INF, INF, reach / 2], [1, 1, 3])
+    assert sorted(tour) == [0, 1, 2]
+    assert tour[1] == 2
+    assert schedule['lateness'][1] == pytest.approx(reach - reach / 2)
+    assert schedule['cost'] > schedule['travel_minutes']
+
+@pytest.fixture
+def employee_client(app_db):
+    """Intercity routes with a signed-in employee (skipped if MongoDB is unreachable)"""
+    from flask import Flask
+    from utils.auth import generate_token
+    from routes.intercity import intercity_bp
+    user_id = app_db.users.insert_one({'role': 'employee', 'is_active': True}).inserted_id
+    app = Flask(__name__)
+    app.register_blueprint(intercity_bp, url_prefix='/api')
+    headers = {'Authorization': f"Bearer {generate_token(str(user_id), 'employee')}"}
+    return app.test_client(), headers
+
+@pytest.mark.parametrize('params', [
+    {'time_budget_ms': 'fast'},
+    {'time_budget_ms': -1},
+    {'mode': 'time_windows', 'speed_kmh': 'fast'},
+    {'mode': 'time_windows', 'speed_kmh': 0},
+    {'mode': 'time_windows', 'service_minutes': 'five'},
+    {'mode': 'time_windows', 'departure_time': 'tomorrow'}
+])
+def test_bad_optimizer_parameters_are_client_errors(employee_client, params):
+    http, headers = employee_client
+    response = http.post('/api/intercity/optimize-route', headers=headers, json={
+        'destination_city': 'Casablanca', 'order_ids': ['CTM1'], **params
+    })
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import requests
+import socketio
+from utils.message_queue import LocalBroker
+
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'socketio_worker.py')
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_worker(port, queue_url):
+    env = dict(os.environ, SOCKETIO_MESSAGE_QUEUE=queue_url, BROADCAST_TICK_SECONDS='0.1')
+    process = subprocess.Popen([sys.executable, WORKER, str(port)], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/socket.io/', params={'EIO': 4, 'transport': 'polling'}, timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'worker on port {port} did not start')
+
+def test_location_update_on_worker_a_reaches_client_on_worker_b():
+    broker = LocalBroker('127.0.0.1', 0)
+    queue_url = f'local://127.0.0.1:{broker.start()}'
+    port_a, port_b = free_port(), free_port()
+    workers = [start_worker(port_a, queue_url), start_worker(port_b, queue_url)]
+
+    client = socketio.Client()
+    subscribed, received = threading.Event(), []
+    got_update = threading.Event()
+    client.on('subscribed', lambda data: subscribed.set())
+
+    @client.on('driver_location_update')
+    def on_update(data):
+        received.append(data)
+        got_update.set()
+
+    try:
+        client.connect(f'http://127.0.0.1:{port_b}', transports=['polling'])
+        client.emit('subscribe_order', {'tracking_number': 'CTM0000000001'})
+        assert subscribed.wait(5)
+
+        # Worker A has no client of its own; the update must travel through the queue
+        response = requests.post(f'http://127.0.0.1:{port_a}/api/driver/location', json={
+            'tracking_number': 'CTM0000000001', 'driver_id': 'PKP_CAS_1', 'location': [33.57, -7.61]
+        }, timeout=5)
+        assert response.json()['worker'] == workers[0].pid
+
+        assert got_update.wait(10), 'update from worker A never reached the client on worker B'
+        assert received[0]['driver_id'] == 'PKP_CAS_1'
+        assert received[0]['location'] == [33.57, -7.61]
+
+        # Rooms stay scoped: another order's updates are not delivered to this client
+        got_update.clear()
+        requests.post(f'http://127.0.0.1:{port_a}/api/driver/location', json={
+            'tracking_number': 'CTM0000000002', 'driver_id': 'PKP_CAS_2', 'location': [33.58, -7.62]
+        }, timeout=5)
+        assert not got_update.wait(1)
+        assert broker.relayed >= 2
+    finally:
+        client.disconnect()
+        for worker in workers:
+            worker.terminate()
+            worker.wait(5)
+        broker.shutdown()
+        broker.server_close()
+
+if __name__ == '__main__':
+    test_location_update_on_worker_a_reaches_client_on_worker_b()
+    print("  ✅ test_location_update_on_worker_a_reaches_client_on_worker_b")
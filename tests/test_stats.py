@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+from utils import stats as stats_module
+from utils.counters import StatsCounters
+from utils.indexes import index_manager
+from utils.stats import AdminStatsCache, system_stats, user_order_stats
+
+def test_admin_cache_serves_within_ttl(monkeypatch):
+    calls = []
+    monkeypatch.setattr(stats_module, 'system_stats', lambda db=None: calls.append(1) or {'total_orders': len(calls)})
+    cache = AdminStatsCache(ttl_seconds=60)
+    assert cache.get() == {'total_orders': 1}
+    assert cache.get() == {'total_orders': 1}
+    cache.invalidate()
+    assert cache.get() == {'total_orders': 2}
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+def seed(db):
+    """200 orders over 4 users, 50 users over every role, counters rebuilt"""
+    index_manager.ensure(db)
+    statuses = ['pending', 'in_transit', 'delivered', 'assigned']
+    db.orders.insert_many([
+        {'tracking_number': f'CTM{i:010d}', 'user_id': f'u{i % 4}', 'status': statuses[i % len(statuses) if i % 7 else 0]}
+        for i in range(200)
+    ])
+    roles = ['client', 'client', 'enterprise', 'employee', 'admin']
+    db.users.insert_many([
+        {'email': f'user{i}@ctm.ma', 'role': roles[i % len(roles)], **({'is_active': i % 6 != 0} if i % 10 else {})}
+        for i in range(50)
+    ])
+    StatsCounters().rebuild(db)
+
+def test_rebuilt_counters_match_individual_counts(db):
+    seed(db)
+    mine = user_order_stats('u1', db)
+    assert mine['total'] == db.orders.count_documents({'user_id': 'u1'})
+    for status in ('pending', 'in_transit', 'delivered'):
+        assert mine[status] == db.orders.count_documents({'user_id': 'u1', 'status': status})
+    
+    stats = system_stats(db)
+    assert stats['total_users'] == db.users.count_documents({})
+    assert stats['active_users'] == db.users.count_documents({'is_active': True})
+    assert stats['clients'] == db.users.count_documents({'role': 'client'})
+    assert stats['enterprises'] == db.users.count_documents({'role': 'enterprise'})
+    assert stats['employees'] == db.users.count_documents({'role': 'employee'})
+    assert stats['total_orders'] == 200
+    assert stats['pending_orders'] == db.orders.count_documents({'status': 'pending'})
+    assert stats['delivered_orders'] == db.orders.count_documents({'status': 'delivered'})
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import pytest
+import requests
+from utils.external_services import WeatherService
+
+class FakeResponse:
+    def __init__(self, temperature):
+        self.temperature = temperature
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {
+            'main': {'temp': self.temperature, 'humidity': 40},
+            'weather': [{'main': 'Clear', 'description': 'clear sky'}],
+            'wind': {'speed': 3.0}
+        }
+
+class FakeWeatherApi:
+    """Answers with the next temperature in `script`, or fails while `down` is set"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self.down = False
+
+    def get(self, url, params=None):
+        self.calls += 1
+        if self.down:
+            raise requests.ConnectionError('upstream down')
+        return FakeResponse(self.script.pop(0))
+
+def make_service(api, ttl_seconds=60):
+    service = WeatherService(http=api, ttl_seconds=ttl_seconds)
+    service.api_key = 'test-key'
+    return service
+
+def test_fresh_entries_are_served_from_cache():
+    api = FakeWeatherApi(21.0)
+    service = make_service(api)
+    assert service.get_weather('Casablanca')['temperature'] == 21.0
+    assert service.get_weather('Casablanca')['temperature'] == 21.0
+    assert api.calls == 1
+    stats = service.cache_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['cities'] == 1
+
+def test_stale_entry_is_refreshed_on_read():
+    api = FakeWeatherApi(21.0, 24.0)
+    service = make_service(api, ttl_seconds=0.05)
+    service.get_weather('Rabat')
+    time.sleep(0.1)
+    assert service.get_weather('Rabat')['temperature'] == 24.0
+    assert api.calls == 2
+    assert service.cache_stats()['refreshes'] == 2
+
+def test_stale_entry_is_served_when_refresh_fails():
+    api = FakeWeatherApi(21.0)
+    service = make_service(api, ttl_seconds=0.05)
+    service.get_weather('Rabat')
+    time.sleep(0.1)
+    api.down = True
+    weather = service.get_weather('Rabat')
+    assert weather['temperature'] == 21.0 and weather['source'] == 'openweather'
+    assert service.cache_stats()['refresh_errors'] == 1
+
+def test_stale_entry_is_served_while_the_refresher_runs():
+    api = FakeWeatherApi(21.0)
+    service = make_service(api, ttl_seconds=0.05)
+    service.get_weather('Rabat')
+    time.sleep(0.1)
+
+    # A live refresher keeps the city warm: readers do not fetch themselves
+    stop = threading.Event()
+    service._refresher = threading.Thread(target=stop.wait, daemon=True)
+    service._refresher.start()
+    try:
+        assert service.get_weather('Rabat')['temperature'] == 21.0
+        assert api.calls == 1
+        assert service.cache_stats()['stale_hits'] == 1
+    finally:
+        stop.set()
+
+def test_unknown_city_and_missing_key_use_mock():
+    api = FakeWeatherApi()
+    service = make_service(api)
+    assert service.get_weather('Atlantis')['source'] == 'mock'
+    service.api_key = None
+    assert service.get_weather('Casablanca')['source'] == 'mock'
+    assert api.calls == 0
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))